@@ -0,0 +1,50 @@
+# conftest.py
+"""
+Fixtures dos testes com o app Flask: banco SQLite e pastas de upload temporários
+Execute: python -m pytest test_uploads.py test_timeline_cache.py
+"""
+
+import os
+import sys
+import tempfile
+
+import pytest
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'src')
+sys.path.insert(0, SRC_DIR)
+
+# Antes do import do main: o caminho do banco é lido na criação do app
+_TMP_DIR = tempfile.mkdtemp(prefix='symplle-tests-')
+os.environ.setdefault('SYMPLLE_DB_PATH', os.path.join(_TMP_DIR, 'symplle.db'))
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    """App com tabelas criadas e uploads gravados em tmp_path"""
+    from main import app as flask_app, _MODEL_MODULES
+    from src.models import db
+    from src.routes import upload_routes
+    from services.file_service import file_service
+    import importlib
+    
+    upload_dir = tmp_path / 'uploads'
+    for category in ('avatars', 'posts', 'documents', 'chat', 'temp'):
+        (upload_dir / category).mkdir(parents=True)
+        monkeypatch.setitem(file_service.category_dirs, category, str(upload_dir / category))
+    monkeypatch.setattr(upload_routes, 'UPLOAD_DIR', str(upload_dir))
+    
+    with flask_app.app_context():
+        for module in _MODEL_MODULES:
+            importlib.import_module(module)
+        db.create_all()
+        yield flask_app
+        db.session.remove()
+        db.drop_all()
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+def wait_for_metadata():
+    """Espera o registro em file_uploads (worker único: a tarefa vazia roda por último)"""
+    from src.routes import upload_routes
+    upload_routes._METADATA_POOL.submit(lambda: None).result()
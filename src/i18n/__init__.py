@@ -17,7 +17,7 @@ Uso básico:
 # Importações principais
 from .translator import translator, _, t
 from .localizer import localizer, format_currency, format_date, format_relative_time
-from .utils import i18n_utils, setup_template_globals, i18n_context_processor
+from .utils import i18n_utils, normalize_locale, setup_template_globals, i18n_context_processor
 from .i18n_middleware import I18nMiddleware
 
 # Versão do sistema
@@ -84,7 +84,7 @@ __all__ = [
     'format_currency', 'format_date', 'format_relative_time',
     
     # Locale management
-    'get_locale', 'set_locale', 'get_supported_locales',
+    'get_locale', 'set_locale', 'get_supported_locales', 'normalize_locale',
     
     # Flask integration
     'init_app',
@@ -4,26 +4,44 @@ Middleware Flask para integração automática do sistema i18n/L10n
 Modifica automaticamente as respostas das rotas existentes
 """
 
-from flask import request, g, jsonify, current_app
+from flask import request, g, jsonify, current_app, Response
 from functools import wraps
 import json
-from typing import Dict, Any, Optional
-from .translator import Translator
+import logging
+from typing import Dict, Any, Optional, Callable, Iterable
+from .translator import Translator, translator as _default_translator
 from .localizer import Localizer
 from .utils import get_browser_locale, get_currency_for_locale
 
+logger = logging.getLogger(__name__)
+
+# orjson é opcional: permite carregar o JSON direto dos bytes da resposta
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
 class I18nMiddleware:
     """Middleware para automatizar i18n/L10n nas respostas da API"""
     
+    __slots__ = ('translator', 'localizer', '_auto_localize', '_default_locale')
+    
     def __init__(self, app=None):
         self.translator = Translator()
         self.localizer = Localizer()
+        self._auto_localize = True
+        self._default_locale = 'en_US'
         
         if app is not None:
             self.init_app(app)
     
     def init_app(self, app):
         """Inicializa o middleware na aplicação Flask"""
+        # Flags de configuração lidas uma única vez (não a cada request)
+        self._auto_localize = app.config.get('AUTO_LOCALIZE_RESPONSES', True)
+        self._default_locale = app.config.get('DEFAULT_LOCALE', 'en_US')
+        
         app.before_request(self.before_request)
         app.after_request(self.after_request)
         
@@ -37,7 +55,7 @@ class I18nMiddleware:
             format_phone=self.format_phone
         )
         
-        print("🌍 I18n Middleware inicializado!")
+        logger.info("I18n Middleware inicializado")
     
     def before_request(self):
         """Executado antes de cada requisição"""
@@ -53,7 +71,7 @@ class I18nMiddleware:
         g.format_phone = self.format_phone
         g.get_locale = lambda: g.locale
         
-        print(f"🔍 Locale detectado: {g.locale}")
+        logger.debug("Locale detectado: %s", g.locale)
     
     def after_request(self, response):
         """Executado após cada requisição"""
@@ -61,7 +79,7 @@ class I18nMiddleware:
         response.headers['Content-Language'] = g.get('locale', 'en_US')
         
         # Auto-localizar respostas JSON se configurado
-        if current_app.config.get('AUTO_LOCALIZE_RESPONSES', True):
+        if self._auto_localize:
             self.localize_response(response)
         
         return response
@@ -90,7 +108,7 @@ class I18nMiddleware:
             return browser_locale
         
         # 4. Fallback para configuração padrão
-        return current_app.config.get('DEFAULT_LOCALE', 'en_US')
+        return self._default_locale
     
     def translate(self, key: str, **kwargs) -> str:
         """Traduz uma chave usando o locale atual"""
@@ -126,50 +144,95 @@ class I18nMiddleware:
     
     def localize_response(self, response):
         """Localiza automaticamente respostas JSON"""
-        if not response.is_json:
+        if not response.is_json or response.direct_passthrough:
+            return
+        
+        # Só decodificar o JSON se houver algo a traduzir
+        raw = response.get_data()
+        if not _needs_localization(raw):
             return
         
+        if ORJSON_AVAILABLE:
+            try:
+                data = orjson.loads(raw)
+            except orjson.JSONDecodeError:
+                return
+        else:
+            data = response.get_json(silent=True)
+        
+        if not data or not isinstance(data, dict):
+            return
+        
+        localized_data = self.localize_dict(data)
+        
         try:
-            data = response.get_json()
-            if data and isinstance(data, dict):
-                localized_data = self.localize_dict(data)
-                response.data = json.dumps(localized_data, ensure_ascii=False)
-                
-        except Exception as e:
-            print(f"⚠️ Erro ao localizar resposta: {e}")
+            response.data = json.dumps(localized_data, ensure_ascii=False)
+        except (TypeError, ValueError):
+            logger.exception("Erro ao serializar resposta localizada")
     
     def localize_dict(self, data: Dict[str, Any]) -> Dict[str, Any]:
-        """Localiza recursivamente um dicionário"""
+        """Localiza um dicionário (in-place) e o retorna"""
         if not isinstance(data, dict):
             return data
         
-        localized = {}
-        locale = g.get('locale', 'en_US')
+        _walk(data, g.get('locale', 'en_US'), self.translator.get_many)
+        return data
+
+# Campos conhecidos que são sempre traduzidos
+_TRANSLATABLE_KEYS = frozenset(('message', 'error_message', 'success_message'))
+_LOCALIZATION_MARKERS = (b'i18n:',) + tuple(f'"{key}"'.encode() for key in _TRANSLATABLE_KEYS)
+
+def _needs_localization(raw: bytes) -> bool:
+    """Verifica nos bytes crus se a resposta tem algo a localizar"""
+    return any(marker in raw for marker in _LOCALIZATION_MARKERS)
+
+def _has_localizable_values(data: Dict[str, Any]) -> bool:
+    """Verificação rápida (só 1º nível) se vale a pena percorrer o dicionário"""
+    for key, value in data.items():
+        if isinstance(value, str):
+            if value.startswith('i18n:') or key in _TRANSLATABLE_KEYS:
+                return True
+        elif isinstance(value, (dict, list)):
+            return True
+    return False
+
+def _walk(obj: Any, locale: str,
+          tr_many: Callable[[Iterable[str], str], Dict[str, str]]) -> None:
+    """
+    Percorre iterativamente (sem recursão) dicts/listas aninhados,
+    traduzindo in-place strings 'i18n:' e campos conhecidos.
+    
+    Duas fases: coleta todas as chaves, traduz cada chave única
+    uma única vez via tr_many e depois substitui.
+    """
+    targets = []
+    stack = [obj]
+    while stack:
+        current = stack.pop()
+        
+        if isinstance(current, list):
+            for item in current:
+                if isinstance(item, dict):
+                    stack.append(item)
+            continue
         
-        for key, value in data.items():
-            # Localizar strings que começam com 'i18n:'
-            if isinstance(value, str) and value.startswith('i18n:'):
-                localized[key] = self.translator.get(value[5:], locale)
-            
-            # Localizar dicionários recursivamente
-            elif isinstance(value, dict):
-                localized[key] = self.localize_dict(value)
-            
-            # Localizar listas
-            elif isinstance(value, list):
-                localized[key] = [
-                    self.localize_dict(item) if isinstance(item, dict) else item
-                    for item in value
-                ]
-            
-            # Localizar campos específicos conhecidos
-            elif key in ['message', 'error_message', 'success_message']:
-                localized[key] = self.translator.get(value, locale) if isinstance(value, str) else value
-            
-            else:
-                localized[key] = value
-        
-        return localized
+        for key, value in current.items():
+            if isinstance(value, str):
+                # Localizar strings que começam com 'i18n:'
+                if value.startswith('i18n:'):
+                    targets.append((current, key, value[5:]))
+                # Localizar campos específicos conhecidos
+                elif key in _TRANSLATABLE_KEYS:
+                    targets.append((current, key, value))
+            elif isinstance(value, (dict, list)):
+                stack.append(value)
+    
+    if not targets:
+        return
+    
+    translations = tr_many({lookup for _, _, lookup in targets}, locale)
+    for container, key, lookup in targets:
+        container[key] = translations[lookup]
 
 # Decorator para tradução automática de respostas
 def localized_response(func):
@@ -190,16 +253,24 @@ def localized_response(func):
     def wrapper(*args, **kwargs):
         result = func(*args, **kwargs)
         
+        # Response já montada: devolver sem re-serializar
+        if isinstance(result, Response):
+            return result
+        
         # Se retornou tupla (response, status_code)
         if isinstance(result, tuple):
             response_data, status_code = result
+            if isinstance(response_data, Response):
+                return result
         else:
             response_data = result
             status_code = 200
         
-        # Localizar se for dicionário
-        if isinstance(response_data, dict):
-            i18n_middleware = current_app.extensions.get('i18n_middleware')
+        # Localizar se for dicionário com algo a traduzir
+        if isinstance(response_data, dict) and _has_localizable_values(response_data):
+            if 'i18n_middleware' not in g:
+                g.i18n_middleware = current_app.extensions.get('i18n_middleware')
+            i18n_middleware = g.i18n_middleware
             if i18n_middleware:
                 response_data = i18n_middleware.localize_dict(response_data)
         
@@ -209,10 +280,8 @@ def localized_response(func):
 
 # Funções de conveniência para uso em rotas
 def _(key: str, **kwargs) -> str:
-    """Função de conveniência para tradução"""
-    locale = g.get('locale', 'en_US')
-    translator = Translator()
-    return translator.get(key, locale, **kwargs)
+    """Função de conveniência para tradução (catálogos já carregados no tradutor global)"""
+    return _default_translator.translate(key, g.get('locale', 'en_US'), **kwargs)
 
 def localized_error(message_key: str, status_code: int = 400, **kwargs):
     """Retorna erro localizado"""
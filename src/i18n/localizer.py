@@ -5,6 +5,28 @@ from datetime import datetime, timedelta
 from typing import Dict, Optional, Union
 from flask import g
 
+# Nomes de meses por idioma (montados uma vez, não a cada format_date)
+_MONTHS = {
+    'pt_BR': [
+        'janeiro', 'fevereiro', 'março', 'abril', 'maio', 'junho',
+        'julho', 'agosto', 'setembro', 'outubro', 'novembro', 'dezembro'
+    ],
+    'en_US': [
+        'January', 'February', 'March', 'April', 'May', 'June',
+        'July', 'August', 'September', 'October', 'November', 'December'
+    ],
+    'es_ES': [
+        'enero', 'febrero', 'marzo', 'abril', 'mayo', 'junio',
+        'julio', 'agosto', 'septiembre', 'octubre', 'noviembre', 'diciembre'
+    ]
+}
+
+_MONTHS_SHORT = {
+    'pt_BR': ['jan', 'fev', 'mar', 'abr', 'mai', 'jun', 'jul', 'ago', 'set', 'out', 'nov', 'dez'],
+    'en_US': ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec'],
+    'es_ES': ['ene', 'feb', 'mar', 'abr', 'may', 'jun', 'jul', 'ago', 'sep', 'oct', 'nov', 'dic']
+}
+
 class Localizer:
     """
     Sistema de localização (L10n) para formatação regional
@@ -183,28 +205,6 @@ class Localizer:
         if locale is None:
             locale = self.get_locale()
         
-        # Mapeamentos por idioma
-        months = {
-            'pt_BR': [
-                'janeiro', 'fevereiro', 'março', 'abril', 'maio', 'junho',
-                'julho', 'agosto', 'setembro', 'outubro', 'novembro', 'dezembro'
-            ],
-            'en_US': [
-                'January', 'February', 'March', 'April', 'May', 'June',
-                'July', 'August', 'September', 'October', 'November', 'December'
-            ],
-            'es_ES': [
-                'enero', 'febrero', 'marzo', 'abril', 'mayo', 'junio',
-                'julio', 'agosto', 'septiembre', 'octubre', 'noviembre', 'diciembre'
-            ]
-        }
-        
-        months_short = {
-            'pt_BR': ['jan', 'fev', 'mar', 'abr', 'mai', 'jun', 'jul', 'ago', 'set', 'out', 'nov', 'dez'],
-            'en_US': ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec'],
-            'es_ES': ['ene', 'feb', 'mar', 'abr', 'may', 'jun', 'jul', 'ago', 'sep', 'oct', 'nov', 'dic']
-        }
-        
         # Formatos por tipo e locale
         if format_type == 'short':
             if locale == 'pt_BR':
@@ -215,7 +215,7 @@ class Localizer:
                 return date.strftime('%m/%d/%Y')
         
         elif format_type == 'medium':
-            month = months_short.get(locale, months_short['en_US'])[date.month - 1]
+            month = _MONTHS_SHORT.get(locale, _MONTHS_SHORT['en_US'])[date.month - 1]
             if locale == 'pt_BR':
                 return f"{date.day} de {month} de {date.year}"
             elif locale == 'es_ES':
@@ -224,7 +224,7 @@ class Localizer:
                 return f"{month} {date.day}, {date.year}"
         
         elif format_type == 'long':
-            month = months.get(locale, months['en_US'])[date.month - 1]
+            month = _MONTHS.get(locale, _MONTHS['en_US'])[date.month - 1]
             if locale == 'pt_BR':
                 return f"{date.day} de {month} de {date.year}"
             elif locale == 'es_ES':
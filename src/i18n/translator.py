@@ -1,9 +1,22 @@
 # src/i18n/translator.py
 import json
 import os
-from typing import Dict, Optional, Union
+from typing import Dict, Iterable, Union
 from flask import request, g
 
+# Mapeamento de códigos ISO (Accept-Language) para nossos locales
+_LANG_MAPPING = {
+    'pt': 'pt_BR',
+    'pt-BR': 'pt_BR',
+    'pt-br': 'pt_BR',
+    'en': 'en_US',
+    'en-US': 'en_US',
+    'en-us': 'en_US',
+    'es': 'es_ES',
+    'es-ES': 'es_ES',
+    'es-es': 'es_ES'
+}
+
 class Translator:
     """
     Sistema de internacionalização (i18n) para múltiplos idiomas
@@ -15,6 +28,7 @@ class Translator:
         self.default_locale = 'en_US'
         self.supported_locales = ['pt_BR', 'en_US', 'es_ES']
         self._translations = {}
+        self._catalogs = {}
         self._load_translations()
     
     def _load_translations(self):
@@ -31,6 +45,31 @@ class Translator:
             except Exception as e:
                 print(f"Erro ao carregar traduções para {locale}: {e}")
                 self._translations[locale] = {}
+        
+        self._build_catalogs()
+    
+    def _build_catalogs(self):
+        """
+        Compila os catálogos: um dict plano por locale ('auth.login.success' -> texto)
+        já com o fallback do locale padrão mesclado, para lookup em um único acesso
+        """
+        fallback = self._flatten(self._translations.get(self.default_locale, {}))
+        self._catalogs = {
+            locale: {**fallback, **self._flatten(self._translations.get(locale, {}))}
+            for locale in self.supported_locales
+        }
+    
+    @staticmethod
+    def _flatten(translations: Dict, prefix: str = '') -> Dict[str, str]:
+        """Achata o JSON aninhado em chaves com notação de ponto"""
+        flat = {}
+        for k, v in translations.items():
+            key = f"{prefix}{k}"
+            if isinstance(v, dict):
+                flat.update(Translator._flatten(v, f"{key}."))
+            elif isinstance(v, str) and v:
+                flat[key] = v
+        return flat
     
     def detect_language(self) -> str:
         """
@@ -44,29 +83,24 @@ class Translator:
         
         # 2. Header Accept-Language
         if request:
-            accepted_languages = request.headers.get('Accept-Language', '')
-            for lang_range in accepted_languages.split(','):
-                lang = lang_range.split(';')[0].strip()
-                
-                # Mapeamento de códigos ISO para nossos locales
-                lang_mapping = {
-                    'pt': 'pt_BR',
-                    'pt-BR': 'pt_BR',
-                    'pt-br': 'pt_BR',
-                    'en': 'en_US',
-                    'en-US': 'en_US',
-                    'en-us': 'en_US',
-                    'es': 'es_ES',
-                    'es-ES': 'es_ES',
-                    'es-es': 'es_ES'
-                }
-                
-                if lang in lang_mapping and lang_mapping[lang] in self.supported_locales:
-                    return lang_mapping[lang]
+            return self.locale_from_accept_language(request.headers.get('Accept-Language', ''))
         
         # 3. Default fallback
         return self.default_locale
     
+    def locale_from_accept_language(self, accepted_languages: str) -> str:
+        """
+        Resolve o locale a partir do valor do header Accept-Language
+        Função pura (sem contexto de request), pode ser cacheada
+        """
+        for lang_range in accepted_languages.split(','):
+            lang = lang_range.split(';')[0].strip()
+            locale = _LANG_MAPPING.get(lang)
+            if locale in self.supported_locales:
+                return locale
+        
+        return self.default_locale
+    
     def get_locale(self) -> str:
         """Obtém o locale atual"""
         if hasattr(g, 'locale'):
@@ -95,22 +129,12 @@ class Translator:
         if locale is None:
             locale = self.get_locale()
         
-        # Fallback para inglês se locale não suportado
-        if locale not in self.supported_locales:
-            locale = self.default_locale
-        
-        # Busca a tradução
-        translation = self._get_nested_translation(self._translations.get(locale, {}), key)
-        
-        # Fallback para inglês se não encontrar
-        if not translation and locale != self.default_locale:
-            translation = self._get_nested_translation(
-                self._translations.get(self.default_locale, {}), key
-            )
+        # Catálogo compilado (fallback para inglês já mesclado);
+        # locale não suportado usa o catálogo padrão
+        catalog = self._catalogs.get(locale) or self._catalogs[self.default_locale]
         
         # Fallback final - retorna a própria chave
-        if not translation:
-            translation = key
+        translation = catalog.get(key, key)
         
         # Interpolação de variáveis
         if kwargs:
@@ -121,20 +145,23 @@ class Translator:
         
         return translation
     
-    def _get_nested_translation(self, translations: Dict, key: str) -> Optional[str]:
+    def get_many(self, keys: Iterable[str], locale: str = None) -> Dict[str, str]:
         """
-        Busca tradução usando notação de ponto (ex: 'auth.login.success')
+        Traduz várias chaves de uma vez (sem interpolação)
+        
+        Args:
+            keys: Chaves das mensagens
+            locale: Código do idioma. Se None, usa o atual
+        
+        Returns:
+            Dicionário chave -> texto traduzido
         """
-        keys = key.split('.')
-        current = translations
+        if locale is None:
+            locale = self.get_locale()
         
-        for k in keys:
-            if isinstance(current, dict) and k in current:
-                current = current[k]
-            else:
-                return None
+        catalog = self._catalogs.get(locale) or self._catalogs[self.default_locale]
         
-        return current if isinstance(current, str) else None
+        return {key: catalog.get(key, key) for key in keys}
     
     def get_available_locales(self) -> list:
         """Retorna lista de locales disponíveis"""
@@ -4,7 +4,7 @@ from flask import g, request
 from datetime import datetime
 import re
 
-from .translator import translator, _
+from .translator import _LANG_MAPPING, translator, _
 from .localizer import localizer, format_currency, format_date, format_relative_time
 
 class I18nUtils:
@@ -353,6 +353,21 @@ def get_browser_locale(request=None):
     
     return 'en_US'
 
+def normalize_locale(locale: str) -> str:
+    """
+    Forma canônica de um locale enviado pelo cliente (?locale=, ?lang=, X-Locale)
+    'pt-br', 'PT_BR' -> 'pt_BR'; só o idioma ('pt') usa a região padrão
+    """
+    value = locale.strip().replace('-', '_')
+    if '_' in value:
+        language, region = value.split('_', 1)
+        return f"{language.lower()}_{region.upper()}"
+    return _LANG_MAPPING.get(value.lower(), value.lower())
+
+def validate_locale(locale: str) -> bool:
+    """True se o locale é um dos suportados"""
+    return locale in translator.supported_locales
+
 def get_currency_for_locale(locale=None):
     """Retorna moeda padrão para o locale (duplicata para compatibilidade)"""
     return i18n_utils.get_currency_for_locale(locale)
\ No newline at end of file
@@ -1,10 +1,23 @@
 # src/main.py - Symplle API com i18n integrado (versão para src/)
+import importlib
+import logging
 import os
 import sys
+from functools import lru_cache
+
+# Diagnósticos por request usam app.logger.debug (formatação lazy);
+# em produção o nível INFO evita a interpolação e o lock de stdout
+logging.basicConfig(level=os.getenv('LOG_LEVEL', 'INFO'))
+
+# Escrita dos logs numa thread própria: os requests só enfileiram
+from middleware.log_queue import init_log_queue
+init_log_queue()
 
 # 🌍 AJUSTADO: Importar sistema i18n (main.py está em src/)
 try:
-    from i18n import init_app as init_i18n, i18n_utils, _, format_currency, format_date
+    from i18n import (
+        init_app as init_i18n, i18n_utils, translator, _, format_currency, format_date, normalize_locale
+    )
     I18N_AVAILABLE = True
     print("✅ Sistema i18n carregado com sucesso!")
 except ImportError:
@@ -27,17 +40,38 @@ except ImportError:
         def set_locale_context(): pass
     i18n_utils = MockI18nUtils()
 
-from flask import Flask, jsonify, request, g, session, send_from_directory
-from datetime import datetime
+from flask import Flask, jsonify, request, g
+from datetime import date, datetime
 from flask_cors import CORS
 from flask_migrate import Migrate
+from sqlalchemy import func, select
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import raiseload
+
+# Cache de respostas (opcional)
+try:
+    from flask_caching import Cache
+    CACHING_AVAILABLE = True
+except ImportError:
+    CACHING_AVAILABLE = False
+
+# Compressão gzip/brotli das respostas JSON (opcional)
+try:
+    from flask_compress import Compress
+    COMPRESS_AVAILABLE = True
+except ImportError:
+    COMPRESS_AVAILABLE = False
 
 # AJUSTADO: Caminhos para imports (main.py está em src/)
 sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))  # Pasta pai para acessar raiz
 
-from src.models import db
+from src.models import db, engine_options_for, init_sqlite_pragmas
+from middleware.json_provider import init_json_provider
+from middleware.security_headers import init_security_headers
+from src.models.user import User, normalize_email
 from src.routes.countries_routes import countries_bp
-from src.routes.upload_routes import upload_bp
+from src.routes.upload_routes import MAX_FILE_SIZE, send_upload, upload_bp
 from src.routes.otp_routes import otp_bp
 from src.routes.email_routes import email_routes
 from src.routes.profile_routes import profile_bp
@@ -51,29 +85,59 @@ except ImportError:
     print("⚠️ Auth middleware não encontrado - criando versão básica")
     
     # Versão básica do auth_service
-    import jwt
+    import base64
     import bcrypt
-    from datetime import datetime, timedelta, timezone
+    import hashlib
+    import hmac
+    import json
+    import time
+    from concurrent.futures import ThreadPoolExecutor
+    
+    _HASH_POOL = ThreadPoolExecutor(max_workers=os.cpu_count() or 1)
+    
+    def _b64url(data: bytes) -> str:
+        return base64.urlsafe_b64encode(data).rstrip(b'=').decode('ascii')
     
     class SimpleAuthService:
         def __init__(self):
             self.secret_key = 'symplle_jwt_secret_dev'
             self.algorithm = 'HS256'
+            self.bcrypt_rounds = int(os.getenv('BCRYPT_ROUNDS', '10'))
+            # Header JWT é constante: codificar uma única vez
+            self._key = self.secret_key.encode('utf-8')
+            self._header_b64 = _b64url(b'{"alg":"HS256","typ":"JWT"}')
         
         def hash_password(self, password: str) -> str:
-            return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+            return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt(self.bcrypt_rounds)).decode('utf-8')
+        
+        def verify_password(self, password, hashed) -> bool:
+            if isinstance(password, str):
+                password = password.encode('utf-8')
+            if isinstance(hashed, str):
+                hashed = hashed.encode('ascii')
+            return bcrypt.checkpw(password, hashed)
         
-        def verify_password(self, password: str, hashed: str) -> bool:
-            return bcrypt.checkpw(password.encode('utf-8'), hashed.encode('utf-8'))
+        def hash_password_async(self, password: str):
+            return _HASH_POOL.submit(self.hash_password, password)
+        
+        def verify_password_async(self, password: str, hashed: str):
+            return _HASH_POOL.submit(self.verify_password, password, hashed)
+        
+        def needs_rehash(self, hashed) -> bool:
+            return False
         
         def generate_token(self, user_id: int, email: str) -> str:
+            now = int(time.time())
             payload = {
                 'user_id': user_id,
                 'email': email,
-                'exp': datetime.now(timezone.utc) + timedelta(hours=24),
-                'iat': datetime.now(timezone.utc)
+                'exp': now + 24 * 3600,
+                'iat': now
             }
-            return jwt.encode(payload, self.secret_key, algorithm=self.algorithm)
+            body_b64 = _b64url(json.dumps(payload, separators=(',', ':')).encode('utf-8'))
+            signing_input = f"{self._header_b64}.{body_b64}"
+            signature = hmac.new(self._key, signing_input.encode('ascii'), hashlib.sha256).digest()
+            return f"{signing_input}.{_b64url(signature)}"
     
     auth_service = SimpleAuthService()
     
@@ -85,79 +149,145 @@ except ImportError:
 
 app = Flask(__name__, static_folder=os.path.join(os.path.dirname(__file__), 'static'))
 
+init_json_provider(app)  # jsonify/get_json via orjson quando disponível
+
 # 🌍 ADICIONAR: Configurações i18n
 app.config['DEFAULT_LOCALE'] = 'en_US'
 app.config['SUPPORTED_LOCALES'] = ['pt_BR', 'en_US', 'es_ES']
 
 CORS(app)  # Habilitar CORS para permitir requisições do Flutter
+
+# Cache das rotas que só variam com o locale
+VIEW_CACHE_TIMEOUT = 300
+cache = Cache(app, config={'CACHE_TYPE': 'SimpleCache'}) if CACHING_AVAILABLE else None
+
+def _locale_cache_key(*args, **kwargs):
+    """Chave do cache por rota + locale (evita servir um idioma para outro usuário)"""
+    return f"view:{request.path}:{g.get('locale', 'en_US')}"
+
+def cached_by_locale(view):
+    """Cacheia a resposta da view por locale quando flask_caching está disponível"""
+    if cache is None:
+        return view
+    return cache.cached(timeout=VIEW_CACHE_TIMEOUT, make_cache_key=_locale_cache_key)(view)
+
+# JSON comprime 5-10x (timeline, listas); respostas pequenas não compensam
+if COMPRESS_AVAILABLE:
+    app.config.update(
+        COMPRESS_MIMETYPES=['application/json'],
+        COMPRESS_LEVEL=6,
+        COMPRESS_BR_LEVEL=4,
+        COMPRESS_MIN_SIZE=500
+    )
+    Compress(app)
+
 app.config['SECRET_KEY'] = 'symplle_secret_key_change_in_production'
 
 # AJUSTADO: Configuração do banco de dados SQLite (main.py em src/)
-db_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'symplle.db')  # Pasta pai
+# SYMPLLE_DB_PATH troca o arquivo (ex: banco temporário dos testes)
+db_path = os.getenv('SYMPLLE_DB_PATH') or os.path.join(os.path.dirname(os.path.dirname(__file__)), 'symplle.db')  # Pasta pai
 app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{db_path}'
 print(f"🗄️ Banco configurado em: {db_path}")
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options_for(app.config['SQLALCHEMY_DATABASE_URI'])
+app.config['USE_X_SENDFILE'] = os.getenv('USE_X_SENDFILE') == '1'
+# Corpo acima do limite é recusado (413) antes de ser lido; 1MB de folga para o multipart
+app.config['MAX_CONTENT_LENGTH'] = MAX_FILE_SIZE + 1024 * 1024
 db.init_app(app)
 migrate = Migrate(app, db)
 
+init_sqlite_pragmas(app)  # WAL + pragmas em cada nova conexão
+
+# Rotas públicas cujo conteúdo só depende do locale
+_CACHEABLE_ENDPOINTS = frozenset(('i18n_info', 'i18n_demo', 'index'))
+
+# 🌍 ADICIONAR: Headers de resposta com locale
+@app.after_request
+def after_request(response):
+    """Adicionar headers de cache"""
+    # Headers de segurança: SecurityHeadersMiddleware (camada WSGI)
+    # 🌍 Content-Language é definido pelo I18nMiddleware
+    
+    # Cache HTTP para rotas que só variam com o idioma
+    # Registrado antes do init_i18n: o Flask roda os after_request na ordem inversa,
+    # então o ETag é calculado sobre o corpo já localizado pelo I18nMiddleware
+    if request.endpoint in _CACHEABLE_ENDPOINTS and response.status_code == 200:
+        response.cache_control.public = True
+        response.cache_control.max_age = VIEW_CACHE_TIMEOUT
+        response.cache_control.s_maxage = 60
+        response.vary.add('Accept-Language')
+        response.vary.add('Cookie')
+        response.vary.add('X-Locale')
+        response.add_etag()
+        response.make_conditional(request)
+    
+    return response
+
 # 🌍 ADICIONAR: Inicializar sistema i18n
 if I18N_AVAILABLE:
     init_i18n(app)
     print("🌍 Sistema i18n inicializado com suporte a: PT-BR, EN-US, ES-ES")
 
+# Preferência de idioma fica num cookie simples (sem serializar/assinar a sessão)
+LOCALE_COOKIE = 'locale'
+LOCALE_COOKIE_MAX_AGE = 365 * 24 * 3600
+
+# Endpoints que não dependem de locale (arquivos estáticos, health check)
+_LOCALE_FREE_ENDPOINTS = frozenset((
+    'serve_upload', 'upload.serve_uploaded_file', 'health_check', 'static'
+))
+
+@lru_cache(maxsize=512)
+def _resolve_locale(saved_locale, lang_param, header_locale, accept_language):
+    """
+    Resolve o locale (cookie > ?lang= > X-Locale > Accept-Language > padrão)
+    Cacheado pela combinação de entradas: sem parsing repetido por request
+    """
+    if saved_locale:
+        if saved_locale in translator.supported_locales:
+            return saved_locale
+        return translator.default_locale
+    
+    if lang_param in translator.supported_locales:
+        return lang_param
+    
+    # Header dos apps (ex: 'pt-BR'); as respostas cacheáveis têm Vary: X-Locale
+    if header_locale:
+        header_locale = normalize_locale(header_locale)
+        if header_locale in translator.supported_locales:
+            return header_locale
+    
+    return translator.locale_from_accept_language(accept_language)
+
 # 🌍 ADICIONAR: Middleware para configurar locale antes de cada request
 @app.before_request
 def before_request():
-    """Configurar locale e autenticação antes de cada request"""
+    """Configurar locale antes de cada request"""
+    # g.current_user é inicializado pelo before_request do init_auth_middleware
     
-    # 1. 🌍 Configurar locale baseado no request
+    # 🌍 Configurar locale baseado no request
     if I18N_AVAILABLE:
-        # Primeiro tentar carregar da sessão
-        saved_locale = session.get('locale')
-        if saved_locale:
-            from i18n import set_locale
-            set_locale(saved_locale)
-            g.locale = saved_locale
-            print(f"🌍 Loaded from session: {saved_locale}")
-        else:
-            i18n_utils.set_locale_context()
-            print(f"🌍 Auto-detected: {getattr(g, 'locale', 'en_US')}")
-    
-    # 2. 🔐 Configuração de usuário atual
-    g.current_user = None
+        if request.endpoint in _LOCALE_FREE_ENDPOINTS:
+            g.locale = 'en_US'
+            return
+        
+        saved_locale = request.cookies.get(LOCALE_COOKIE)
+        g.locale = _resolve_locale(
+            saved_locale,
+            request.args.get('lang'),
+            request.headers.get('X-Locale'),
+            request.headers.get('Accept-Language', '')
+        )
+        g.language = g.locale.split('_')[0]
+        app.logger.debug("locale %s (%s)", g.locale, 'cookie' if saved_locale else 'auto-detected')
     
     # Log do request para debug
     if request.endpoint:
-        locale = getattr(g, 'locale', 'en_US') if I18N_AVAILABLE else 'en_US'
-        print(f"📝 {request.method} {request.path} | Locale: {locale}")
-
-# 🌍 ADICIONAR: Headers de resposta com locale
-@app.after_request
-def after_request(response):
-    """Adicionar headers de segurança e locale"""
-    # Headers de segurança
-    response.headers['X-Content-Type-Options'] = 'nosniff'
-    response.headers['X-Frame-Options'] = 'DENY'
-    response.headers['X-XSS-Protection'] = '1; mode=block'
-    response.headers['Referrer-Policy'] = 'strict-origin-when-cross-origin'
-    
-    # 🌍 Header com locale atual
-    if I18N_AVAILABLE:
-        try:
-            from i18n import get_locale
-            current_locale = get_locale()
-            response.headers['Content-Language'] = current_locale
-            print(f"📡 Content-Language: {current_locale}")  # Debug
-        except:
-            if hasattr(g, 'locale'):
-                response.headers['Content-Language'] = g.locale
-            else:
-                response.headers['Content-Language'] = 'en_US'
-    
-    return response
+        app.logger.debug("%s %s | Locale: %s", request.method, request.path, g.get('locale', 'en_US'))
 
 # Inicializar middleware de segurança
 init_auth_middleware(app)
+init_security_headers(app)
 
 # Registrar blueprints existentes
 app.register_blueprint(countries_bp, url_prefix='/api')
@@ -169,7 +299,21 @@ app.register_blueprint(posts_bp)
 #app.register_blueprint(timeline_bp)
 
 # 🌍 ADICIONAR: Rotas específicas do sistema i18n
+# Exemplos de formatação: mudam só com o locale (e o dia), não a cada request
+@lru_cache(maxsize=16)
+def _currency_sample(locale):
+    return format_currency(1234.56, locale=locale)
+
+@lru_cache(maxsize=64)
+def _date_sample(day, format_type, locale):
+    return format_date(datetime.combine(day, datetime.min.time()), format_type, locale)
+
+def _today_sample(format_type):
+    """Data de hoje formatada no locale atual (cacheada por dia/locale)"""
+    return _date_sample(date.today(), format_type, g.get('locale', 'en_US'))
+
 @app.route('/api/i18n/info')
+@cached_by_locale
 def i18n_info():
     """Informações sobre internacionalização disponível"""
     if not I18N_AVAILABLE:
@@ -179,22 +323,22 @@ def i18n_info():
             'available': False
         })
     
-    from datetime import datetime
+    locale = g.get('locale', 'en_US')
     return jsonify(i18n_utils.format_api_response({
-        'current_locale': getattr(g, 'locale', 'en_US'),
+        'current_locale': locale,
         'supported_locales': [
             {'code': 'pt_BR', 'name': 'Português (Brasil)', 'flag': '🇧🇷'},
             {'code': 'en_US', 'name': 'English (US)', 'flag': '🇺🇸'},
             {'code': 'es_ES', 'name': 'Español (España)', 'flag': '🇪🇸'}
         ],
         'date_formats': {
-            'short': format_date(datetime.now(), 'short'),
-            'medium': format_date(datetime.now(), 'medium'),
-            'long': format_date(datetime.now(), 'long')
+            'short': _today_sample('short'),
+            'medium': _today_sample('medium'),
+            'long': _today_sample('long')
         },
         'currency_examples': {
             'amount': 1234.56,
-            'formatted': format_currency(1234.56)
+            'formatted': _currency_sample(locale)
         },
         'sample_translations': {
             'welcome': _('app.welcome'),
@@ -204,6 +348,26 @@ def i18n_info():
         }
     }, 'i18n.info_retrieved'))
 
+# Campos obrigatórios (string não vazia) por endpoint
+_LOCALE_FIELDS = ('locale',)
+_REGISTER_FIELDS = ('email', 'password', 'username')
+_LOGIN_FIELDS = ('email', 'password')
+_PROFILE_FIELDS = ('email', 'username')
+
+def _json_body(required=()):
+    """
+    Lê o corpo JSON sem levantar exceção e valida os campos obrigatórios
+    Retorna o dict ou None se o corpo for inválido ou faltar algum campo
+    """
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return None
+    for field in required:
+        value = data.get(field)
+        if not value or not isinstance(value, str):
+            return None
+    return data
+
 @app.route('/api/i18n/change-locale', methods=['POST'])
 def change_locale():
     """Trocar idioma da aplicação"""
@@ -216,8 +380,8 @@ def change_locale():
     try:        
         from i18n import set_locale
         
-        data = request.get_json()
-        new_locale = data.get('locale', '').strip()
+        data = _json_body(_LOCALE_FIELDS)
+        new_locale = data['locale'].strip() if data else ''
         
         if not new_locale:
             return jsonify(i18n_utils.format_api_response(
@@ -235,18 +399,19 @@ def change_locale():
         set_locale(new_locale)
         g.locale = new_locale
         i18n_utils.set_locale_context(new_locale)
-        session['locale'] = new_locale
         
-        return jsonify(i18n_utils.format_api_response({
+        response = jsonify(i18n_utils.format_api_response({
             'locale': new_locale,
             'message': _('settings.language.changed_success'),
             'examples': {
                 'welcome': _('app.welcome'),
                 'login': _('auth.login.title'),
-                'date': format_date(datetime.now(), 'medium'),
-                'currency': format_currency(1234.56)
+                'date': _today_sample('medium'),
+                'currency': _currency_sample(new_locale)
             }
         }, 'Idioma alterado com sucesso'))
+        response.set_cookie(LOCALE_COOKIE, new_locale, max_age=LOCALE_COOKIE_MAX_AGE, samesite='Lax')
+        return response
         
     except Exception as e:
         return jsonify(i18n_utils.format_api_response(
@@ -254,6 +419,7 @@ def change_locale():
         )), 500
 
 @app.route('/api/i18n/demo')
+@cached_by_locale
 def i18n_demo():
     """Demonstração das funcionalidades de i18n/L10n"""
     if not I18N_AVAILABLE:
@@ -263,8 +429,6 @@ def i18n_demo():
             'demo': 'Sistema funcionando em modo básico'
         })
     
-    from datetime import datetime
-    
     # ✅ OBTER LOCALE ATUAL CORRETAMENTE
     try:
         from i18n import get_locale
@@ -276,7 +440,7 @@ def i18n_demo():
     if hasattr(g, 'locale') and g.locale:
         current_locale = g.locale
     
-    print(f"🎭 Demo usando locale: {current_locale}")  # Debug
+    app.logger.debug("demo usando locale: %s", current_locale)
     
     demo_data = {
         'current_locale': current_locale,
@@ -289,8 +453,8 @@ def i18n_demo():
             'cancel_button': _('common.cancel')
         },
         'formatting': {
-            'date_now': format_date(datetime.now(), 'medium'),
-            'currency_example': format_currency(1234.56),
+            'date_now': _today_sample('medium'),
+            'currency_example': _currency_sample(current_locale),
             'relative_time': 'Formato implementado'
         }
     }
@@ -301,34 +465,42 @@ def i18n_demo():
 
 # === ROTAS JWT COM i18n ===
 
+# Colunas da tabela users (campos de segurança podem não existir no modelo)
+_USER_COLUMNS = frozenset(User.__table__.columns.keys())
+
+# Existência por email OU username: o OR impede o SQLite de usar os dois
+# índices únicos, o UNION ALL faz dois lookups pontuais
+_USER_EXISTS_SQL = db.text(
+    "SELECT 1 FROM users WHERE lower(email) = :email "
+    "UNION ALL SELECT 1 FROM users WHERE username = :username LIMIT 1"
+)
+
 @app.route('/api/auth/register', methods=['POST'])
 def jwt_register():
     """Registro usando JWT com mensagens localizadas"""
     try:
-        from src.models.user import User
-        
-        data = request.json
-        email = data.get('email')
-        password = data.get('password')
-        username = data.get('username')
-        
-        if not all([email, password, username]):
+        data = _json_body(_REGISTER_FIELDS)
+        if data is None:
             return jsonify(i18n_utils.format_api_response(
                 None, _('auth.validation.fields_required'), False
             )), 400
         
-        # Verificar se usuário já existe
-        existing_user = User.query.filter(
-            (User.email == email) | (User.username == username)
-        ).first()
+        email = normalize_email(data['email'])
+        password = data['password']
+        username = data['username']
+        
+        # Verificar se usuário já existe (um lookup indexado por coluna)
+        user_exists = db.session.execute(
+            _USER_EXISTS_SQL, {'email': email, 'username': username}
+        ).scalar()
         
-        if existing_user:
+        if user_exists:
             return jsonify(i18n_utils.format_api_response(
                 None, _('auth.validation.user_exists'), False
             )), 400
         
         # Criar novo usuário
-        password_hash = auth_service.hash_password(password)
+        password_hash = auth_service.hash_password_async(password).result()
         
         new_user = User(
             username=username,
@@ -344,19 +516,23 @@ def jwt_register():
         if hasattr(new_user, 'is_active'):
             new_user.is_active = True
         
+        # flush obtém o id sem commit; um único commit após token e serialização
         db.session.add(new_user)
-        db.session.commit()
+        db.session.flush()
         
         # Gerar token
         token = auth_service.generate_token(new_user.id, new_user.email)
+        user_data = new_user.to_dict()
+        
+        db.session.commit()
         
         return jsonify(i18n_utils.format_api_response({
             'token': token,
-            'user': new_user.to_dict()
+            'user': user_data
         }, _('auth.signup.success'), True)), 201
         
     except Exception as e:
-        print(f"Erro no registro: {e}")
+        app.logger.error("Erro no registro: %s", e)
         db.session.rollback()
         return jsonify(i18n_utils.format_api_response(
             None, _('errors.server'), False
@@ -366,42 +542,61 @@ def jwt_register():
 def jwt_login():
     """Login usando JWT com mensagens localizadas"""
     try:
-        from src.models.user import User
-        
-        data = request.json
-        email = data.get('email')
-        password = data.get('password')
-        
-        if not email or not password:
+        data = _json_body(_LOGIN_FIELDS)
+        if data is None:
             return jsonify(i18n_utils.format_api_response(
                 None, _('auth.validation.email_password_required'), False
             )), 400
         
+        email = data['email']
+        password = data['password']
+        
         # Buscar usuário
-        user = User.query.filter_by(email=email).first()
+        user = db.session.execute(
+            select(User).options(raiseload('*')).where(User.email_equals(email))
+        ).scalar_one_or_none()
         
         if not user:
             return jsonify(i18n_utils.format_api_response(
                 None, _('auth.login.error'), False
             )), 401
         
+        # Alterações do login acumuladas para um único UPDATE
+        updates = {}
+        
         # Verificar senha
-        if not hasattr(user, 'password_hash') or not user.password_hash:
+        password_hash = getattr(user, 'password_hash', None)
+        if not password_hash:
             # Usuário antigo sem senha - primeiro login
-            user.password_hash = auth_service.hash_password(password)
-            db.session.commit()
+            updates['password_hash'] = auth_service.hash_password_async(password).result()
         else:
-            if not auth_service.verify_password(password, user.password_hash):
+            if not auth_service.verify_password_async(password, password_hash).result():
                 return jsonify(i18n_utils.format_api_response(
                     None, _('auth.login.error'), False
                 )), 401
+            
+            # Migração lazy de hashes antigos (bcrypt) para argon2id
+            if auth_service.needs_rehash(password_hash):
+                updates['password_hash'] = auth_service.hash_password_async(password).result()
         
         # Gerar token
         token = auth_service.generate_token(user.id, user.email)
         
-        # Atualizar último login se campo existir
+        # Atualizar último login se campo existir (no máximo 1x por minuto)
         if hasattr(user, 'last_login'):
-            user.last_login = db.func.now()
+            last_login = user.last_login
+            if last_login is None or (datetime.utcnow() - last_login).total_seconds() > 60:
+                updates['last_login'] = db.func.now()
+        
+        # Só colunas realmente mapeadas; um statement e um commit
+        updates = {k: v for k, v in updates.items() if k in _USER_COLUMNS}
+        if updates:
+            db.session.execute(
+                db.update(User)
+                .where(User.id == user.id)
+                .values(**updates)
+                .execution_options(synchronize_session=False)
+            )
             db.session.commit()
         
         return jsonify(i18n_utils.format_api_response({
@@ -410,7 +605,7 @@ def jwt_login():
         }, _('auth.login.success', username=user.first_name or user.username), True))
         
     except Exception as e:
-        print(f"Erro no login: {e}")
+        app.logger.error("Erro no login: %s", e)
         return jsonify(i18n_utils.format_api_response(
             None, _('errors.server'), False
         )), 500
@@ -462,6 +657,7 @@ def health_check():
             }), 500
 
 @app.route('/')
+@cached_by_locale
 def index():
     """Página inicial com informações localizadas"""
     if I18N_AVAILABLE:
@@ -488,21 +684,20 @@ def index():
 def create_profile():
     """Criar/atualizar perfil do usuário com mensagens localizadas"""
     try:
-        from src.models.user import User
-        
-        data = request.json
-        email = data.get('email')
-        username = data.get('username')
-        first_name = data.get('first_name')
-        last_name = data.get('last_name', '')
-        
-        if not email or not username:
+        data = _json_body(_PROFILE_FIELDS)
+        if data is None:
             return jsonify(i18n_utils.format_api_response(
                 None, _('profile.validation.email_username_required'), False
             )), 400
         
+        email = normalize_email(data['email'])
+        first_name = data.get('first_name')
+        last_name = data.get('last_name', '')
+        
         # Buscar usuário existente
-        user = User.query.filter_by(email=email).first()
+        user = db.session.execute(
+            select(User).options(raiseload('*')).where(User.email_equals(email))
+        ).scalar_one_or_none()
         
         if user:
             # Atualizar usuário existente
@@ -523,100 +718,116 @@ def create_profile():
             )), 404
             
     except Exception as e:
-        print(f"Erro ao criar perfil: {e}")
+        app.logger.error("Erro ao criar perfil: %s", e)
         db.session.rollback()
         return jsonify(i18n_utils.format_api_response(
             None, _('errors.server'), False
         )), 500
 
+def _upsert_verified_user(payload):
+    """
+    INSERT ... ON CONFLICT DO UPDATE ... RETURNING (SQLite >= 3.35)
+    Tenta o conflito por lower(email) (ix_users_email_lower, pega também emails
+    antigos com maiúsculas) e depois por username (ambos únicos)
+    Bancos anteriores ao índice: rodar scripts/migrate_email_index.py
+    
+    Returns:
+        (user, created): created=True se a linha foi inserida
+    """
+    # Marcador do INSERT: o UPDATE mantém o created_at antigo, então o RETURNING
+    # devolve o marcador só quando a linha é nova (CURRENT_TIMESTAMP tem resolução de 1s)
+    marker = datetime.utcnow()
+    for conflict_target in (func.lower(User.email), User.__table__.c.username):
+        stmt = sqlite_insert(User).values(**payload, created_at=marker, updated_at=marker)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[conflict_target],
+            set_={
+                'first_name': stmt.excluded.first_name,
+                'last_name': stmt.excluded.last_name,
+                'phone': func.coalesce(func.nullif(stmt.excluded.phone, ''), User.phone),
+                'email_verified': True,
+                'phone_verified': True,
+                'updated_at': func.now()
+            }
+        ).returning(User)
+        
+        try:
+            # SAVEPOINT: a falha desfaz só esta tentativa, não a transação do request
+            with db.session.begin_nested():
+                user = db.session.scalars(
+                    stmt, execution_options={'populate_existing': True}
+                ).one()
+            return user, user.created_at == marker
+        except IntegrityError:
+            # Conflito no outro índice único: tenta por ele
+            if conflict_target is User.__table__.c.username:
+                raise
+
 @app.route('/api/users', methods=['POST'])
 def create_user_alt():
     """Endpoint alternativo para criar usuário com mensagens localizadas"""
     try:
-        from src.models.user import User
+        data = _json_body(_PROFILE_FIELDS)
+        if data is None:
+            return jsonify(i18n_utils.format_api_response(
+                None, _('auth.validation.username_email_required'), False
+            )), 400
         
-        data = request.json
-        username = data.get('username')
-        email = data.get('email')
+        username = data['username']
+        email = normalize_email(data['email'])
         first_name = data.get('first_name')
         last_name = data.get('last_name')
         phone = data.get('phone')
         
-        if not username or not email:
-            return jsonify(i18n_utils.format_api_response(
-                None, _('auth.validation.username_email_required'), False
-            )), 400
-        
-        # Verificar se usuário já existe
-        existing_user = User.query.filter(
-            (User.email == email) | (User.username == username)
-        ).first()
+        # Cria ou atualiza em um único statement (INSERT ... ON CONFLICT DO UPDATE)
+        user, created = _upsert_verified_user({
+            'username': username,
+            'email': email,
+            'first_name': first_name,
+            'last_name': last_name,
+            'phone': phone,
+            'email_verified': True,
+            'phone_verified': True
+        })
+        db.session.commit()
         
-        if existing_user:
-            # Atualizar usuário existente
-            existing_user.first_name = first_name
-            existing_user.last_name = last_name
-            if phone:
-                existing_user.phone = phone
-            existing_user.email_verified = True
-            existing_user.phone_verified = True
-            
-            db.session.commit()
-            
-            return jsonify(i18n_utils.format_api_response(
-                {'user': existing_user.to_dict()}, _('profile.updated'), True
-            )), 201
-        else:
-            # Criar novo usuário
-            new_user = User(
-                username=username,
-                email=email,
-                first_name=first_name,
-                last_name=last_name,
-                phone=phone
-            )
-            
-            # Marcar como verificado
-            new_user.email_verified = True
-            new_user.phone_verified = True
-            
-            db.session.add(new_user)
-            db.session.commit()
-            
-            return jsonify(i18n_utils.format_api_response(
-                {'user': new_user.to_dict()}, _('auth.signup.success'), True
-            )), 201
+        return jsonify(i18n_utils.format_api_response(
+            {'user': user.to_dict()},
+            _('auth.signup.success') if created else _('profile.updated'),
+            True
+        )), 201
             
     except Exception as e:
-        print(f"Erro ao criar usuário: {e}")
+        app.logger.error("Erro ao criar usuário: %s", e)
         db.session.rollback()
         return jsonify(i18n_utils.format_api_response(
             None, _('errors.server'), False
         )), 500
 
-# Servir arquivos estáticos de upload
+# Servir arquivos estáticos de upload (X-Accel-Redirect/X-Sendfile em upload_routes.send_upload)
 @app.route('/uploads/<path:filename>')
 def serve_upload(filename):
     """Serve arquivos enviados"""
-    upload_dir = os.path.join(os.path.dirname(__file__), 'uploads')
-    return send_from_directory(upload_dir, filename)
+    return send_upload(filename)
 
-@app.route('/api/create-tables', methods=['POST'])
-def create_tables():
-    """Endpoint temporário para criar tabelas de posts"""
-    try:
-        from models.post import Post, Like, Comment
-        db.create_all()
-        return jsonify({
-            "success": True,
-            "message": "Tables created successfully",
-            "tables": ["posts", "likes", "comments"]
-        }), 200
-    except Exception as e:
-        return jsonify({
-            "success": False,
-            "message": f"Error creating tables: {str(e)}"
-        }), 500
+# Módulos de modelos que as rotas não importam (users e countries já vêm delas)
+_MODEL_MODULES = ('models.post', 'models.file_upload')
+
+@app.cli.command('init-db')
+def init_db():
+    """Cria as tabelas (bootstrap único; o schema normal vem de 'flask db upgrade')"""
+    # Registra posts e file_uploads no mesmo metadata antes do create_all
+    for module in _MODEL_MODULES:
+        importlib.import_module(module)
+    db.create_all()
+    print("Tables created successfully")
+
+# API só JSON: sem recarga/diagnóstico de templates
+app.config.update(TEMPLATES_AUTO_RELOAD=False, EXPLAIN_TEMPLATE_LOADING=False)
+
+# Ordena/compila as regras de rota agora (antes do fork do gunicorn --preload),
+# e não no primeiro request de cada worker
+app.url_map.update()
 
 if __name__ == '__main__':
     print("\n🚀 SYMPLLE API STARTING...")
@@ -637,9 +848,24 @@ if __name__ == '__main__':
         print("        -d '{\"locale\": \"pt_BR\"}'")
     
     print("\n✨ READY! Server starting on http://localhost:5000")
+    print("   Dev server: FLASK_ENV=development (senão sobe via gunicorn)")
     print("   Execute de: src/ directory")
     print("\n")
     
-    with app.app_context():
-        db.create_all()  # Criar tabelas no banco de dados
-    app.run(host='0.0.0.0', port=5000, debug=True)
\ No newline at end of file
+    if os.environ.get('FLASK_ENV') == 'development':
+        # Bootstrap do banco só quando pedido (evita create_all a cada start)
+        if os.environ.get('SYMPLLE_BOOTSTRAP_DB') == '1':
+            with app.app_context():
+                db.create_all()  # Criar tabelas no banco de dados
+        app.run(host='0.0.0.0', port=5000, debug=True)
+    else:
+        # Produção: gunicorn com app pré-carregado (--preload) e workers via fork(),
+        # compartilhando catálogos/caches em copy-on-write. Schema via 'flask db upgrade'
+        os.execvp('gunicorn', [
+            'gunicorn', '--preload',
+            '-w', str(os.cpu_count() or 1),
+            '-k', 'gthread', '--threads', '4',
+            '-b', '0.0.0.0:5000',
+            '--chdir', os.path.dirname(os.path.abspath(__file__)),
+            'wsgi:app'
+        ])
\ No newline at end of file
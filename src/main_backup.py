@@ -12,7 +12,10 @@ from i18n import i18n_utils
 # Adicionar path para imports
 sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
 
-from src.models import db
+from src.models import db, engine_options_for, init_sqlite_pragmas
+from src.models.user import User
+from middleware.json_provider import init_json_provider
+from middleware.security_headers import init_security_headers
 from src.routes.countries_routes import countries_bp
 from src.routes.otp_routes import otp_bp
 from src.routes.email_routes import email_routes
@@ -58,22 +61,25 @@ except ImportError:
         print("🔐 Auth middleware básico inicializado")
 
 app = Flask(__name__, static_folder=os.path.join(os.path.dirname(__file__), 'static'))
+init_json_provider(app)  # jsonify/get_json via orjson quando disponível
 CORS(app)  # Habilitar CORS para permitir requisições do Flutter
 app.config['SECRET_KEY'] = 'symplle_secret_key_change_in_production'
 
 # Configuração do banco de dados SQLite
 #app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///../../symplle.db'
-import os
 # Caminho absoluto garantido
 db_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'symplle.db')
 app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{db_path}'
 print(f"🗄️ Banco configurado em: {db_path}")
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options_for(app.config['SQLALCHEMY_DATABASE_URI'])
 db.init_app(app)
 migrate = Migrate(app, db)
+init_sqlite_pragmas(app)  # WAL + pragmas em cada nova conexão
 
 # Inicializar middleware de segurança
 init_auth_middleware(app)
+init_security_headers(app)
 
 # Registrar blueprints existentes
 app.register_blueprint(countries_bp, url_prefix='/api')
@@ -87,8 +93,6 @@ app.register_blueprint(profile_bp, url_prefix='/api')
 def jwt_register():
     """Registro usando JWT - versão simplificada"""
     try:
-        from src.models.user import User
-        
         data = request.json
         email = data.get('email')
         password = data.get('password')
@@ -153,8 +157,6 @@ def jwt_register():
 def jwt_login():
     """Login usando JWT - versão simplificada"""
     try:
-        from src.models.user import User
-        
         data = request.json
         email = data.get('email')
         password = data.get('password')
@@ -236,8 +238,6 @@ def index():
 def create_profile():
     """Criar/atualizar perfil do usuário"""
     try:
-        from src.models.user import User
-        
         data = request.json
         email = data.get('email')
         username = data.get('username')
@@ -286,8 +286,6 @@ def create_profile():
 def create_user_alt():
     """Endpoint alternativo para criar usuário"""
     try:
-        from src.models.user import User
-        
         data = request.json
         username = data.get('username')
         email = data.get('email')
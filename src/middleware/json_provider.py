@@ -0,0 +1,55 @@
+# src/middleware/json_provider.py
+"""
+Provider JSON baseado em orjson para as apps Flask do Symplle
+jsonify() e request.get_json() passam a usar orjson quando instalado
+"""
+
+from flask.json.provider import DefaultJSONProvider
+
+# Serialização JSON rápida (opcional)
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+class ORJSONProvider(DefaultJSONProvider):
+    """
+    Provider JSON baseado em orjson (jsonify e request.get_json)
+    Tipos não nativos (Decimal, etc.) caem no default do Flask
+    """
+    
+    @staticmethod
+    def _options(indent=None, sort_keys=False):
+        option = orjson.OPT_NON_STR_KEYS | orjson.OPT_NAIVE_UTC
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        if sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        return option
+    
+    def dumps(self, obj, **kwargs):
+        option = self._options(kwargs.get('indent'), kwargs.get('sort_keys'))
+        return orjson.dumps(obj, default=self.default, option=option).decode('utf-8')
+    
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+    
+    def response(self, *args, **kwargs):
+        """
+        jsonify() com o corpo em bytes direto do orjson (sem decode para str
+        e re-encode no Response), relevante em payloads grandes como a timeline
+        """
+        # Saída indentada (debug) segue pelo caminho padrão
+        if self.compact is False or (self.compact is None and self._app.debug):
+            return super().response(*args, **kwargs)
+        
+        obj = self._prepare_response_obj(args, kwargs)
+        body = orjson.dumps(obj, default=self.default, option=self._options(sort_keys=self.sort_keys))
+        return self._app.response_class(body + b"\n", mimetype=self.mimetype)
+
+def init_json_provider(app):
+    """Instala o provider orjson na app (mantém o padrão do Flask sem orjson)"""
+    if ORJSON_AVAILABLE:
+        app.json = ORJSONProvider(app)
+    return app.json
@@ -0,0 +1,49 @@
+# src/middleware/log_queue.py
+"""
+Logging assíncrono do Symplle: as threads dos requests só enfileiram o registro
+(QueueHandler) e a formatação + escrita em stderr rodam numa thread própria
+(QueueListener), sem disputar o lock do stream entre requests
+"""
+
+import atexit
+import logging
+import os
+import queue
+from logging.handlers import QueueHandler, QueueListener
+
+_queue_handler = None
+_listener = None
+_handlers = ()
+
+def _start_listener():
+    """Fila nova + thread do listener (também no filho após fork)"""
+    global _listener
+    log_queue = queue.SimpleQueue()
+    _queue_handler.queue = log_queue
+    _listener = QueueListener(log_queue, *_handlers, respect_handler_level=True)
+    _listener.start()
+
+def init_log_queue():
+    """
+    Move os handlers do logger raiz (ex: os de logging.basicConfig) para trás
+    de uma fila. Chamar uma vez, depois de configurar os handlers
+    """
+    global _queue_handler, _handlers
+    if _queue_handler is not None:
+        return
+    
+    root = logging.getLogger()
+    _handlers = tuple(root.handlers)
+    _queue_handler = QueueHandler(queue.SimpleQueue())
+    root.handlers = [_queue_handler]
+    _start_listener()
+    
+    # gunicorn --preload: a thread do listener não sobrevive ao fork do worker
+    os.register_at_fork(after_in_child=_start_listener)
+    # Registros ainda na fila são escritos antes de o processo terminar
+    atexit.register(stop_log_queue)
+
+def stop_log_queue():
+    """Esvazia a fila e encerra o listener (ex: no shutdown)"""
+    if _listener is not None:
+        _listener.stop()
@@ -0,0 +1,32 @@
+# src/middleware/security_headers.py
+"""
+Headers de segurança aplicados na camada WSGI
+Adicionados direto na lista do start_response, sem passar por after_request
+"""
+
+# Headers constantes (montados uma vez)
+SECURITY_HEADERS = (
+    ('X-Content-Type-Options', 'nosniff'),
+    ('X-Frame-Options', 'DENY'),
+    ('X-XSS-Protection', '1; mode=block'),
+    ('Referrer-Policy', 'strict-origin-when-cross-origin'),
+)
+
+class SecurityHeadersMiddleware:
+    """Middleware WSGI que anexa SECURITY_HEADERS a toda resposta"""
+    
+    __slots__ = ('wsgi_app',)
+    
+    def __init__(self, wsgi_app):
+        self.wsgi_app = wsgi_app
+    
+    def __call__(self, environ, start_response):
+        def _start_response(status, headers, exc_info=None):
+            headers.extend(SECURITY_HEADERS)
+            return start_response(status, headers, exc_info)
+        
+        return self.wsgi_app(environ, _start_response)
+
+def init_security_headers(app):
+    """Envolve app.wsgi_app com o middleware de headers de segurança"""
+    app.wsgi_app = SecurityHeadersMiddleware(app.wsgi_app)
@@ -1,11 +1,69 @@
+import sys
+
 from flask_sqlalchemy import SQLAlchemy
 from flask_migrate import Migrate
+from sqlalchemy import event
+
+# Este pacote é importado como 'src.models' (main.py) e como 'models' (src/ no sys.path:
+# User, Post, FileUpload, services). Os dois nomes compartilham a mesma instância,
+# senão metade dos modelos fica num db que nunca recebe init_app
+_twin = sys.modules.get('models' if __name__ == 'src.models' else 'src.models')
 
 # Primeiro, crie apenas o objeto db
-db = SQLAlchemy()
+# autoflush=False: SELECTs não promovem a transação a escrita no SQLite
+# expire_on_commit=False: objetos seguem utilizáveis após commit sem re-SELECT
+if getattr(_twin, 'db', None) is not None:
+    db = _twin.db
+else:
+    db = SQLAlchemy(session_options={'autoflush': False, 'expire_on_commit': False})
 migrate = None  # Inicialize como None
 
 # Função para inicializar o migrate depois que o app for criado
 def init_migrate(app):
     global migrate
     migrate = Migrate(app, db)
+
+# Pool pequeno e reaproveitado (pragmas rodam só na criação da conexão);
+# conexões voltam ao pool com rollback, sem transação aberta segurando o lock
+# query_cache_size: SQL compilado reaproveitado por estrutura de statement
+# (padrão 500; timelines, trending e cursores somam muitas variantes)
+SQLITE_ENGINE_OPTIONS = {
+    'pool_size': 5,
+    'max_overflow': 5,
+    'pool_reset_on_return': 'rollback',
+    'query_cache_size': 1200,
+    'connect_args': {'check_same_thread': False, 'timeout': 30}
+}
+
+# Banco em servidor (ex: MySQL via PyMySQL): pool maior, pre-ping contra conexões
+# derrubadas pelo servidor e reciclagem antes do wait_timeout
+SERVER_ENGINE_OPTIONS = {
+    'pool_size': 10,
+    'max_overflow': 20,
+    'pool_pre_ping': True,
+    'pool_recycle': 3600,
+    'query_cache_size': 1200
+}
+
+def engine_options_for(database_uri):
+    """Opções de engine/pool conforme o banco configurado"""
+    if database_uri.startswith('sqlite'):
+        return SQLITE_ENGINE_OPTIONS
+    return SERVER_ENGINE_OPTIONS
+
+def _set_sqlite_pragmas(dbapi_conn, connection_record):
+    """Configura WAL e pragmas de performance em cada nova conexão SQLite"""
+    cursor = dbapi_conn.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")       # Leitores não bloqueiam o escritor
+    cursor.execute("PRAGMA synchronous=NORMAL")     # Um fsync a menos por commit (seguro com WAL)
+    cursor.execute("PRAGMA temp_store=MEMORY")
+    cursor.execute("PRAGMA mmap_size=268435456")    # 256MB
+    cursor.execute("PRAGMA cache_size=-20000")      # ~20MB
+    cursor.close()
+
+# Função para registrar os pragmas depois do db.init_app(app)
+def init_sqlite_pragmas(app):
+    # db.engine é criado sob demanda e exige app context
+    with app.app_context():
+        if db.engine.dialect.name == 'sqlite':
+            event.listen(db.engine, 'connect', _set_sqlite_pragmas)
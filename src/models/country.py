@@ -22,3 +22,8 @@ class Country(db.Model):
             "iso_num": self.iso_num,
             "calling_code": self.calling_code
         }
+
+# Colunas de to_dict() para select() sem hidratação ORM (tabela de referência)
+COUNTRY_DICT_COLS = (
+    Country.id, Country.name, Country.iso_code, Country.iso_code_3, Country.iso_num, Country.calling_code
+)
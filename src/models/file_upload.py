@@ -28,7 +28,7 @@ class FileUpload(db.Model):
     # Metadados do arquivo
     file_size = db.Column(db.BigInteger, nullable=False)  # Tamanho em bytes
     mime_type = db.Column(db.String(100), nullable=False)  # Tipo MIME
-    file_hash = db.Column(db.String(32), nullable=True, index=True)  # Hash MD5
+    file_hash = db.Column(db.String(64), nullable=True, index=True)  # Hash SHA-256 (hex)
     file_ext = db.Column(db.String(10), nullable=False)  # Extensão
     
     # Categorização
@@ -56,6 +56,11 @@ class FileUpload(db.Model):
     # Relacionamentos
     user = db.relationship('User', backref='file_uploads')
     
+    # Listagem por usuário + categoria (GET /api/upload/files/<user_id>)
+    __table_args__ = (
+        db.Index('ix_file_uploads_user_category', 'user_id', 'category'),
+    )
+    
     def __repr__(self):
         return f'<FileUpload {self.filename} by User {self.user_id}>'
     
@@ -158,7 +163,7 @@ class FileUpload(db.Model):
         Busca arquivo por hash (para detectar duplicatas)
         
         Args:
-            file_hash: Hash MD5 do arquivo
+            file_hash: Hash SHA-256 do arquivo
         
         Returns:
             FileUpload ou None
@@ -1,7 +1,6 @@
 from src.models import db
 from datetime import datetime, timedelta, timezone
-import random
-import string
+import secrets
 
 class PhoneOTP(db.Model):
     """
@@ -42,7 +41,8 @@ class PhoneOTP(db.Model):
         Returns:
             str: Código OTP gerado
         """
-        return ''.join(random.choices(string.digits, k=length))
+        # secrets (CSPRNG): o Mersenne Twister do random é previsível
+        return f"{secrets.randbelow(10 ** length):0{length}d}"
 
     def is_valid(self):
         """
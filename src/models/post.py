@@ -6,9 +6,10 @@ Modelos para o sistema de Posts do Symplle
 - Comment: comentários em posts
 """
 
+import json
 from datetime import datetime
-from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Boolean, Enum
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Boolean, Enum, Float, Computed, text
+from sqlalchemy.orm import relationship, deferred
 from models import db
 import enum
 
@@ -25,6 +26,20 @@ class PostType(enum.Enum):
     VIDEO = "video"         # Texto + vídeos
     MIXED = "mixed"         # Texto + imagens + vídeos
 
+# Parte estável do score da timeline inteligente (não depende do "agora"):
+# engajamento * 0.4 + tipo de conteúdo * 0.1, mesmos pesos de TimelineService.
+# Enum é gravado pelo nome (IMAGE, VIDEO...), não pelo valor
+ENGAGEMENT_PLUS_CONTENT_SQL = (
+    "(COALESCE(likes_count, 0) + COALESCE(comments_count, 0) * 2) * 0.4 + "
+    "CASE post_type WHEN 'IMAGE' THEN 20 WHEN 'VIDEO' THEN 25 WHEN 'MIXED' THEN 30 ELSE 10 END * 0.1"
+)
+
+# Filtro fixo do feed (posts públicos não apagados) nos índices parciais.
+# O planner do SQLite só usa o índice se o WHERE da query contiver o mesmo
+# termo: is_deleted == False vira "is_deleted = 0" no SQLite (sem booleano nativo)
+FEED_INDEX_WHERE_SQLITE = text("is_deleted = 0 AND privacy = 'PUBLIC'")
+FEED_INDEX_WHERE_PG = text("is_deleted = false AND privacy = 'PUBLIC'")
+
 class Post(db.Model):
     """
     Modelo para posts dos usuários
@@ -55,6 +70,31 @@ class Post(db.Model):
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
+    # Coluna gerada (VIRTUAL no SQLite: calculada a cada leitura). Só é usada dentro
+    # do ORDER BY da timeline inteligente, então não entra no SELECT padrão de Post
+    engagement_plus_content = deferred(Column(Float, Computed(ENGAGEMENT_PLUS_CONTENT_SQL)))
+    
+    # Índices parciais (só posts públicos não apagados), um por padrão de acesso:
+    # - chrono: ORDER BY created_at DESC, id DESC da paginação por cursor
+    # - trending: janela por created_at cobrindo os contadores do score
+    #   (is_deleted/privacy no fim para o SQLite responder só pelo índice)
+    # - smart: parte estável do score
+    __table_args__ = (
+        db.Index(
+            'ix_posts_feed_chrono', created_at.desc(), id.desc(),
+            sqlite_where=FEED_INDEX_WHERE_SQLITE, postgresql_where=FEED_INDEX_WHERE_PG
+        ),
+        db.Index(
+            'ix_posts_feed_trending', created_at.desc(), likes_count, comments_count, views_count,
+            is_deleted, privacy,
+            sqlite_where=FEED_INDEX_WHERE_SQLITE, postgresql_where=FEED_INDEX_WHERE_PG
+        ),
+        db.Index(
+            'ix_posts_smart', engagement_plus_content.columns[0].desc(), created_at.desc(),
+            sqlite_where=FEED_INDEX_WHERE_SQLITE, postgresql_where=FEED_INDEX_WHERE_PG
+        ),
+    )
+    
     # Relacionamentos
     user = relationship("User", back_populates="posts")
     likes = relationship("Like", back_populates="post", cascade="all, delete-orphan")
@@ -65,8 +105,6 @@ class Post(db.Model):
     
     def to_dict(self, include_user=True, include_stats=True):
         """Converte post para dicionário JSON"""
-        import json
-        
         data = {
             'id': self.id,
             'content': self.content,
@@ -2,6 +2,10 @@ from flask import Blueprint, request, jsonify
 from sqlalchemy.orm import relationship  # ✅ IMPORT ADICIONADO
 from models import db  # ✅ IMPORT ABSOLUTO CORRIGIDO
 
+def normalize_email(email):
+    """Forma canônica do email (sem espaços, minúsculo) usada em escrita e busca"""
+    return email.strip().lower()
+
 class User(db.Model):
     __tablename__ = 'users'
     
@@ -20,6 +24,17 @@ class User(db.Model):
     # ✅ RELACIONAMENTO COM POSTS (DENTRO DA CLASSE, COM INDENTAÇÃO CORRETA)
     posts = relationship("Post", back_populates="user")
     
+    # Índice funcional: buscas por lower(email) sem full scan e unicidade
+    # case-insensitive (Foo@x.com e foo@x.com são o mesmo usuário)
+    __table_args__ = (
+        db.Index('ix_users_email_lower', db.func.lower(email), unique=True),
+    )
+    
+    @classmethod
+    def email_equals(cls, email):
+        """Filtro case-insensitive por email (atendido por ix_users_email_lower)"""
+        return db.func.lower(cls.email) == normalize_email(email)
+    
     def __init__(self, username, email, first_name=None, last_name=None, phone=None, profile_image=None):
         self.username = username
         self.email = email
@@ -41,4 +56,19 @@ class User(db.Model):
             'phone_verified': self.phone_verified,
             'created_at': self.created_at.isoformat() if self.created_at else None,
             'updated_at': self.updated_at.isoformat() if self.updated_at else None
-        }
\ No newline at end of file
+        }
+
+# Consultas só de leitura: select(*USER_DICT_COLS) devolve Rows (sem hidratar
+# objetos ORM) e user_row_to_dict produz o mesmo formato de User.to_dict()
+USER_DICT_COLS = (
+    User.id, User.username, User.email, User.phone, User.first_name, User.last_name,
+    User.profile_image, User.email_verified, User.phone_verified, User.created_at, User.updated_at
+)
+
+def user_row_to_dict(row):
+    """Serializa um RowMapping de USER_DICT_COLS como User.to_dict()"""
+    data = dict(row)
+    for key in ('created_at', 'updated_at'):
+        if data[key] is not None:
+            data[key] = data[key].isoformat()
+    return data
@@ -1,26 +1,58 @@
-from flask import Blueprint, jsonify
-from src.models.country import Country
+import threading
+
+from flask import Blueprint, Response, current_app, jsonify
+from sqlalchemy import select
+from src.models import db
+from src.models.country import COUNTRY_DICT_COLS, Country
 
 countries_bp = Blueprint('countries', __name__)
 
+# Tabela de referência (somente leitura): carregada uma vez por processo.
+# Para recarregar após alterar os países, reinicie a aplicação.
+_countries_cache = None
+_countries_lock = threading.Lock()
+
+def _load_countries():
+    """
+    Carrega os países em memória na primeira chamada
+    Retorna (json_da_lista_pronto, dict iso_code -> to_dict())
+    """
+    global _countries_cache
+    if _countries_cache is not None:
+        return _countries_cache
+    
+    with _countries_lock:
+        if _countries_cache is None:
+            rows = db.session.execute(
+                select(*COUNTRY_DICT_COLS).order_by(Country.name)
+            ).mappings().all()
+            countries = [dict(row) for row in rows]
+            list_body = current_app.json.dumps({'success': True, 'data': countries})
+            by_iso = {country['iso_code']: country for country in countries}
+            
+            # Tabela ainda vazia (seed pendente): não fixa o cache
+            if not countries:
+                return list_body, by_iso
+            _countries_cache = (list_body, by_iso)
+    
+    return _countries_cache
+
 @countries_bp.route('/countries', methods=['GET'])
 def get_countries():
     """
     Retorna a lista de todos os países com seus códigos ISO e DDI.
     Utilizado pelo frontend para o seletor de países na tela de registo.
     """
-    countries = Country.query.order_by(Country.name).all()
-    return jsonify({
-        'success': True,
-        'data': [country.to_dict() for country in countries]
-    })
+    list_body, _ = _load_countries()
+    return Response(list_body, mimetype='application/json')
 
 @countries_bp.route('/countries/<iso_code>', methods=['GET'])
 def get_country_by_iso(iso_code):
     """
     Retorna os detalhes de um país específico pelo seu código ISO.
     """
-    country = Country.query.filter_by(iso_code=iso_code.upper()).first()
+    _, by_iso = _load_countries()
+    country = by_iso.get(iso_code.upper())
     
     if not country:
         return jsonify({
@@ -30,5 +62,5 @@ def get_country_by_iso(iso_code):
     
     return jsonify({
         'success': True,
-        'data': country.to_dict()
+        'data': country
     })
@@ -1,17 +1,68 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, current_app, request, jsonify
 from src.models import db
 from src.models.user import User
 from src.services.email_service import EmailService
-import random
-import string
+import hmac
+import secrets
 import os
+import threading
+import time
+
+# Redis opcional para os códigos (compartilhados entre workers)
+try:
+    import redis
+    REDIS_AVAILABLE = True
+except ImportError:
+    REDIS_AVAILABLE = False
 
 email_routes = Blueprint('email_routes', __name__)
 email_service = EmailService()
 
-# Dicionário para armazenar códigos de verificação temporários
+# Modo de desenvolvimento lido uma vez (alterado pelos endpoints set-*-mode)
+DEV_MODE = os.getenv('DEV_MODE', 'true').lower() == 'true'
+
+# Códigos de verificação expiram em 10 minutos
+VERIFICATION_CODE_TTL = 600
+
+REDIS_URL = os.getenv('REDIS_URL')
+_redis = redis.Redis.from_url(REDIS_URL, decode_responses=True) if REDIS_AVAILABLE and REDIS_URL else None
+
+# Fallback em memória (um único worker): email -> (código, expira_em)
 verification_codes = {}
 
+def _store_code(email, code):
+    """Armazena o código de verificação com expiração"""
+    if _redis is not None:
+        _redis.setex(f'verif:{email}', VERIFICATION_CODE_TTL, code)
+        return
+    
+    now = time.monotonic()
+    if len(verification_codes) > 10000:
+        for key in [k for k, (_, exp) in verification_codes.items() if exp <= now]:
+            del verification_codes[key]
+    verification_codes[email] = (code, now + VERIFICATION_CODE_TTL)
+
+def _get_code(email):
+    """Retorna o código ainda válido para o email (ou None)"""
+    if _redis is not None:
+        return _redis.get(f'verif:{email}')
+    
+    entry = verification_codes.get(email)
+    if entry is None:
+        return None
+    code, expires_at = entry
+    if expires_at <= time.monotonic():
+        verification_codes.pop(email, None)
+        return None
+    return code
+
+def _delete_code(email):
+    """Remove o código após verificação bem-sucedida"""
+    if _redis is not None:
+        _redis.delete(f'verif:{email}')
+    else:
+        verification_codes.pop(email, None)
+
 @email_routes.route('/api/check-email', methods=['GET'])
 def check_email():
     """Verifica se um email já está em uso"""
@@ -24,12 +75,12 @@ def check_email():
             'exists': False
         }), 400
     
-    # Verificar se o email já existe no banco de dados
-    user = User.query.filter_by(email=email).first()
+    # Verificar se o email já existe no banco de dados (SELECT EXISTS, sem carregar o usuário)
+    exists = db.session.query(db.exists().where(User.email_equals(email))).scalar()
     
     return jsonify({
         'success': True,
-        'exists': user is not None
+        'exists': bool(exists)
     })
 
 @email_routes.route('/api/check-username', methods=['GET'])
@@ -44,12 +95,12 @@ def check_username():
             'exists': False
         }), 400
     
-    # Verificar se o username já existe no banco de dados
-    user = User.query.filter_by(username=username).first()
+    # Verificar se o username já existe no banco de dados (SELECT EXISTS, sem carregar o usuário)
+    exists = db.session.query(db.exists().where(User.username == username)).scalar()
     
     return jsonify({
         'success': True,
-        'exists': user is not None
+        'exists': bool(exists)
     })
 
 @email_routes.route('/api/send-email-verification', methods=['POST'])
@@ -65,15 +116,12 @@ def send_email_verification():
         }), 400
     
     # Gerar código de verificação de 6 dígitos
-    verification_code = ''.join(random.choices(string.digits, k=6))
+    verification_code = f"{secrets.randbelow(1_000_000):06d}"
     
     # Armazenar o código para verificação posterior
-    verification_codes[email] = verification_code
+    _store_code(email, verification_code)
     
-    # Verificar modo de desenvolvimento
-    dev_mode = os.getenv('DEV_MODE', 'true').lower() == 'true'
-    
-    if dev_mode:
+    if DEV_MODE:
         # Modo de desenvolvimento - apenas simular
         print(f"[EMAIL ROUTES - DEV MODE] Código de verificação para {email}: {verification_code}")
         return jsonify({
@@ -96,60 +144,95 @@ def send_email_verification():
                 'message': 'Falha ao enviar email de verificação'
             }), 500
 
-@email_routes.route('/api/verify-email', methods=['POST'])
-def verify_email():
-    """Verifica o código de verificação enviado para o email"""
+def _verification_input():
+    """Extrai (email, código) do corpo; resposta de erro 400 se faltar algum"""
     data = request.json
     email = data.get('email')
     code = data.get('code')
     
     if not email or not code:
-        return jsonify({
+        return None, None, (jsonify({
             'success': False,
             'message': 'Email ou código não fornecido'
-        }), 400
-    
-    # Verificar o código
-    stored_code = verification_codes.get(email)
-    
-    # Verificar modo de desenvolvimento
-    dev_mode = os.getenv('DEV_MODE', 'true').lower() == 'true'
+        }), 400)
+    return email, code, None
+
+def _check_stored_code(email, code):
+    """Compara com o código armazenado e o consome se válido"""
+    stored_code = _get_code(email)
     
-    # Para desenvolvimento, aceitar o código 123456
-    if dev_mode and code == '123456':
+    # Tempo constante: não vaza o prefixo do código pelo tempo de resposta
+    if stored_code and hmac.compare_digest(stored_code.encode(), str(code).encode()):
         # Limpar o código após verificação bem-sucedida
-        if email in verification_codes:
-            del verification_codes[email]
+        _delete_code(email)
         
         return jsonify({
             'success': True,
-            'message': 'Email verificado com sucesso (modo dev)'
+            'message': 'Email verificado com sucesso'
         })
     
-    # Verificação normal
-    if stored_code and stored_code == code:
+    return jsonify({
+        'success': False,
+        'message': 'Código de verificação inválido'
+    }), 400
+
+def verify_email_prod():
+    """Verifica o código de verificação enviado para o email (produção)"""
+    email, code, error = _verification_input()
+    if error:
+        return error
+    
+    return _check_stored_code(email, code)
+
+def verify_email_dev():
+    """Verifica o código de verificação enviado para o email (desenvolvimento)"""
+    email, code, error = _verification_input()
+    if error:
+        return error
+    
+    # Para desenvolvimento, aceitar o código 123456
+    if code == '123456':
         # Limpar o código após verificação bem-sucedida
-        del verification_codes[email]
+        _delete_code(email)
         
         return jsonify({
             'success': True,
-            'message': 'Email verificado com sucesso'
+            'message': 'Email verificado com sucesso (modo dev)'
         })
     
-    return jsonify({
-        'success': False,
-        'message': 'Código de verificação inválido'
-    }), 400
+    return _check_stored_code(email, code)
+
+# A view de verificação é escolhida pelo modo na carga do módulo; os
+# endpoints set-*-mode trocam a função registrada em vez de testar
+# DEV_MODE a cada requisição
+VERIFY_EMAIL_ENDPOINT = f'{email_routes.name}.verify_email'
+_view_swap_lock = threading.Lock()
+
+email_routes.add_url_rule(
+    '/api/verify-email', 'verify_email',
+    verify_email_dev if DEV_MODE else verify_email_prod,
+    methods=['POST']
+)
+
+def _install_verify_email_view():
+    """Registra no app a view de verificação do modo atual"""
+    with _view_swap_lock:
+        current_app.view_functions[VERIFY_EMAIL_ENDPOINT] = (
+            verify_email_dev if DEV_MODE else verify_email_prod
+        )
 
 @email_routes.route('/api/set-production-mode', methods=['POST'])
 def set_production_mode():
     """Endpoint para ativar modo de produção"""
+    global DEV_MODE
     try:
         # Ativar modo de produção no serviço de email
         email_service.set_production_mode()
         
         # Definir variável de ambiente
         os.environ['DEV_MODE'] = 'false'
+        DEV_MODE = False
+        _install_verify_email_view()
         
         return jsonify({
             'success': True,
@@ -164,12 +247,15 @@ def set_production_mode():
 @email_routes.route('/api/set-dev-mode', methods=['POST'])
 def set_dev_mode():
     """Endpoint para ativar modo de desenvolvimento"""
+    global DEV_MODE
     try:
         # Ativar modo de desenvolvimento no serviço de email
         email_service.set_dev_mode()
         
         # Definir variável de ambiente
         os.environ['DEV_MODE'] = 'true'
+        DEV_MODE = True
+        _install_verify_email_view()
         
         return jsonify({
             'success': True,
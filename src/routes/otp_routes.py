@@ -1,16 +1,20 @@
 from flask import Blueprint, request, jsonify
+import hmac
+import os
 from src.models import db
 from src.models.user import User
 from src.models.phone_otp import PhoneOTP
-from src.services.otp_service import OTPService
-import random
-import string
+from src.services.otp_service import OTPService, codes_match
 
 otp_bp = Blueprint('otp_routes', __name__)
 
 # Dicionário para armazenar códigos OTP temporários
 otp_codes = {}
 
+# Reenvio em lote (console administrativo): desativado sem OTP_BATCH_TOKEN
+OTP_BATCH_TOKEN = os.getenv('OTP_BATCH_TOKEN')
+MAX_OTP_BATCH = 100
+
 @otp_bp.route('/api/check-phone', methods=['GET'])
 def check_phone():
     """Verifica se um número de telefone já está em uso"""
@@ -43,9 +47,6 @@ def send_otp():
             'message': 'Número de telefone não fornecido'
         }), 400
     
-    # Gerar código OTP de 6 dígitos
-    otp_code = ''.join(random.choices(string.digits, k=6))
-    
     try:
         # Salvar o OTP no banco de dados
         # O construtor espera 'phone_number' e gera o código internamente.
@@ -76,6 +77,53 @@ def send_otp():
             'message': f'Erro ao gerar código OTP: {str(e)}'
         }), 500
 
+@otp_bp.route('/api/send-otp-batch', methods=['POST'])
+def send_otp_batch():
+    """Envia códigos OTP para vários telefones numa única requisição (header X-Admin-Token)"""
+    token = request.headers.get('X-Admin-Token', '')
+    if not OTP_BATCH_TOKEN or not hmac.compare_digest(token.encode(), OTP_BATCH_TOKEN.encode()):
+        return jsonify({
+            'success': False,
+            'message': 'Não autorizado'
+        }), 403
+    
+    data = request.get_json(silent=True) or {}
+    phones = data.get('phones')
+    if not isinstance(phones, list) or not phones or not all(isinstance(phone, str) and phone for phone in phones):
+        return jsonify({
+            'success': False,
+            'message': 'Lista de telefones não fornecida'
+        }), 400
+    
+    phones = list(dict.fromkeys(phones))
+    if len(phones) > MAX_OTP_BATCH:
+        return jsonify({
+            'success': False,
+            'message': f'Máximo de {MAX_OTP_BATCH} telefones por lote'
+        }), 400
+    
+    try:
+        # Um registro por telefone, gravados num único commit; o SMS leva o mesmo código
+        phone_otps = [PhoneOTP(phone_number=phone) for phone in phones]
+        db.session.add_all(phone_otps)
+        db.session.commit()
+        
+        results = OTPService().send_otp_batch(
+            phones, codes={phone_otp.phone_number: phone_otp.otp_code for phone_otp in phone_otps}
+        )
+        
+        return jsonify({
+            'success': True,
+            'message': f'{sum(results.values())} de {len(results)} códigos OTP enviados',
+            'results': results
+        })
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({
+            'success': False,
+            'message': f'Erro ao enviar códigos OTP: {str(e)}'
+        }), 500
+
 @otp_bp.route('/api/verify-otp', methods=['POST'])
 def verify_otp():
     """Verifica o código OTP enviado para o número de telefone"""
@@ -99,7 +147,7 @@ def verify_otp():
         print(f"OTP encontrado no banco: {phone_otp}")
         
         # Verificar se o código é válido (123456 para desenvolvimento ou código do banco)
-        if code == '123456' or (phone_otp and phone_otp.otp_code == code and phone_otp.is_valid()):
+        if codes_match('123456', code) or (phone_otp and codes_match(phone_otp.otp_code, code) and phone_otp.is_valid()):
             print(f"Código OTP válido para o telefone {phone}")
             
             # Atualizar o status de verificação no banco de dados
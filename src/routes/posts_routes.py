@@ -9,6 +9,7 @@ import sqlite3
 import os
 from datetime import datetime
 from flask import Blueprint, request, jsonify
+from services.timeline_cache import invalidate_timelines, record_engagement
 
 # Criar blueprint
 posts_bp = Blueprint('posts', __name__)
@@ -214,6 +215,9 @@ def create_post():
         conn.commit()
         conn.close()
         
+        # Novo post: timelines em cache ficam desatualizadas
+        invalidate_timelines()
+        
         # Retornar post criado
         return jsonify({
             "success": True,
@@ -304,7 +308,9 @@ def like_post(post_id):
         cursor = conn.cursor()
         
         # Verificar se post existe
-        cursor.execute("SELECT id, likes_count FROM posts WHERE id = ? AND is_deleted = 0", (post_id,))
+        cursor.execute(
+            "SELECT id, likes_count, privacy, created_at FROM posts WHERE id = ? AND is_deleted = 0", (post_id,)
+        )
         post = cursor.fetchone()
         
         if not post:
@@ -337,6 +343,11 @@ def like_post(post_id):
         conn.commit()
         conn.close()
         
+        # Ranking de trending reflete a curtida sem esperar o job
+        # (só posts públicos entram no trending, como em scripts/compute_trending.py)
+        if (post['privacy'] or '').lower() == 'public':
+            record_engagement(post_id, 'like', post['created_at'], 1 if action == 'liked' else -1)
+        
         return jsonify({
             "success": True,
             "message": message,
@@ -2,10 +2,15 @@
 
 from flask import Blueprint, request, jsonify
 from src.models import db
-from src.models.user import User
+from src.models.user import USER_DICT_COLS, User, normalize_email, user_row_to_dict
+from sqlalchemy import select
+from sqlalchemy.orm import raiseload
 
 profile_bp = Blueprint('profile', __name__)
 
+# to_dict() só usa colunas: qualquer lazy load de relacionamento vira erro explícito (evita N+1)
+_USER_LOAD_OPTIONS = (raiseload('*'),)
+
 @profile_bp.route('/api/users', methods=['POST'])
 def create_user():
     """Criar um novo usuário"""
@@ -21,26 +26,25 @@ def create_user():
                     'message': f'{field} é obrigatório'
                 }), 400
         
-        # Verificar se email já existe
-        existing_user = User.query.filter_by(email=data['email']).first()
-        if existing_user:
-            return jsonify({
-                'success': False,
-                'message': 'Email já está em uso'
-            }), 400
+        email = normalize_email(data['email'])
+        
+        # Verificar email/username em uma única consulta (só as duas colunas);
+        # conflito de email tem prioridade na mensagem
+        email_match = User.email_equals(email)
+        conflict = db.session.query(User.email, User.username).filter(
+            email_match | (User.username == data['username'])
+        ).order_by(email_match.desc()).first()
         
-        # Verificar se username já existe
-        existing_username = User.query.filter_by(username=data['username']).first()
-        if existing_username:
+        if conflict:
             return jsonify({
                 'success': False,
-                'message': 'Username já está em uso'
+                'message': 'Email já está em uso' if normalize_email(conflict.email) == email else 'Username já está em uso'
             }), 400
         
         # Criar novo usuário
         new_user = User(
             username=data['username'],
-            email=data['email'],
+            email=email,
             phone=data.get('phone'),
             first_name=data.get('first_name'),
             last_name=data.get('last_name'),
@@ -67,7 +71,7 @@ def create_user():
 def update_user(user_id):
     """Atualizar dados do usuário"""
     try:
-        user = User.query.get(user_id)
+        user = db.session.get(User, user_id, options=_USER_LOAD_OPTIONS)
         if not user:
             return jsonify({
                 'success': False,
@@ -109,17 +113,24 @@ def update_user(user_id):
 def get_user(user_id):
     """Obter dados do usuário"""
     try:
-        user = User.query.get(user_id)
-        if not user:
+        # Somente leitura: colunas direto em Row, sem objeto ORM na sessão
+        row = db.session.execute(
+            select(*USER_DICT_COLS).where(User.id == user_id)
+        ).mappings().first()
+        if not row:
             return jsonify({
                 'success': False,
                 'message': 'Usuário não encontrado'
             }), 404
         
-        return jsonify({
+        response = jsonify({
             'success': True,
-            'user': user.to_dict()
+            'user': user_row_to_dict(row)
         })
+        # Cache curto no cliente + revalidação por ETag (304 sem corpo)
+        response.headers['Cache-Control'] = 'private, max-age=30'
+        response.add_etag()
+        return response.make_conditional(request)
         
     except Exception as e:
         return jsonify({
@@ -146,8 +157,10 @@ def create_profile():
                 'message': 'Email e username são obrigatórios'
             }), 400
         
+        email = normalize_email(email)
+        
         # Buscar usuário existente por email
-        user = User.query.filter_by(email=email).first()
+        user = User.query.options(*_USER_LOAD_OPTIONS).filter(User.email_equals(email)).first()
         
         if user:
             # Atualizar usuário existente
@@ -1,23 +1,22 @@
 from flask import Blueprint, request, jsonify
 from src.models import db
-from src.models.user import User
-import random
+from src.models.user import User, normalize_email
 import string
 import os
-from werkzeug.utils import secure_filename
+from src.routes.upload_routes import file_too_large_response, save_upload_stream
 
 profile_routes = Blueprint('profile_routes', __name__)
 
 # Configuração para upload de imagens
 UPLOAD_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'uploads')
-ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif'}
+ALLOWED_EXTENSIONS = frozenset({'png', 'jpg', 'jpeg', 'gif'})
 
 # Criar pasta de uploads se não existir
 os.makedirs(UPLOAD_FOLDER, exist_ok=True)
 
 def allowed_file(filename):
-    return '.' in filename and \
-           filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
+    i = filename.rfind('.')
+    return i > 0 and filename[i + 1:].lower() in ALLOWED_EXTENSIONS
 
 @profile_routes.route('/api/create-profile', methods=['POST'])
 def create_profile():
@@ -36,11 +35,10 @@ def create_profile():
         if 'profile_image' in request.files:
             file = request.files['profile_image']
             if file and file.filename and allowed_file(file.filename):
-                filename = secure_filename(file.filename)
-                # Gerar nome único para o arquivo
-                unique_filename = f"{username}_{random.randint(1000, 9999)}_{filename}"
-                file_path = os.path.join(UPLOAD_FOLDER, unique_filename)
-                file.save(file_path)
+                # Nome = SHA-256 do conteúdo (sem colisões; imagens idênticas deduplicadas)
+                unique_filename, _ = save_upload_stream(file, UPLOAD_FOLDER)
+                if unique_filename is None:
+                    return file_too_large_response()
                 profile_image_path = f"/uploads/{unique_filename}"
     else:
         # JSON
@@ -58,23 +56,28 @@ def create_profile():
             'message': 'Dados incompletos para criação do perfil'
         }), 400
     
+    email = normalize_email(email)
+    
     try:
-        # Verificar se o usuário já existe
-        existing_user = User.query.filter_by(email=email).first()
-        if existing_user:
-            # Atualizar usuário existente
-            existing_user.username = username
-            existing_user.first_name = first_name
-            existing_user.last_name = last_name
+        # Verificar se o usuário já existe (só o id, via índice de email)
+        existing_id = db.session.query(User.id).filter(User.email_equals(email)).scalar()
+        if existing_id:
+            # Atualizar usuário existente sem carregar a linha
+            changes = {
+                'username': username,
+                'first_name': first_name,
+                'last_name': last_name
+            }
             if profile_image_path:
-                existing_user.profile_image = profile_image_path
+                changes['profile_image'] = profile_image_path
             
+            db.session.execute(db.update(User).where(User.id == existing_id).values(**changes))
             db.session.commit()
             
             return jsonify({
                 'success': True,
                 'message': 'Perfil atualizado com sucesso',
-                'user_id': existing_user.id
+                'user_id': existing_id
             })
         
         # Criar novo usuário
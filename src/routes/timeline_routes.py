@@ -4,10 +4,17 @@ Rotas específicas para Timeline personalizada
 Endpoints: timeline principal, trending, descobrir
 """
 
-from flask import Blueprint, request, jsonify, g
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from flask import Blueprint, request, jsonify, g, current_app
 
 # ✅ CORRIGIDO: Imports absolutos
-from services.timeline_service import timeline_service
+from services.timeline_service import DEFAULT_PREFETCH, timeline_service
+from services.timeline_cache import (
+    TIMELINE_CACHE_TTL, TRENDING_CACHE_TTL, get_or_set, read_trending, timeline_key, trending_key
+)
 
 # Import de auth - com fallback se não existir
 try:
@@ -30,10 +37,11 @@ except ImportError:
 
 # Import i18n
 try:
-    from i18n import i18n_utils, _
+    from i18n import i18n_utils, _, translator
     I18N_AVAILABLE = True
 except ImportError:
     I18N_AVAILABLE = False
+    translator = None
     def _(text, **kwargs): return text.format(**kwargs) if kwargs else text
     def i18n_utils_format_api_response(data, message, success):
         return {"success": success, "message": message, "data": data}
@@ -42,9 +50,93 @@ except ImportError:
         def format_api_response(data, message, success):
             return {"success": success, "message": message, "data": data}
 
+logger = logging.getLogger(__name__)
+
 # Criar blueprint
 timeline_bp = Blueprint('timeline', __name__)
 
+# Chaves de tradução estáticas (sem interpolação)
+# format_api_response já traduz a chave: passar a chave, não _(chave)
+TR_TIMELINE_SUCCESS = 'timeline.success'
+
+# Algoritmos: (chave de tradução, nome sem i18n, descrição, fatores)
+_ALGORITHMS = {
+    'smart': (
+        'timeline.algorithms.smart', 'Smart Timeline',
+        'Algoritmo inteligente baseado em relevância e engajamento',
+        ['engagement', 'recency', 'content_type', 'author_relevance']
+    ),
+    'chronological': (
+        'timeline.algorithms.chronological', 'Chronological',
+        'Ordem cronológica (mais recente primeiro)',
+        ['created_at']
+    ),
+    'popular': (
+        'timeline.algorithms.popular', 'Popular',
+        'Posts com mais curtidas e comentários',
+        ['likes_count', 'comments_count', 'shares_count']
+    )
+}
+
+# Pré-carga da página seguinte em segundo plano: no máximo uma por usuário por vez
+_PREFETCH_POOL = ThreadPoolExecutor(max_workers=4, thread_name_prefix='timeline-prefetch')
+_prefetching = set()
+_prefetch_lock = threading.Lock()
+
+def _load_timeline(user_id, algorithm, offset, limit, cursor):
+    """Página da timeline (cache curto por usuário/algoritmo/página)"""
+    return get_or_set(
+        timeline_key(user_id, algorithm, offset, limit, cursor),
+        TIMELINE_CACHE_TTL,
+        lambda: timeline_service.get_user_timeline(
+            user_id=user_id,
+            limit=limit,
+            offset=offset,
+            algorithm=algorithm,
+            prefetch=DEFAULT_PREFETCH,  # curtidas e prévia de comentários em lote
+            cursor=cursor
+        )
+    )
+
+def _prefetch_next_page(app, user_id, algorithm, limit, cursor):
+    """Aquece o cache da página seguinte (?cursor=next_cursor), fora do request"""
+    try:
+        with app.app_context():
+            _load_timeline(user_id, algorithm, 0, limit, cursor)
+    except Exception as e:
+        logger.warning("Erro ao pré-carregar timeline: %s", e)
+    finally:
+        with _prefetch_lock:
+            _prefetching.discard(user_id)
+
+def _schedule_prefetch(user_id, algorithm, limit, timeline_data):
+    """Agenda a pré-carga se houver próxima página e nenhuma em andamento para o usuário"""
+    next_cursor = timeline_data.get('metadata', {}).get('next_cursor')
+    if not next_cursor:
+        return
+    
+    with _prefetch_lock:
+        if user_id in _prefetching:
+            return
+        _prefetching.add(user_id)
+    
+    _PREFETCH_POOL.submit(
+        _prefetch_next_page, current_app._get_current_object(), user_id, algorithm, limit, next_cursor
+    )
+
+@lru_cache(maxsize=8)
+def _algorithms_payload(locale):
+    """Lista de algoritmos traduzida, montada uma vez por locale"""
+    names = translator.get_many([key for key, *_rest in _ALGORITHMS.values()], locale) if locale else {}
+    return {
+        algorithm: {
+            'name': names.get(key, fallback_name),
+            'description': description,
+            'factors': factors
+        }
+        for algorithm, (key, fallback_name, description, factors) in _ALGORITHMS.items()
+    }
+
 @timeline_bp.route('/api/timeline', methods=['GET'])
 @auth_required
 def get_timeline():
@@ -54,6 +146,9 @@ def get_timeline():
     - algorithm: smart|chronological|popular (default: smart)
     - limit: número de posts (default: 20, max: 100)
     - offset: pular posts (paginação)
+    - cursor: metadata.next_cursor da página anterior (paginação por chave;
+      substitui offset e não degrada em páginas profundas). A página do
+      next_cursor é pré-carregada em segundo plano
     """
     try:
         user_id = g.current_user.id
@@ -62,23 +157,27 @@ def get_timeline():
         algorithm = request.args.get('algorithm', 'smart')
         limit = min(int(request.args.get('limit', 20)), 100)
         offset = int(request.args.get('offset', 0))
+        cursor = request.args.get('cursor') or None
         
-        # Gerar timeline
-        timeline_data = timeline_service.get_user_timeline(
-            user_id=user_id,
-            limit=limit,
-            offset=offset,
-            algorithm=algorithm
-        )
+        # Gerar timeline (cache curto por usuário/algoritmo/página)
+        timeline_data = _load_timeline(user_id, algorithm, offset, limit, cursor)
+        _schedule_prefetch(user_id, algorithm, limit, timeline_data)
         
         return jsonify(i18n_utils.format_api_response(
-            timeline_data, _('timeline.success'), True
+            timeline_data, TR_TIMELINE_SUCCESS, True
         ) if I18N_AVAILABLE else {
             "success": True,
             "message": "Timeline loaded successfully",
             "data": timeline_data
         }), 200
         
+    except ValueError as e:
+        # limit/offset não numéricos ou cursor inválido
+        return jsonify({
+            "success": False,
+            "message": f"Invalid pagination parameters: {str(e)}"
+        }), 400
+        
     except Exception as e:
         return jsonify(i18n_utils.format_api_response(
             None, _('posts.error.unexpected', error=str(e)), False
@@ -98,11 +197,21 @@ def get_trending():
     try:
         limit = min(int(request.args.get('limit', 10)), 50)
         
-        # Buscar trending posts
-        trending_data = timeline_service.get_trending_posts(limit=limit)
+        # Ranking pré-calculado pelo job (scripts/compute_trending.py)
+        ranked = read_trending(limit)
+        if ranked is not None:
+            trending_data = timeline_service.get_ranked_trending_posts(ranked)
+        else:
+            # Sem Redis/job: cálculo sob demanda com cache global
+            trending_data = get_or_set(
+                trending_key(limit),
+                TRENDING_CACHE_TTL,
+                lambda: timeline_service.get_trending_posts(limit=limit),
+                cacheable=lambda data: 'error' not in data
+            )
         
         return jsonify(i18n_utils.format_api_response(
-            trending_data, _('timeline.success'), True
+            trending_data, TR_TIMELINE_SUCCESS, True
         ) if I18N_AVAILABLE else {
             "success": True,
             "message": "Trending posts loaded successfully",
@@ -123,26 +232,10 @@ def get_timeline_algorithms():
     Lista de algoritmos disponíveis para timeline
     """
     try:
-        algorithms = {
-            'smart': {
-                'name': _('timeline.algorithms.smart') if I18N_AVAILABLE else 'Smart Timeline',
-                'description': 'Algoritmo inteligente baseado em relevância e engajamento',
-                'factors': ['engagement', 'recency', 'content_type', 'author_relevance']
-            },
-            'chronological': {
-                'name': _('timeline.algorithms.chronological') if I18N_AVAILABLE else 'Chronological',
-                'description': 'Ordem cronológica (mais recente primeiro)',
-                'factors': ['created_at']
-            },
-            'popular': {
-                'name': _('timeline.algorithms.popular') if I18N_AVAILABLE else 'Popular',
-                'description': 'Posts com mais curtidas e comentários',
-                'factors': ['likes_count', 'comments_count', 'shares_count']
-            }
-        }
+        algorithms = _algorithms_payload(translator.get_locale() if I18N_AVAILABLE else None)
         
         return jsonify(i18n_utils.format_api_response(
-            {'algorithms': algorithms}, _('timeline.success'), True
+            {'algorithms': algorithms}, TR_TIMELINE_SUCCESS, True
         ) if I18N_AVAILABLE else {
             "success": True,
             "message": "Timeline algorithms retrieved",
@@ -5,35 +5,203 @@ Endpoints básicos para upload de arquivos
 VERSÃO SIMPLIFICADA - SEM DEPENDÊNCIAS EXTERNAS
 """
 
+import hashlib
+import mimetypes
 import os
-from flask import Blueprint, request, jsonify, send_from_directory
-from werkzeug.utils import secure_filename
+import re
+import secrets
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from flask import Blueprint, Response, abort, current_app, request, jsonify, send_from_directory
+from werkzeug.security import safe_join
+
+# Mesmo registry de User/Post (imports sem o prefixo src.)
+from models import db
+from models.file_upload import FileUpload
+from services.file_service import CHUNKED_UPLOAD_CATEGORIES, MAX_CHUNK_SIZE, file_service
 
 # ✅ Criar blueprint (SEMPRE PRESENTE)
 upload_bp = Blueprint('upload', __name__)
 
 # Configurações básicas
 UPLOAD_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'uploads')
-ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif', 'webp', 'bmp', 'pdf', 'doc', 'docx', 'txt'}
+ALLOWED_EXTENSIONS = frozenset({'png', 'jpg', 'jpeg', 'gif', 'webp', 'bmp', 'pdf', 'doc', 'docx', 'txt'})
 MAX_FILE_SIZE = 10 * 1024 * 1024  # 10MB
 
-# Criar diretório de uploads se não existir
-os.makedirs(UPLOAD_DIR, exist_ok=True)
-os.makedirs(os.path.join(UPLOAD_DIR, 'avatars'), exist_ok=True)
-os.makedirs(os.path.join(UPLOAD_DIR, 'posts'), exist_ok=True)
-os.makedirs(os.path.join(UPLOAD_DIR, 'documents'), exist_ok=True)
+UPLOAD_CATEGORIES = ('avatars', 'posts', 'documents')
+
+# Criar diretórios de uploads se não existirem (makedirs da categoria cria UPLOAD_DIR)
+for _category in UPLOAD_CATEGORIES:
+    os.makedirs(os.path.join(UPLOAD_DIR, _category), exist_ok=True)
+
+# Nome já seguro (caso comum) passa direto; senão os caracteres fora da lista viram '_'
+_SAFE_NAME = re.compile(r'[A-Za-z0-9._-]{1,255}\Z')
+_UNSAFE_CHARS = re.compile(r'[^A-Za-z0-9._-]+')
+_EXTENSION = re.compile(r'[^.]\.([A-Za-z0-9]+)\Z')
+
+def sanitize_upload_name(filename):
+    """
+    Valida e sanitiza o nome enviado em uma passada (substitui secure_filename + allowed_file)
+    Retorna (nome_seguro, extensão) se a extensão for permitida, senão None
+    """
+    # Só o último componente do caminho (clientes Windows enviam C:\...\foto.jpg)
+    name = filename.rsplit('/', 1)[-1].rsplit('\\', 1)[-1]
+    if not _SAFE_NAME.match(name):
+        name = _UNSAFE_CHARS.sub('_', name).strip('_')[:255]
+    
+    match = _EXTENSION.search(name)
+    if match is None:
+        return None
+    ext = match.group(1).lower()
+    if ext not in ALLOWED_EXTENSIONS:
+        return None
+    return name, ext
+
+# Bloco de leitura do upload (64 KiB)
+UPLOAD_CHUNK_SIZE = 64 * 1024
+
+# Arquivos gravados pelo SHA-256 do conteúdo: o nome nunca muda de conteúdo
+CONTENT_ADDRESSED_NAME = re.compile(r'^[0-9a-f]{64}(\.[a-z0-9]+)?$')
+IMMUTABLE_MAX_AGE = 31536000
+# Nomes antigos (não hasheados) podem ser sobrescritos: cache curto + revalidação por ETag
+UPLOAD_MAX_AGE = 86400
+
+def save_upload_stream(file, directory, ext=None, max_size=MAX_FILE_SIZE):
+    """
+    Grava o upload em blocos (uma única leitura do corpo), contando os bytes e
+    calculando o SHA-256; o arquivo final se chama <sha256>.<ext>
+    Retorna (nome, tamanho), ou (None, tamanho) se passar de max_size (nada é gravado)
+    Conteúdo já existente não é regravado (uploads idênticos são deduplicados)
+    """
+    if ext is None:
+        ext = file.filename.rsplit('.', 1)[1].lower() if '.' in file.filename else ''
+    digest = hashlib.sha256()
+    total = 0
+    
+    # Temporário no mesmo diretório: o rename final é atômico
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.part')
+    try:
+        with os.fdopen(fd, 'wb') as out:
+            for chunk in iter(lambda: file.stream.read(UPLOAD_CHUNK_SIZE), b''):
+                total += len(chunk)
+                if total > max_size:
+                    break
+                digest.update(chunk)
+                out.write(chunk)
+        
+        if total > max_size:
+            os.unlink(tmp_path)
+            return None, total
+        
+        stored_name = f"{digest.hexdigest()}.{ext}" if ext else digest.hexdigest()
+        final_path = os.path.join(directory, stored_name)
+        if os.path.exists(final_path):
+            os.unlink(tmp_path)
+        else:
+            os.replace(tmp_path, final_path)
+        return stored_name, total
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+
+def record_upload(user_id, category, unique_filename, original_filename, file_path, file_url, file_size,
+                  related_id=None, related_type=None, replace_category=False, file_hash=None):
+    """
+    Registra o upload em file_uploads (a listagem consulta o banco, não o disco)
+    O nome é o hash do conteúdo: reenvio do mesmo arquivo atualiza o registro
+    replace_category=True desativa os demais arquivos do usuário na categoria (avatar)
+    file_hash: SHA-256 do conteúdo (deduzido do nome <hash>.<ext> se omitido); é a
+    referência que file_service.delete_file consulta antes de apagar conteúdo compartilhado
+    """
+    if file_hash is None:
+        stored_name = unique_filename.rsplit('/', 1)[-1]
+        if CONTENT_ADDRESSED_NAME.match(stored_name):
+            file_hash = stored_name.split('.', 1)[0]
+    
+    if replace_category:
+        FileUpload.query.filter(
+            FileUpload.user_id == user_id,
+            FileUpload.category == category,
+            FileUpload.filename != unique_filename,
+            FileUpload.is_active == True
+        ).update({'is_active': False}, synchronize_session=False)
+    
+    upload = FileUpload.query.filter_by(
+        user_id=user_id, category=category, filename=unique_filename
+    ).first()
+    
+    if upload is None:
+        file_ext = unique_filename.rsplit('.', 1)[1].lower() if '.' in unique_filename else ''
+        upload = FileUpload.create_from_upload({
+            'filename': unique_filename,
+            'original_filename': original_filename,
+            'file_path': file_path,
+            'file_url': file_url,
+            'file_size': file_size,
+            'mime_type': mimetypes.guess_type(unique_filename)[0] or 'application/octet-stream',
+            'file_hash': file_hash,
+            'file_ext': file_ext
+        }, user_id, category, related_id=related_id, related_type=related_type)
+        db.session.add(upload)
+    else:
+        upload.file_size = file_size
+        upload.file_hash = upload.file_hash or file_hash
+        upload.is_active = True
+        upload.updated_at = datetime.utcnow()
+    
+    db.session.commit()
+    return upload
+
+# Metadados gravados fora do request: a resposta sai assim que os bytes estão no disco.
+# Um único worker preserva a ordem (ex: troca de avatar) e evita disputa de escrita no SQLite
+_METADATA_POOL = ThreadPoolExecutor(max_workers=1, thread_name_prefix='upload-metadata')
+
+def _record_upload_now(app, *args, **kwargs):
+    """Executa record_upload com app context próprio; retorna o id do registro (exceções propagam)"""
+    with app.app_context():
+        try:
+            return record_upload(*args, **kwargs).id
+        except Exception:
+            db.session.rollback()
+            raise
+
+def _record_upload_job(app, upload_id, *args, **kwargs):
+    """
+    record_upload em background (idempotente: reenvio só atualiza)
+    O resultado fica no status do upload: a falha é consultável em /api/upload/status/<upload_id>
+    e o cliente pode reenviar o arquivo
+    """
+    try:
+        file_id = _record_upload_now(app, *args, **kwargs)
+    except Exception as e:
+        app.logger.error("Erro ao registrar upload %s: %s", args[2], e)
+        file_service.set_upload_status(upload_id, 'failed', {
+            'success': False,
+            'error': str(e),
+            'code': 'RECORD_FAILED',
+            'filename': args[2]
+        })
+        return
+    file_service.set_upload_status(upload_id, 'done', {'success': True, 'file_id': file_id, 'filename': args[2]})
 
-def allowed_file(filename):
-    """Verifica se o arquivo tem extensão permitida"""
-    return '.' in filename and \
-           filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
+def enqueue_record_upload(*args, **kwargs):
+    """
+    Agenda record_upload em background (mesmos argumentos)
+    Retorna o upload_id do registro ('processing' até gravar; depois 'done' ou 'failed')
+    """
+    upload_id = secrets.token_hex(16)
+    file_service.set_upload_status(upload_id, 'processing')
+    _METADATA_POOL.submit(_record_upload_job, current_app._get_current_object(), upload_id, *args, **kwargs)
+    return upload_id
 
-def get_file_size(file):
-    """Obtém tamanho do arquivo"""
-    file.seek(0, os.SEEK_END)
-    size = file.tell()
-    file.seek(0)
-    return size
+def file_too_large_response():
+    """Resposta padrão para arquivo acima do limite"""
+    return jsonify({
+        "success": False,
+        "message": f"File too large. Max size: {MAX_FILE_SIZE // (1024*1024)}MB"
+    }), 413
 
 @upload_bp.route('/api/upload/info', methods=['GET'])
 def upload_info():
@@ -44,7 +212,11 @@ def upload_info():
             'version': '1.0.0-basic',
             'max_file_size': f"{MAX_FILE_SIZE // (1024*1024)}MB",
             'allowed_extensions': list(ALLOWED_EXTENSIONS),
-            'supported_categories': ['avatars', 'posts', 'documents'],
+            'supported_categories': list(UPLOAD_CATEGORIES),
+            'chunked_upload': {
+                'max_chunk_size': f"{MAX_CHUNK_SIZE // (1024*1024)}MB",
+                'endpoints': ['/api/upload/chunk', '/api/upload/finalize']
+            },
             'upload_directory': UPLOAD_DIR
         }
         
@@ -80,32 +252,28 @@ def upload_avatar():
                 "message": "No file selected"
             }), 400
         
-        if not allowed_file(file.filename):
+        sanitized = sanitize_upload_name(file.filename)
+        if sanitized is None:
             return jsonify({
                 "success": False,
                 "message": f"File type not allowed. Use: {', '.join(ALLOWED_EXTENSIONS)}"
             }), 400
+        original_name, ext = sanitized
         
-        # Verificar tamanho
-        file_size = get_file_size(file)
-        if file_size > MAX_FILE_SIZE:
-            return jsonify({
-                "success": False,
-                "message": f"File too large. Max size: {MAX_FILE_SIZE // (1024*1024)}MB"
-            }), 400
-        
-        # Salvar arquivo
-        filename = secure_filename(file.filename)
-        unique_filename = f"user_{user_id}_avatar_{filename}"
+        # Salvar arquivo (nome = SHA-256 do conteúdo, gravado em streaming)
+        unique_filename, file_size = save_upload_stream(file, os.path.join(UPLOAD_DIR, 'avatars'), ext)
+        if unique_filename is None:
+            return file_too_large_response()
         file_path = os.path.join(UPLOAD_DIR, 'avatars', unique_filename)
         
-        file.save(file_path)
-        
         # URL para acessar o arquivo
         file_url = f"/uploads/avatars/{unique_filename}"
+        upload_id = enqueue_record_upload(int(user_id), 'avatars', unique_filename, original_name, file_path, file_url, file_size,
+                                          related_type='profile', replace_category=True)
         
         response_data = {
             'user_id': int(user_id),
+            'upload_id': upload_id,
             'avatar_url': file_url,
             'filename': unique_filename,
             'file_size': file_size,
@@ -144,32 +312,28 @@ def upload_document():
                 "message": "No file selected"
             }), 400
         
-        if not allowed_file(file.filename):
+        sanitized = sanitize_upload_name(file.filename)
+        if sanitized is None:
             return jsonify({
                 "success": False,
                 "message": f"File type not allowed. Use: {', '.join(ALLOWED_EXTENSIONS)}"
             }), 400
+        original_name, ext = sanitized
         
-        # Verificar tamanho
-        file_size = get_file_size(file)
-        if file_size > MAX_FILE_SIZE:
-            return jsonify({
-                "success": False,
-                "message": f"File too large. Max size: {MAX_FILE_SIZE // (1024*1024)}MB"
-            }), 400
-        
-        # Salvar arquivo
-        filename = secure_filename(file.filename)
-        unique_filename = f"user_{user_id}_{doc_type}_{filename}"
+        # Salvar arquivo (nome = SHA-256 do conteúdo, gravado em streaming)
+        unique_filename, file_size = save_upload_stream(file, os.path.join(UPLOAD_DIR, 'documents'), ext)
+        if unique_filename is None:
+            return file_too_large_response()
         file_path = os.path.join(UPLOAD_DIR, 'documents', unique_filename)
         
-        file.save(file_path)
-        
         # URL para acessar o arquivo
         file_url = f"/uploads/documents/{unique_filename}"
+        upload_id = enqueue_record_upload(int(user_id), 'documents', unique_filename, original_name, file_path, file_url, file_size,
+                                          related_id=doc_type, related_type='document')
         
         response_data = {
             'user_id': int(user_id),
+            'upload_id': upload_id,
             'document_url': file_url,
             'document_type': doc_type,
             'filename': unique_filename,
@@ -209,32 +373,28 @@ def upload_post_image():
                 "message": "No file selected"
             }), 400
         
-        if not allowed_file(file.filename):
+        sanitized = sanitize_upload_name(file.filename)
+        if sanitized is None:
             return jsonify({
                 "success": False,
                 "message": f"File type not allowed. Use: {', '.join(ALLOWED_EXTENSIONS)}"
             }), 400
+        original_name, ext = sanitized
         
-        # Verificar tamanho
-        file_size = get_file_size(file)
-        if file_size > MAX_FILE_SIZE:
-            return jsonify({
-                "success": False,
-                "message": f"File too large. Max size: {MAX_FILE_SIZE // (1024*1024)}MB"
-            }), 400
-        
-        # Salvar arquivo
-        filename = secure_filename(file.filename)
-        unique_filename = f"user_{user_id}_post_{post_id}_{filename}"
+        # Salvar arquivo (nome = SHA-256 do conteúdo, gravado em streaming)
+        unique_filename, file_size = save_upload_stream(file, os.path.join(UPLOAD_DIR, 'posts'), ext)
+        if unique_filename is None:
+            return file_too_large_response()
         file_path = os.path.join(UPLOAD_DIR, 'posts', unique_filename)
         
-        file.save(file_path)
-        
         # URL para acessar o arquivo
         file_url = f"/uploads/posts/{unique_filename}"
+        upload_id = enqueue_record_upload(int(user_id), 'posts', unique_filename, original_name, file_path, file_url, file_size,
+                                          related_id=post_id, related_type='post')
         
         response_data = {
             'user_id': int(user_id),
+            'upload_id': upload_id,
             'post_id': post_id,
             'image_url': file_url,
             'filename': unique_filename,
@@ -260,26 +420,26 @@ def list_user_files(user_id):
     try:
         category = request.args.get('category', 'all')
         
-        user_files = []
-        
-        # Procurar arquivos do usuário em todas as categorias
-        categories = ['avatars', 'posts', 'documents'] if category == 'all' else [category]
-        
-        for cat in categories:
-            cat_path = os.path.join(UPLOAD_DIR, cat)
-            if os.path.exists(cat_path):
-                for filename in os.listdir(cat_path):
-                    if filename.startswith(f"user_{user_id}_"):
-                        file_path = os.path.join(cat_path, filename)
-                        file_stats = os.stat(file_path)
-                        
-                        user_files.append({
-                            'filename': filename,
-                            'category': cat,
-                            'file_size': file_stats.st_size,
-                            'url': f"/uploads/{cat}/{filename}",
-                            'created_at': file_stats.st_mtime
-                        })
+        # Arquivos do usuário nas categorias pedidas (índice user_id + category)
+        categories = list(UPLOAD_CATEGORIES) if category == 'all' else [category]
+        
+        rows = db.session.query(
+            FileUpload.filename, FileUpload.category, FileUpload.file_size,
+            FileUpload.file_url, FileUpload.updated_at
+        ).filter(
+            FileUpload.user_id == user_id,
+            FileUpload.category.in_(categories),
+            FileUpload.is_active == True
+        ).all()
+        
+        # created_at mantém o formato anterior (timestamp epoch da última gravação)
+        user_files = [{
+            'filename': row.filename,
+            'category': row.category,
+            'file_size': row.file_size,
+            'url': row.file_url,
+            'created_at': row.updated_at.replace(tzinfo=timezone.utc).timestamp() if row.updated_at else None
+        } for row in rows]
         
         return jsonify({
             "success": True,
@@ -298,23 +458,225 @@ def list_user_files(user_id):
             "message": f"Error: {str(e)}"
         }), 500
 
+# Upload em partes (vídeos grandes): o cliente envia partes de 1-8MB e retoma
+# a partir de /api/upload/chunk/<upload_id> se a conexão cair
+_CHUNK_ERROR_STATUS = {'UPLOAD_NOT_FOUND': 404, 'FILE_TOO_LARGE': 413, 'CHUNK_TOO_LARGE': 413, 'SAVE_FAILED': 500,
+                       'RECORD_FAILED': 500}
+
+@upload_bp.route('/api/upload/chunk', methods=['POST'])
+def upload_chunk():
+    """Recebe uma parte (form: upload_id, chunk_index, total_chunks + arquivo 'chunk')"""
+    try:
+        chunk = request.files.get('chunk')
+        if chunk is None:
+            return jsonify({
+                "success": False,
+                "message": "No chunk provided"
+            }), 400
+        
+        try:
+            chunk_index = int(request.form.get('chunk_index', ''))
+            total_chunks = int(request.form.get('total_chunks', ''))
+        except ValueError:
+            return jsonify({
+                "success": False,
+                "message": "chunk_index and total_chunks must be integers"
+            }), 400
+        
+        result = file_service.save_chunk(request.form.get('upload_id', ''), chunk_index, chunk.stream, total_chunks)
+        if not result['success']:
+            return jsonify({
+                "success": False,
+                "message": result['error'],
+                "code": result['code']
+            }), _CHUNK_ERROR_STATUS.get(result['code'], 400)
+        
+        return jsonify({
+            "success": True,
+            "message": "Chunk received",
+            "data": {
+                'upload_id': result['upload_id'],
+                'chunk_index': result['chunk_index'],
+                'total_chunks': result['total_chunks'],
+                'received_chunks': result['received_chunks']
+            }
+        }), 200
+        
+    except Exception as e:
+        return jsonify({
+            "success": False,
+            "message": f"Upload error: {str(e)}"
+        }), 500
+
+@upload_bp.route('/api/upload/chunk/<upload_id>', methods=['GET'])
+def upload_chunk_status(upload_id):
+    """Partes já recebidas de um upload (para retomar após queda de conexão)"""
+    received = file_service.get_received_chunks(upload_id)
+    if received is None:
+        return jsonify({
+            "success": False,
+            "message": "Upload not found"
+        }), 404
+    
+    return jsonify({
+        "success": True,
+        "message": "Upload status",
+        "data": {
+            'upload_id': upload_id,
+            'received_chunks': received
+        }
+    }), 200
+
+@upload_bp.route('/api/upload/file', methods=['POST'])
+def upload_file_async():
+    """
+    Upload gravado em background (form: category, user_id + arquivo 'file')
+    Responde com upload_id assim que validado; o cliente consulta /api/upload/status/<upload_id>
+    """
+    try:
+        file = request.files.get('file')
+        if file is None or file.filename == '':
+            return jsonify({
+                "success": False,
+                "message": "No file provided"
+            }), 400
+        
+        user_id = int(request.form.get('user_id', 1))
+        category = request.form.get('category', 'posts')
+        if category not in CHUNKED_UPLOAD_CATEGORIES:
+            return jsonify({
+                "success": False,
+                "message": "Invalid category"
+            }), 400
+        
+        # Metadados registrados quando a gravação termina (o pool não tem app context);
+        # mesmo worker dos demais registros, e a falha marca o upload como 'failed'
+        app = current_app._get_current_object()
+        
+        def on_saved(file_info):
+            _METADATA_POOL.submit(_record_upload_now, app, user_id, category, file_info['filename'],
+                                  file_info['original_filename'], file_info['file_path'],
+                                  file_info['file_url'], file_info['file_size'],
+                                  file_hash=file_info['file_hash']).result()
+        
+        result = file_service.save_file_async(file, category, user_id, on_saved=on_saved)
+        if not result['success']:
+            return jsonify({
+                "success": False,
+                "message": result['error'],
+                "code": result['code']
+            }), _CHUNK_ERROR_STATUS.get(result['code'], 400)
+        
+        return jsonify({
+            "success": True,
+            "message": "Upload accepted",
+            "data": {
+                'upload_id': result['upload_id'],
+                'status': result['status'],
+                'status_url': f"/api/upload/status/{result['upload_id']}"
+            }
+        }), 202 if result['status'] == 'processing' else 201
+        
+    except Exception as e:
+        return jsonify({
+            "success": False,
+            "message": f"Upload error: {str(e)}"
+        }), 500
+
+@upload_bp.route('/api/upload/status/<upload_id>', methods=['GET'])
+def upload_status(upload_id):
+    """Status de um upload gravado em background (processing / done / failed)"""
+    status = file_service.get_upload_status(upload_id)
+    if status is None:
+        return jsonify({
+            "success": False,
+            "message": "Upload not found"
+        }), 404
+    
+    return jsonify({
+        "success": True,
+        "message": "Upload status",
+        "data": {'upload_id': upload_id, **status}
+    }), 200
+
+@upload_bp.route('/api/upload/finalize', methods=['POST'])
+def finalize_chunked_upload():
+    """Junta as partes no arquivo final (JSON: upload_id, filename, category, user_id)"""
+    try:
+        data = request.get_json(silent=True) or {}
+        user_id = int(data.get('user_id', 1))
+        category = data.get('category', 'posts')
+        
+        result = file_service.finalize_upload(data.get('upload_id', ''), data.get('filename', ''), category, user_id)
+        if not result['success']:
+            return jsonify({
+                "success": False,
+                "message": result['error'],
+                "code": result['code']
+            }), _CHUNK_ERROR_STATUS.get(result['code'], 400)
+        
+        file_info = result['file_info']
+        upload_id = enqueue_record_upload(user_id, category, file_info['filename'], file_info['original_filename'],
+                                          file_info['file_path'], file_info['file_url'], file_info['file_size'],
+                                          file_hash=file_info['file_hash'])
+        
+        return jsonify({
+            "success": True,
+            "message": "File uploaded successfully",
+            "data": {
+                'user_id': user_id,
+                'upload_id': upload_id,
+                'file_url': file_info['file_url'],
+                'filename': file_info['filename'],
+                'file_size': file_info['file_size'],
+                'mime_type': file_info['mime_type'],
+                'file_hash': file_info['file_hash']
+            }
+        }), 201
+        
+    except Exception as e:
+        return jsonify({
+            "success": False,
+            "message": f"Upload error: {str(e)}"
+        }), 500
+
+# Prefixo interno do nginx (ex: '/_uploads/' com 'location /_uploads/ { internal; alias .../uploads/; }')
+# Com ele configurado, o nginx envia o arquivo via sendfile e o worker fica livre
+UPLOADS_ACCEL_REDIRECT = os.getenv('UPLOADS_ACCEL_REDIRECT')
+
+def send_upload(filename):
+    """
+    Resposta para um arquivo de UPLOAD_DIR (caminho relativo: categoria/nome)
+    Produção com nginx: só o header X-Accel-Redirect, os bytes não passam pelo Python
+    """
+    # Nome = hash do conteúdo: pode ficar em cache indefinidamente
+    immutable = CONTENT_ADDRESSED_NAME.match(os.path.basename(filename)) is not None
+    max_age = IMMUTABLE_MAX_AGE if immutable else UPLOAD_MAX_AGE
+    
+    if UPLOADS_ACCEL_REDIRECT and not current_app.debug:
+        file_path = safe_join(UPLOAD_DIR, filename)
+        if file_path is None or not os.path.isfile(file_path):
+            abort(404)
+        response = Response(mimetype=mimetypes.guess_type(filename)[0] or 'application/octet-stream')
+        response.headers['X-Accel-Redirect'] = UPLOADS_ACCEL_REDIRECT.rstrip('/') + '/' + filename
+        # ETag / Last-Modified / 304 ficam a cargo do nginx
+        response.cache_control.max_age = max_age
+    else:
+        # Dev / Apache: USE_X_SENDFILE=1 faz o send_file responder com X-Sendfile
+        # conditional=True: ETag + Last-Modified e 304 para If-None-Match / If-Modified-Since
+        response = send_from_directory(UPLOAD_DIR, filename, conditional=True, max_age=max_age)
+    
+    response.cache_control.public = True
+    if immutable:
+        response.cache_control.immutable = True
+    return response
+
 # Servir arquivos estáticos
 @upload_bp.route('/uploads/<path:filename>')
 def serve_uploaded_file(filename):
     """Serve arquivos enviados"""
     try:
-        # Dividir caminho para obter categoria e nome do arquivo
-        path_parts = filename.split('/')
-        if len(path_parts) >= 2:
-            category = path_parts[0]
-            file_name = '/'.join(path_parts[1:])
-            category_path = os.path.join(UPLOAD_DIR, category)
-            
-            if os.path.exists(os.path.join(category_path, file_name)):
-                return send_from_directory(category_path, file_name)
-        
-        # Fallback: servir diretamente do uploads
-        return send_from_directory(UPLOAD_DIR, filename)
+        return send_upload(filename)
         
     except Exception as e:
         return jsonify({
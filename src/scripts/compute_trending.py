@@ -0,0 +1,86 @@
+# src/scripts/compute_trending.py
+"""
+Job periódico do trending: calcula o score dos posts das últimas 24h e grava
+o ranking no Redis (ZSET trending:global) lido por GET /api/timeline/trending
+Entre execuções, curtidas são somadas na hora (timeline_cache.record_engagement);
+o job corrige a deriva do decaimento e remove posts fora da janela
+
+score = (likes + comentários * 2 + shares * 3) * exp(-idade_horas / 24)
+
+Uso (requer REDIS_URL):
+    python src/scripts/compute_trending.py          # a cada 5 min
+    python src/scripts/compute_trending.py --once   # uma execução (cron)
+"""
+
+import heapq
+import math
+import os
+import sqlite3
+import sys
+import time
+
+# src/ no path, como em main.py
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from services.timeline_cache import TRENDING_ZSET_SIZE, store_trending
+
+# Mesmo banco usado por main.py e posts_routes.py
+DB_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), '../..', 'symplle.db'))
+
+INTERVAL_SECONDS = 300
+WINDOW_HOURS = 24
+
+def compute_scores(conn, top=TRENDING_ZSET_SIZE):
+    """
+    Retorna {post_id: score} dos top posts públicos dentro da janela
+    As linhas são lidas do cursor uma a uma (sem fetchall) e só os `top`
+    maiores scores ficam em memória, não importa quantos posts haja em 24h
+    """
+    rows = conn.execute("""
+        SELECT id,
+               COALESCE(likes_count, 0),
+               COALESCE(comments_count, 0),
+               COALESCE(shares_count, 0),
+               (julianday('now') - julianday(created_at)) * 24.0
+        FROM posts
+        WHERE is_deleted = 0
+          AND lower(privacy) = 'public'
+          AND julianday(created_at) >= julianday('now', ?)
+    """, (f'-{WINDOW_HOURS} hours',))
+    
+    def scored():
+        for post_id, likes, comments, shares, age_hours in rows:
+            engagement = likes + comments * 2 + shares * 3
+            if engagement > 0:
+                yield engagement * math.exp(-max(age_hours or 0.0, 0.0) / 24.0), post_id
+    
+    return {post_id: score for score, post_id in heapq.nlargest(top, scored())}
+
+def run_once():
+    """Recalcula e publica o ranking; retorna o número de posts ranqueados"""
+    conn = sqlite3.connect(DB_PATH)
+    try:
+        scores = compute_scores(conn)
+    finally:
+        conn.close()
+    
+    if not store_trending(scores):
+        raise RuntimeError("REDIS_URL não configurado (ou redis não instalado)")
+    return len(scores)
+
+if __name__ == "__main__":
+    once = '--once' in sys.argv
+    while True:
+        started = time.monotonic()
+        try:
+            count = run_once()
+            print(f"📈 Trending atualizado: {count} posts")
+        except RuntimeError as e:
+            print(f"❌ {e}")
+            sys.exit(1)
+        except sqlite3.Error as e:
+            print(f"⚠️ Erro ao calcular trending: {e}")
+        
+        if once:
+            break
+        time.sleep(max(0.0, INTERVAL_SECONDS - (time.monotonic() - started)))
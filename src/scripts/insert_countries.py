@@ -6,6 +6,7 @@ import json
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
 
 from flask import Flask
+from sqlalchemy import insert
 from src.models import db  # Modificado aqui
 from src.models.country import Country
 
@@ -55,16 +56,8 @@ def insert_countries():
             print(f"Já existem {existing_count} países na base de dados.")
             return
         
-        # Inserir os países
-        for country_data in countries_data:
-            country = Country(
-                name=country_data["name"],
-                iso_code=country_data["iso_code"],
-                iso_code_3=country_data.get("iso_code_3"),
-                iso_num=country_data.get("iso_num"),
-                calling_code=country_data.get("calling_code")
-            )
-            db.session.add(country)
+        # Inserir os países em lote (um INSERT executemany, sem objetos ORM)
+        db.session.execute(insert(Country), countries_data)
         
         # Commit das alterações
         db.session.commit()
@@ -1,12 +1,28 @@
 import os
-from src.services.sms_service import SMSService
+import re
 from dotenv import load_dotenv
 
-# Carregar variáveis de ambiente
-load_dotenv()
-
-# Criar uma instância do serviço de SMS
-sms_service = SMSService()
+# Patches em otp_routes.py: (padrão, substituição), compilados uma vez
+_PATCHES = [(re.compile(pattern, re.MULTILINE), replacement) for pattern, replacement in [
+    # Adicionar a importação do serviço de SMS
+    (r'^(?P<flask_import>from flask import Blueprint, request, jsonify\n)',
+     r'\g<flask_import>from src.services.sms_service import SMSService\n'),
+    # Adicionar a inicialização do serviço de SMS
+    (r"^(?P<blueprint>otp_bp = Blueprint\('otp', __name__\)\n)",
+     r'\g<blueprint>\n# Inicializar o serviço de SMS\nsms_service = SMSService()\n'),
+    # Atualizar o método de envio de OTP para usar o serviço de SMS
+    (r'^(?P<indent>[ \t]+)(?P<log>print\(f"Código OTP para \{phone_number\}: \{otp\.otp_code\}"\))$',
+     r'''\g<indent># Enviar o código OTP via SMS
+\g<indent>sms_result = sms_service.send_otp(phone_number, otp.otp_code)
+\g<indent>
+\g<indent># Log para desenvolvimento
+\g<indent>\g<log>
+\g<indent>print(f"Resultado do envio de SMS: {sms_result}")
+\g<indent>
+\g<indent># Se estiver em modo de produção, não mostrar o código no log
+\g<indent># if not sms_service.simulation_mode:
+\g<indent>#     print(f"SMS enviado para {phone_number}")'''),
+]]
 
 def update_otp_routes():
     """
@@ -22,7 +38,7 @@ def update_otp_routes():
         return False
     
     # Ler o conteúdo atual do arquivo
-    with open(otp_routes_path, 'r') as file:
+    with open(otp_routes_path, 'r', encoding='utf-8') as file:
         content = file.read()
     
     # Verificar se o serviço de SMS já está importado
@@ -30,37 +46,24 @@ def update_otp_routes():
         print("O serviço de SMS já está integrado às rotas OTP.")
         return True
     
-    # Adicionar a importação do serviço de SMS
-    import_line = 'from flask import Blueprint, request, jsonify\n'
-    new_import = 'from flask import Blueprint, request, jsonify\nfrom src.services.sms_service import SMSService\n'
-    content = content.replace(import_line, new_import)
-    
-    # Adicionar a inicialização do serviço de SMS
-    blueprint_line = 'otp_bp = Blueprint(\'otp\', __name__)\n'
-    new_blueprint = 'otp_bp = Blueprint(\'otp\', __name__)\n\n# Inicializar o serviço de SMS\nsms_service = SMSService()\n'
-    content = content.replace(blueprint_line, new_blueprint)
+    # Aplicar os patches (cada um substitui a primeira ocorrência)
+    applied = 0
+    for pattern, replacement in _PATCHES:
+        content, count = pattern.subn(replacement, content, count=1)
+        applied += count
     
-    # Atualizar o método de envio de OTP para usar o serviço de SMS
-    old_print_line = '        print(f"Código OTP para {phone_number}: {otp.otp_code}")'
-    new_sms_code = '''        # Enviar o código OTP via SMS
-        sms_result = sms_service.send_otp(phone_number, otp.otp_code)
-        
-        # Log para desenvolvimento
-        print(f"Código OTP para {phone_number}: {otp.otp_code}")
-        print(f"Resultado do envio de SMS: {sms_result}")
-        
-        # Se estiver em modo de produção, não mostrar o código no log
-        # if not sms_service.simulation_mode:
-        #     print(f"SMS enviado para {phone_number}")'''
-    
-    content = content.replace(old_print_line, new_sms_code)
+    if not applied:
+        print("Nenhum ponto de integração encontrado nas rotas OTP.")
+        return False
     
     # Escrever o conteúdo atualizado no arquivo
-    with open(otp_routes_path, 'w') as file:
+    with open(otp_routes_path, 'w', encoding='utf-8') as file:
         file.write(content)
     
     print(f"Arquivo {otp_routes_path} atualizado com sucesso!")
     return True
 
 if __name__ == "__main__":
+    # Carregar variáveis de ambiente só quando executado como script
+    load_dotenv()
     update_otp_routes()
@@ -0,0 +1,59 @@
+# src/scripts/migrate_email_index.py
+"""
+Cria o índice único ix_users_email_lower (lower(email)) em bancos já existentes
+Bancos novos já o recebem via db.create_all() (User.__table_args__); o create_all
+não adiciona índices a tabelas que já existem
+
+O upsert de /api/users usa ON CONFLICT (lower(email)): sem o índice o SQLite
+recusa o statement ("ON CONFLICT clause does not match any PRIMARY KEY or UNIQUE constraint")
+
+Uso:
+    python src/scripts/migrate_email_index.py
+"""
+
+import os
+import sqlite3
+import sys
+
+# Mesmo banco usado por main.py e posts_routes.py
+DB_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), '../..', 'symplle.db'))
+
+# Mesmo SQL que o SQLAlchemy gera para User.__table_args__
+EMAIL_INDEX_SQL = "CREATE UNIQUE INDEX IF NOT EXISTS ix_users_email_lower ON users (lower(email))"
+
+# Emails que só diferem em maiúsculas/minúsculas impedem o índice único
+CASE_DUPLICATES_SQL = """
+    SELECT lower(email), COUNT(*), group_concat(id)
+    FROM users
+    GROUP BY lower(email)
+    HAVING COUNT(*) > 1
+"""
+
+def create_email_index(db_path=DB_PATH):
+    """Cria o índice (idempotente); falha sem alterar nada se houver emails duplicados"""
+    if not os.path.exists(db_path):
+        print(f"❌ Banco não encontrado em: {db_path}")
+        return False
+    
+    conn = sqlite3.connect(db_path)
+    try:
+        duplicates = conn.execute(CASE_DUPLICATES_SQL).fetchall()
+        if duplicates:
+            print(f"❌ {len(duplicates)} emails repetidos (ignorando maiúsculas); unifique as contas antes:")
+            for email, count, user_ids in duplicates:
+                print(f"  {email}: {count} usuários (ids {user_ids})")
+            return False
+        
+        conn.execute(EMAIL_INDEX_SQL)
+        conn.commit()
+    except sqlite3.Error as e:
+        print(f"❌ Erro ao criar índice: {e}")
+        return False
+    finally:
+        conn.close()
+    
+    print("✅ Índice ix_users_email_lower pronto")
+    return True
+
+if __name__ == "__main__":
+    sys.exit(0 if create_email_index() else 1)
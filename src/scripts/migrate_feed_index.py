@@ -0,0 +1,98 @@
+# src/scripts/migrate_feed_index.py
+"""
+Cria os índices parciais do feed (ix_posts_feed_chrono, ix_posts_feed_trending,
+ix_posts_smart) e a coluna gerada posts.engagement_plus_content em bancos já
+existentes, removendo o índice antigo ix_posts_feed
+Bancos novos já os recebem via db.create_all() (Post.__table_args__)
+
+Uso:
+    python src/scripts/migrate_feed_index.py
+"""
+
+import os
+import sqlite3
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from models.post import ENGAGEMENT_PLUS_CONTENT_SQL
+
+# Mesmo banco usado por main.py e posts_routes.py
+DB_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), '../..', 'symplle.db'))
+
+# Parte estável do score da timeline inteligente (VIRTUAL: calculada na leitura,
+# sem reescrever a tabela; o índice ix_posts_smart guarda o valor)
+SMART_COLUMN_SQL = f"""
+    ALTER TABLE posts ADD COLUMN engagement_plus_content REAL
+    GENERATED ALWAYS AS ({ENGAGEMENT_PLUS_CONTENT_SQL}) VIRTUAL
+"""
+
+# Mesmo WHERE que o SQLAlchemy gera (is_deleted == False -> "= 0"), senão o
+# planner não usa os índices parciais
+FEED_WHERE = "WHERE is_deleted = 0 AND privacy = 'PUBLIC'"
+
+# nome -> CREATE INDEX (recriado se o SQL guardado no banco for diferente)
+FEED_INDEXES = {
+    # Timeline cronológica / paginação por cursor
+    'ix_posts_feed_chrono': f"""
+        CREATE INDEX ix_posts_feed_chrono
+        ON posts (created_at DESC, id DESC) {FEED_WHERE}
+    """,
+    # Trending: janela por created_at respondida só pelo índice
+    'ix_posts_feed_trending': f"""
+        CREATE INDEX ix_posts_feed_trending
+        ON posts (created_at DESC, likes_count, comments_count, views_count, is_deleted, privacy) {FEED_WHERE}
+    """,
+    # Parte estável do score da timeline inteligente
+    'ix_posts_smart': f"""
+        CREATE INDEX ix_posts_smart
+        ON posts (engagement_plus_content DESC, created_at DESC) {FEED_WHERE}
+    """,
+}
+
+# Substituído por ix_posts_feed_chrono (parcial, menor)
+OBSOLETE_INDEXES = ('ix_posts_feed',)
+
+def _has_column(conn, table, column):
+    """table_xinfo (não table_info) também lista colunas geradas"""
+    return any(row[1] == column for row in conn.execute(f"PRAGMA table_xinfo({table})"))
+
+def _normalize(sql):
+    return ' '.join(sql.split()) if sql else None
+
+def _ensure_index(conn, name, create_sql):
+    """Cria o índice, ou recria se existir com outra definição; True se mudou algo"""
+    row = conn.execute("SELECT sql FROM sqlite_master WHERE type = 'index' AND name = ?", (name,)).fetchone()
+    if row and _normalize(row[0]) == _normalize(create_sql):
+        return False
+    
+    conn.execute(f"DROP INDEX IF EXISTS {name}")
+    conn.execute(create_sql)
+    return True
+
+def create_feed_index(db_path=DB_PATH):
+    """Cria coluna e índices (idempotente) e atualiza as estatísticas do planner"""
+    if not os.path.exists(db_path):
+        print(f"❌ Banco não encontrado em: {db_path}")
+        return False
+    
+    conn = sqlite3.connect(db_path)
+    try:
+        if not _has_column(conn, 'posts', 'engagement_plus_content'):
+            conn.execute(SMART_COLUMN_SQL)
+        changed = [name for name, sql in FEED_INDEXES.items() if _ensure_index(conn, name, sql)]
+        for name in OBSOLETE_INDEXES:
+            conn.execute(f"DROP INDEX IF EXISTS {name}")
+        conn.execute("ANALYZE posts")
+        conn.commit()
+    except sqlite3.Error as e:
+        print(f"❌ Erro ao criar índice: {e}")
+        return False
+    finally:
+        conn.close()
+    
+    print(f"✅ Índices do feed prontos (criados/recriados: {', '.join(changed) or 'nenhum'})")
+    return True
+
+if __name__ == "__main__":
+    sys.exit(0 if create_feed_index() else 1)
@@ -32,7 +32,8 @@ def add_security_fields(db_path=DB_PATH):
     """Adicionar campos de segurança na tabela users"""
     try:
         print(f"🔍 Conectando ao banco: {os.path.abspath(db_path)}")
-        conn = sqlite3.connect(db_path)
+        # isolation_level=None: transação controlada manualmente (BEGIN/COMMIT)
+        conn = sqlite3.connect(db_path, isolation_level=None)
         cursor = conn.cursor()
         
         # Verificar se tabela users existe
@@ -66,14 +67,29 @@ def add_security_fields(db_path=DB_PATH):
             print("✅ Todos os campos de segurança já existem!")
             return True
         
-        # Executar migrações
-        print(f"🔧 Executando {len(migrations)} migrações...")
-        for field_name, migration_sql in migrations:
-            cursor.execute(migration_sql)
-            print(f"  ✅ Adicionado: {field_name}")
+        # WAL: leitores da aplicação continuam servindo durante a migração.
+        # O modo é persistente no arquivo e fica ativo depois (mesmo da app).
+        # Backup recém-criado: sem fsync durante a migração
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA wal_autocheckpoint=1000")
+        cursor.execute("PRAGMA synchronous=OFF")
+        cursor.execute("PRAGMA cache_size=-200000")
         
-        conn.commit()
-        conn.close()
+        # Executar migrações em uma única transação
+        print(f"🔧 Executando {len(migrations)} migrações...")
+        cursor.execute("BEGIN IMMEDIATE")
+        try:
+            for field_name, migration_sql in migrations:
+                cursor.execute(migration_sql)
+                print(f"  ✅ Adicionado: {field_name}")
+            cursor.execute("COMMIT")
+        except Exception:
+            cursor.execute("ROLLBACK")
+            raise
+        finally:
+            # Devolve o conteúdo do WAL ao banco e zera o arquivo -wal
+            cursor.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+            conn.close()
         
         print(f"🎉 {len(migrations)} campos de segurança adicionados com sucesso!")
         return True
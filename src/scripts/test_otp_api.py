@@ -2,16 +2,26 @@ import os
 import sys
 import requests
 import json
+from requests.adapters import HTTPAdapter
 
 # Adicionar o diretório pai ao path para poder importar os módulos do projeto
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
 
+def create_session():
+    """Sessão HTTP com keep-alive: envio e verificação reaproveitam a mesma conexão"""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=10, pool_maxsize=10)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
 def test_otp_endpoints():
     """
     Script para testar os endpoints de OTP do backend.
     Este script deve ser executado com o servidor Flask rodando.
     """
     base_url = "http://localhost:5000/api"
+    session = create_session()
     
     # Testar o endpoint de envio de OTP
     print("\n=== Testando o endpoint de envio de OTP ===")
@@ -27,7 +37,7 @@ def test_otp_endpoints():
     try:
         # Enviar a requisição POST para o endpoint de envio de OTP
         # Alterado para usar o endpoint correto /send-otp
-        response = requests.post(f"{base_url}/send-otp", json=data)
+        response = session.post(f"{base_url}/send-otp", json=data)
         
         # Imprimir o status code e a resposta
         print(f"Status Code: {response.status_code}")
@@ -64,7 +74,7 @@ def test_otp_endpoints():
             
             # Enviar a requisição POST para o endpoint de verificação de OTP
             # Alterado para usar o endpoint correto /verify-otp
-            verify_response = requests.post(f"{base_url}/verify-otp", json=verify_data)
+            verify_response = session.post(f"{base_url}/verify-otp", json=verify_data)
             
             # Imprimir o status code e a resposta
             print(f"Status Code: {verify_response.status_code}")
@@ -90,6 +100,8 @@ def test_otp_endpoints():
     except Exception as e:
         print(f"\n❌ Erro ao testar os endpoints de OTP: {str(e)}")
         print("Certifique-se de que o servidor Flask está rodando e acessível.")
+    finally:
+        session.close()
 
 if __name__ == "__main__":
     test_otp_endpoints()
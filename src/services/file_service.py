@@ -4,15 +4,28 @@ Core File Upload Service para Symplle
 Suporte completo para imagens, documentos e vídeos com i18n
 """
 
+import io
+import json
 import os
-import uuid
+import re
+import secrets
+import shutil
+import threading
+import time
 import hashlib
 import mimetypes
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from typing import Dict, List, Optional, Tuple, Union
+from types import MappingProxyType
+from typing import Callable, Dict, List, Optional, Tuple, Union
 from werkzeug.datastructures import FileStorage
 from werkzeug.utils import secure_filename
 from flask import current_app
+from sqlalchemy import or_
+
+# Mesmo registry de User/Post (imports sem o prefixo src.)
+from models import db
+from models.file_upload import FileUpload
 
 # Importar sistema i18n
 try:
@@ -27,53 +40,163 @@ except ImportError:
     i18n_utils = MockI18nUtils()
     I18N_AVAILABLE = False
 
+# Redis opcional (REDIS_URL): status dos uploads em background visível a todos os workers
+try:
+    import redis
+    REDIS_AVAILABLE = True
+except ImportError:
+    REDIS_AVAILABLE = False
+
+# python-magic opcional: MIME pelo conteúdo (cabeçalho), não pelo que o cliente declara
+try:
+    import magic
+    MIME_DETECTOR = magic.Magic(mime=True)
+    MAGIC_AVAILABLE = True
+except ImportError:
+    MIME_DETECTOR = None
+    MAGIC_AVAILABLE = False
+
+# Bytes lidos para a detecção (suficiente para os formatos aceitos)
+MIME_SNIFF_BYTES = 2048
+
+# Nomes que a libmagic usa para tipos aceitos -> nome em SAFE_MIME_TYPES
+_SNIFFED_MIME_ALIASES = {
+    'image/x-ms-bmp': 'image/bmp',
+    'audio/x-wav': 'audio/wav',
+    'audio/x-flac': 'audio/flac',
+    'audio/x-hx-aac-adts': 'audio/aac',
+    'application/CDFV2': 'application/msword',
+    'text/x-rtf': 'text/rtf',
+}
+# .docx é um zip: a libmagic nem sempre lê além do cabeçalho
+_ZIP_CONTAINER_EXTENSIONS = frozenset({'docx'})
+
+# Chaves de tradução da validação (o texto depende do locale da requisição,
+# por isso só a chave é resolvida no import)
+TR_NO_FILE = 'upload.validation.no_file'
+TR_INVALID_FILENAME = 'upload.validation.invalid_filename'
+TR_INVALID_EXTENSION = 'upload.validation.invalid_extension'
+TR_INVALID_MIME_TYPE = 'upload.validation.invalid_mime_type'
+TR_FILE_TOO_LARGE = 'upload.validation.file_too_large'
+TR_EMPTY_FILE = 'upload.validation.empty_file'
+
+# Upload em partes (vídeos grandes): temp/<upload_id>/<índice>.part até o finalize
+UPLOAD_ID_PATTERN = re.compile(r'[A-Za-z0-9_-]{8,64}\Z')
+MAX_CHUNK_SIZE = 8 * 1024 * 1024  # 8MB por parte (1-4MB é o típico em rede móvel)
+MAX_UPLOAD_CHUNKS = 1024
+CHUNKED_UPLOAD_CATEGORIES = frozenset({'avatars', 'posts', 'documents', 'chat'})
+# Uploads em partes abandonados: pastas sem nova parte há 24h são apagadas
+# (varredura no save_chunk, no máximo a cada 10 minutos por processo)
+CHUNK_UPLOAD_TTL = 24 * 3600
+CHUNK_SWEEP_INTERVAL = 600
+_last_chunk_sweep = 0.0
+_chunk_sweep_lock = threading.Lock()
+HAS_SENDFILE = hasattr(os, 'sendfile')
+
+# Nome de conteúdo endereçado por hash: <sha256>.<ext>
+CONTENT_HASH_NAME = re.compile(r'([0-9a-f]{64})(\.[a-z0-9]+)?\Z')
+
+TR_INVALID_UPLOAD_ID = 'upload.chunk.invalid_upload_id'
+TR_INVALID_CHUNK = 'upload.chunk.invalid_chunk'
+TR_CHUNK_TOO_LARGE = 'upload.chunk.chunk_too_large'
+TR_MISSING_CHUNKS = 'upload.chunk.missing_chunks'
+TR_UPLOAD_NOT_FOUND = 'upload.chunk.not_found'
+TR_INVALID_CATEGORY = 'upload.chunk.invalid_category'
+
+# Gravação (hash + cópia) fora do request: o worker do gunicorn fica livre
+_SAVE_POOL = ThreadPoolExecutor(max_workers=(os.cpu_count() or 1) * 2, thread_name_prefix='file-save')
+
+# Status dos uploads em background: no Redis (o poll pode cair em outro worker do gunicorn);
+# sem REDIS_URL, upload_id -> (status, resultado) por processo (só vale com um único worker)
+REDIS_URL = os.getenv('REDIS_URL')
+_redis = redis.Redis.from_url(REDIS_URL) if REDIS_AVAILABLE and REDIS_URL else None
+UPLOAD_STATUS_TTL = 3600
+_upload_status = {}
+_upload_status_lock = threading.Lock()
+_UPLOAD_STATUS_MAX = 10000
+
 class FileUploadService:
     """
     Serviço principal para upload e gerenciamento de arquivos
     Features: validação, processamento, storage, segurança
     """
     
+    # Tabelas de validação: constantes de classe (imutáveis), montadas uma vez por processo
+    
+    # Tipos de arquivo permitidos
+    ALLOWED_EXTENSIONS = MappingProxyType({
+        'image': frozenset({'jpg', 'jpeg', 'png', 'gif', 'webp', 'bmp'}),
+        'document': frozenset({'pdf', 'doc', 'docx', 'txt', 'rtf'}),
+        'video': frozenset({'mp4', 'avi', 'mov', 'wmv', 'flv', 'webm'}),
+        'audio': frozenset({'mp3', 'wav', 'aac', 'ogg', 'flac'})
+    })
+    
+    # Lista de extensões para a mensagem de erro, montada uma vez por tipo
+    _ALLOWED_DISPLAY = MappingProxyType({
+        file_type: ', '.join(sorted(extensions))
+        for file_type, extensions in ALLOWED_EXTENSIONS.items()
+    })
+    
+    # MIME types seguros
+    SAFE_MIME_TYPES = frozenset({
+        # Imagens
+        'image/jpeg', 'image/png', 'image/gif', 'image/webp', 'image/bmp',
+        # Documentos
+        'application/pdf', 'application/msword', 
+        'application/vnd.openxmlformats-officedocument.wordprocessingml.document',
+        'text/plain', 'text/rtf',
+        # Vídeos
+        'video/mp4', 'video/quicktime', 'video/x-msvideo', 'video/webm',
+        # Áudios
+        'audio/mpeg', 'audio/wav', 'audio/aac', 'audio/ogg', 'audio/flac'
+    })
+    
+    # Tamanhos máximos por tipo (em bytes)
+    MAX_SIZES = MappingProxyType({
+        'image': 5 * 1024 * 1024,      # 5MB para imagens
+        'document': 10 * 1024 * 1024,  # 10MB para documentos
+        'video': 50 * 1024 * 1024,     # 50MB para vídeos
+        'audio': 10 * 1024 * 1024      # 10MB para áudios
+    })
+    
+    # Pastas base cujos diretórios de upload já foram criados neste processo
+    _DIRS_READY = set()
+    
+    # Tipo de arquivo esperado por categoria
+    FILE_TYPE_MAPPING = MappingProxyType({
+        'avatars': 'image',
+        'posts': 'image',
+        'documents': 'document',
+        'chat': 'image',  # Default, pode ser qualquer tipo
+        'temp': 'image'
+    })
+    
+    # Tipos aceitos no upload em partes: o da categoria e, em posts e chat,
+    # também vídeo (arquivos grandes são o motivo do upload em partes)
+    CHUNKED_FILE_TYPES = MappingProxyType({
+        category: (file_type, 'video') if category in ('posts', 'chat') else (file_type,)
+        for category, file_type in FILE_TYPE_MAPPING.items()
+        if category in CHUNKED_UPLOAD_CATEGORIES
+    })
+    
+    # Soma das partes de um upload: nunca acima do maior arquivo aceito
+    MAX_CHUNKED_SIZE = max(MAX_SIZES.values())
+    
     def __init__(self):
         # Configurações de upload
         self.base_upload_dir = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'uploads')
         self.max_file_size = 10 * 1024 * 1024  # 10MB default
-        self.chunk_size = 8192  # 8KB chunks
-        
-        # Tipos de arquivo permitidos
-        self.allowed_extensions = {
-            'image': {'jpg', 'jpeg', 'png', 'gif', 'webp', 'bmp'},
-            'document': {'pdf', 'doc', 'docx', 'txt', 'rtf'},
-            'video': {'mp4', 'avi', 'mov', 'wmv', 'flv', 'webm'},
-            'audio': {'mp3', 'wav', 'aac', 'ogg', 'flac'}
-        }
-        
-        # MIME types seguros
-        self.safe_mime_types = {
-            # Imagens
-            'image/jpeg', 'image/png', 'image/gif', 'image/webp', 'image/bmp',
-            # Documentos
-            'application/pdf', 'application/msword', 
-            'application/vnd.openxmlformats-officedocument.wordprocessingml.document',
-            'text/plain', 'text/rtf',
-            # Vídeos
-            'video/mp4', 'video/quicktime', 'video/x-msvideo', 'video/webm',
-            # Áudios
-            'audio/mpeg', 'audio/wav', 'audio/aac', 'audio/ogg', 'audio/flac'
-        }
-        
-        # Tamanhos máximos por tipo (em bytes)
-        self.max_sizes = {
-            'image': 5 * 1024 * 1024,      # 5MB para imagens
-            'document': 10 * 1024 * 1024,  # 10MB para documentos
-            'video': 50 * 1024 * 1024,     # 50MB para vídeos
-            'audio': 10 * 1024 * 1024      # 10MB para áudios
-        }
+        self.chunk_size = 1 << 20  # 1MB chunks
         
-        # Criar diretórios se não existirem
+        # Criar diretórios se não existirem (categoria -> caminho absoluto)
+        self.category_dirs: Dict[str, str] = {}
         self._ensure_upload_directories()
     
     def _ensure_upload_directories(self):
-        """Cria diretórios de upload se não existirem"""
+        """
+        Cria diretórios de upload se não existirem
+        Os makedirs rodam uma vez por processo (por pasta base); novas instâncias só montam os caminhos
+        """
         directories = [
             'avatars',      # Fotos de perfil
             'posts',        # Mídia de posts
@@ -83,14 +206,14 @@ class FileUploadService:
             'thumbnails'    # Miniaturas geradas
         ]
         
+        create = self.base_upload_dir not in FileUploadService._DIRS_READY
         for directory in directories:
             dir_path = os.path.join(self.base_upload_dir, directory)
-            os.makedirs(dir_path, exist_ok=True)
-            
-            # Criar arquivo .gitkeep para manter diretório no git
-            gitkeep_path = os.path.join(dir_path, '.gitkeep')
-            if not os.path.exists(gitkeep_path):
-                open(gitkeep_path, 'a').close()
+            if create:
+                os.makedirs(dir_path, exist_ok=True)
+            self.category_dirs[directory] = dir_path
+        
+        FileUploadService._DIRS_READY.add(self.base_upload_dir)
     
     def validate_file(self, file: FileStorage, file_type: str = 'image') -> Dict:
         """
@@ -106,7 +229,7 @@ class FileUploadService:
         if not file or not file.filename:
             return {
                 'valid': False,
-                'error': _('upload.validation.no_file'),
+                'error': _(TR_NO_FILE),
                 'code': 'NO_FILE'
             }
         
@@ -115,28 +238,31 @@ class FileUploadService:
         if not filename:
             return {
                 'valid': False,
-                'error': _('upload.validation.invalid_filename'),
+                'error': _(TR_INVALID_FILENAME),
                 'code': 'INVALID_FILENAME'
             }
         
         # Verificar extensão
         file_ext = filename.rsplit('.', 1)[1].lower() if '.' in filename else ''
-        if file_ext not in self.allowed_extensions.get(file_type, set()):
-            allowed = ', '.join(self.allowed_extensions.get(file_type, []))
+        if file_ext not in self.ALLOWED_EXTENSIONS.get(file_type, frozenset()):
+            allowed = self._ALLOWED_DISPLAY.get(file_type, '')
             return {
                 'valid': False,
-                'error': _('upload.validation.invalid_extension', 
+                'error': _(TR_INVALID_EXTENSION, 
                           extension=file_ext, allowed=allowed),
                 'code': 'INVALID_EXTENSION'
             }
         
         # Verificar MIME type
         file.seek(0)  # Reset file pointer
-        mime_type = file.mimetype or mimetypes.guess_type(filename)[0]
-        if mime_type not in self.safe_mime_types:
+        if MAGIC_AVAILABLE:
+            mime_type = self._sniff_mime_type(file, file_ext)
+        else:
+            mime_type = file.mimetype or mimetypes.guess_type(filename)[0]
+        if mime_type not in self.SAFE_MIME_TYPES:
             return {
                 'valid': False,
-                'error': _('upload.validation.invalid_mime_type', mime_type=mime_type),
+                'error': _(TR_INVALID_MIME_TYPE, mime_type=mime_type),
                 'code': 'INVALID_MIME_TYPE'
             }
         
@@ -145,12 +271,12 @@ class FileUploadService:
         file_size = file.tell()
         file.seek(0)  # Reset file pointer
         
-        max_size = self.max_sizes.get(file_type, self.max_file_size)
+        max_size = self.MAX_SIZES.get(file_type, self.max_file_size)
         if file_size > max_size:
             max_size_mb = max_size / (1024 * 1024)
             return {
                 'valid': False,
-                'error': _('upload.validation.file_too_large', 
+                'error': _(TR_FILE_TOO_LARGE, 
                           size=f'{file_size/(1024*1024):.1f}MB', 
                           max_size=f'{max_size_mb:.0f}MB'),
                 'code': 'FILE_TOO_LARGE'
@@ -160,7 +286,7 @@ class FileUploadService:
         if file_size == 0:
             return {
                 'valid': False,
-                'error': _('upload.validation.empty_file'),
+                'error': _(TR_EMPTY_FILE),
                 'code': 'EMPTY_FILE'
             }
         
@@ -172,6 +298,17 @@ class FileUploadService:
             'file_size': file_size
         }
     
+    @staticmethod
+    def _sniff_mime_type(file: FileStorage, file_ext: str) -> str:
+        """MIME detectado pela libmagic no cabeçalho do arquivo (rejeita extensão falsificada)"""
+        header = file.read(MIME_SNIFF_BYTES)
+        file.seek(0)
+        mime_type = MIME_DETECTOR.from_buffer(header)
+        
+        if mime_type == 'application/zip' and file_ext in _ZIP_CONTAINER_EXTENSIONS:
+            return mimetypes.guess_type(f'file.{file_ext}')[0]
+        return _SNIFFED_MIME_ALIASES.get(mime_type, mime_type)
+    
     def generate_unique_filename(self, original_filename: str, user_id: int = None) -> str:
         """
         Gera nome único para o arquivo
@@ -188,9 +325,9 @@ class FileUploadService:
         if '.' in original_filename:
             file_ext = '.' + original_filename.rsplit('.', 1)[1].lower()
         
-        # Gerar ID único
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        unique_id = str(uuid.uuid4())[:8]
+        # Gerar ID único: microssegundos desde a epoch (sem strftime) + 8 hex aleatórios
+        timestamp = time.time_ns() // 1000
+        unique_id = secrets.token_hex(4)
         
         # Incluir user_id se fornecido
         if user_id:
@@ -202,22 +339,71 @@ class FileUploadService:
     
     def calculate_file_hash(self, file: FileStorage) -> str:
         """
-        Calcula hash MD5 do arquivo para detectar duplicatas
+        Calcula hash SHA-256 do arquivo para detectar duplicatas
+        (mesmo algoritmo dos nomes por conteúdo em upload_routes;
+        o OpenSSL usa as instruções SHA-NI quando a CPU tem)
         
         Args:
             file: Arquivo para calcular hash
         
         Returns:
-            Hash MD5 do arquivo
+            Hash SHA-256 do arquivo (hex, 64 caracteres)
         """
         file.seek(0)
-        hash_md5 = hashlib.md5()
+        hasher = hashlib.sha256()
         
         for chunk in iter(lambda: file.read(self.chunk_size), b""):
-            hash_md5.update(chunk)
+            hasher.update(chunk)
         
         file.seek(0)  # Reset file pointer
-        return hash_md5.hexdigest()
+        return hasher.hexdigest()
+    
+    def _write_and_hash(self, file: FileStorage, file_path: str) -> Tuple[str, int]:
+        """
+        Grava o arquivo em disco e calcula o hash na mesma leitura do stream
+        (evita ler o upload duas vezes: uma para o hash e outra no file.save)
+        
+        Args:
+            file: Arquivo enviado
+            file_path: Caminho de destino
+        
+        Returns:
+            (hash SHA-256, bytes gravados)
+        """
+        hasher = hashlib.sha256()
+        size = 0
+        stream = file.stream
+        stream.seek(0)
+        
+        # Um único buffer de 1MB reaproveitado (readinto) em vez de um bytes novo
+        # por leitura; streams sem readinto caem no read() normal
+        readinto = getattr(stream, 'readinto', None)
+        buffer = memoryview(bytearray(self.chunk_size)) if readinto else None
+        
+        # os.write direto no descritor: sem o buffer do objeto arquivo do Python
+        # O_EXCL: falha com FileExistsError se o nome já existir (checagem atômica)
+        fd = os.open(file_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o644)
+        try:
+            while True:
+                if readinto:
+                    read = readinto(buffer)
+                    chunk = buffer[:read]
+                else:
+                    chunk = memoryview(stream.read(self.chunk_size))
+                    read = len(chunk)
+                if not read:
+                    break
+                hasher.update(chunk)
+                while chunk:
+                    chunk = chunk[os.write(fd, chunk):]
+                size += read
+        except BaseException:
+            os.close(fd)
+            os.remove(file_path)
+            raise
+        os.close(fd)
+        
+        return hasher.hexdigest(), size
     
     def save_file(self, file: FileStorage, category: str, user_id: int = None, 
                   custom_filename: str = None) -> Dict:
@@ -235,15 +421,7 @@ class FileUploadService:
         """
         try:
             # Determinar tipo de arquivo baseado na categoria
-            file_type_mapping = {
-                'avatars': 'image',
-                'posts': 'image',
-                'documents': 'document',
-                'chat': 'image',  # Default, pode ser qualquer tipo
-                'temp': 'image'
-            }
-            
-            file_type = file_type_mapping.get(category, 'image')
+            file_type = self.FILE_TYPE_MAPPING.get(category, 'image')
             
             # Validar arquivo
             validation = self.validate_file(file, file_type)
@@ -254,36 +432,31 @@ class FileUploadService:
                     'code': validation['code']
                 }
             
-            # Gerar nome único
+            # Determinar caminho de destino
+            upload_dir = self.category_dirs.get(category) or os.path.join(self.base_upload_dir, category)
+            deduplicated = False
+            
             if custom_filename:
                 filename = secure_filename(custom_filename)
                 # Garantir extensão correta
                 if '.' not in filename:
                     filename += '.' + validation['file_ext']
-            else:
-                filename = self.generate_unique_filename(validation['filename'], user_id)
-            
-            # Determinar caminho de destino
-            upload_dir = os.path.join(self.base_upload_dir, category)
-            file_path = os.path.join(upload_dir, filename)
-            
-            # Verificar se arquivo já existe
-            counter = 1
-            original_filename = filename
-            while os.path.exists(file_path):
-                name, ext = os.path.splitext(original_filename)
-                filename = f"{name}_{counter}{ext}"
                 file_path = os.path.join(upload_dir, filename)
-                counter += 1
-            
-            # Calcular hash do arquivo
-            file_hash = self.calculate_file_hash(file)
-            
-            # Salvar arquivo
-            file.save(file_path)
-            
-            # Obter informações do arquivo salvo
-            file_stats = os.stat(file_path)
+                
+                # Salvar arquivo e calcular o hash numa única passada
+                try:
+                    file_hash, _written = self._write_and_hash(file, file_path)
+                except FileExistsError:
+                    # Colisão de nome: um novo sufixo
+                    name, ext = os.path.splitext(filename)
+                    filename = f"{name}_{secrets.token_hex(4)}{ext}"
+                    file_path = os.path.join(upload_dir, filename)
+                    file_hash, _written = self._write_and_hash(file, file_path)
+            else:
+                # Nome = hash do conteúdo: conteúdo repetido fica uma única vez no disco
+                file_hash, filename, file_path, deduplicated = self._write_content_addressed(
+                    file, upload_dir, validation['file_ext']
+                )
             
             # Gerar URL de acesso
             file_url = f"/uploads/{category}/{filename}"
@@ -301,7 +474,434 @@ class FileUploadService:
                     'file_hash': file_hash,
                     'user_id': user_id,
                     'uploaded_at': datetime.now().isoformat(),
-                    'file_ext': validation['file_ext']
+                    'file_ext': validation['file_ext'],
+                    'deduplicated': deduplicated
+                }
+            }
+            
+        except Exception as e:
+            return {
+                'success': False,
+                'error': _('upload.error.save_failed', error=str(e)),
+                'code': 'SAVE_FAILED'
+            }
+    
+    def _write_content_addressed(self, file: FileStorage, upload_dir: str, file_ext: str) -> Tuple[str, str, str, bool]:
+        """
+        Grava em <pasta>/<hash[:2]>/<hash>.<ext> (prefixo de 2 caracteres evita pastas enormes)
+        O conteúdo vai para um temporário na mesma pasta; se o hash já existe, o temporário é descartado
+        
+        Returns:
+            (hash, nome relativo à categoria, caminho final, True se já existia)
+        """
+        tmp_path = os.path.join(upload_dir, f'.{secrets.token_hex(8)}.tmp')
+        file_hash, _written = self._write_and_hash(file, tmp_path)
+        return self._store_content_addressed(tmp_path, file_hash, upload_dir, file_ext)
+    
+    @staticmethod
+    def _store_content_addressed(tmp_path: str, file_hash: str, upload_dir: str,
+                                 file_ext: str) -> Tuple[str, str, str, bool]:
+        """
+        Move um temporário já gravado em upload_dir para <hash[:2]>/<hash>.<ext>
+        (o temporário é descartado se o conteúdo já existir)
+        
+        Returns:
+            (hash, nome relativo à categoria, caminho final, True se já existia)
+        """
+        try:
+            stored_name = f'{file_hash}.{file_ext}' if file_ext else file_hash
+            filename = f'{file_hash[:2]}/{stored_name}'
+            final_dir = os.path.join(upload_dir, file_hash[:2])
+            final_path = os.path.join(final_dir, stored_name)
+            
+            if os.path.exists(final_path):
+                os.remove(tmp_path)
+                return file_hash, filename, final_path, True
+            
+            os.makedirs(final_dir, exist_ok=True)
+            os.replace(tmp_path, final_path)
+            return file_hash, filename, final_path, False
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+    
+    def save_file_async(self, file: FileStorage, category: str, user_id: int = None,
+                        custom_filename: str = None,
+                        on_saved: Callable[[Dict], None] = None) -> Dict:
+        """
+        Valida no request e grava (hash + cópia) em background
+        O cliente consulta get_upload_status(upload_id) até 'done' ou 'failed'
+        
+        Args:
+            Mesmos de save_file
+            on_saved: Chamado com o file_info quando a gravação termina com sucesso
+                      (na thread do pool: sem app context); exceção nele marca o upload como 'failed'
+        
+        Returns:
+            Dict com upload_id e status ('processing'; 'done' se foi gravado na hora)
+        """
+        validation = self.validate_file(file, self.FILE_TYPE_MAPPING.get(category, 'image'))
+        if not validation['valid']:
+            return {
+                'success': False,
+                'error': validation['error'],
+                'code': validation['code']
+            }
+        
+        upload_id = secrets.token_hex(16)
+        
+        # Upload pequeno (em memória, sem fileno): grava no próprio request
+        try:
+            fd = os.dup(file.stream.fileno())
+        except (AttributeError, OSError, io.UnsupportedOperation):
+            result = self.save_file(file, category, user_id, custom_filename)
+            if result['success']:
+                result = self._notify_saved(on_saved, result)
+            if not result['success']:
+                return result
+            self.set_upload_status(upload_id, 'done', result)
+            return {'success': True, 'upload_id': upload_id, 'status': 'done', 'result': result}
+        
+        # O werkzeug fecha o temporário do upload no fim do request;
+        # o descritor duplicado mantém o conteúdo acessível para o worker
+        background_file = FileStorage(
+            stream=os.fdopen(fd, 'rb'),
+            filename=file.filename,
+            content_type=file.mimetype
+        )
+        self.set_upload_status(upload_id, 'processing')
+        _SAVE_POOL.submit(self._save_file_job, upload_id, background_file, category, user_id,
+                          custom_filename, on_saved)
+        
+        return {
+            'success': True,
+            'upload_id': upload_id,
+            'status': 'processing'
+        }
+    
+    def _save_file_job(self, upload_id: str, file: FileStorage, category: str, user_id: int,
+                       custom_filename: str, on_saved: Optional[Callable[[Dict], None]]):
+        """Execução de save_file no pool de background"""
+        try:
+            result = self.save_file(file, category, user_id, custom_filename)
+        finally:
+            file.stream.close()
+        if result['success']:
+            result = self._notify_saved(on_saved, result)
+        self.set_upload_status(upload_id, 'done' if result['success'] else 'failed', result)
+    
+    @staticmethod
+    def _notify_saved(on_saved: Optional[Callable[[Dict], None]], result: Dict) -> Dict:
+        """Chama on_saved após a gravação; se ele falhar o resultado vira erro (o arquivo fica no disco)"""
+        if on_saved is None:
+            return result
+        try:
+            on_saved(result['file_info'])
+        except Exception as e:
+            return {
+                'success': False,
+                'error': _('upload.error.save_failed', error=str(e)),
+                'code': 'RECORD_FAILED',
+                'file_info': result['file_info']
+            }
+        return result
+    
+    @staticmethod
+    def set_upload_status(upload_id: str, status: str, result: Dict = None):
+        """
+        Registra o status de um upload em background (Redis com TTL; local descarta os mais antigos)
+        Também usado pelas rotas para o registro dos metadados em file_uploads
+        """
+        if _redis is not None:
+            _redis.setex(f'upload_status:{upload_id}', UPLOAD_STATUS_TTL, json.dumps([status, result]))
+            return
+        
+        with _upload_status_lock:
+            _upload_status.pop(upload_id, None)
+            _upload_status[upload_id] = (status, result)
+            while len(_upload_status) > _UPLOAD_STATUS_MAX:
+                del _upload_status[next(iter(_upload_status))]
+    
+    @staticmethod
+    def get_upload_status(upload_id: str) -> Optional[Dict]:
+        """
+        Status de um upload enviado por save_file_async
+        
+        Returns:
+            Dict com status ('processing', 'done', 'failed') e o resultado de
+            save_file quando terminado, ou None se o ID não existir
+        """
+        if _redis is not None:
+            cached = _redis.get(f'upload_status:{upload_id}')
+            entry = json.loads(cached) if cached is not None else None
+        else:
+            with _upload_status_lock:
+                entry = _upload_status.get(upload_id)
+        if entry is None:
+            return None
+        
+        status, result = entry
+        response = {'status': status}
+        if result is not None:
+            response['result'] = result
+        return response
+    
+    def _chunk_dir(self, upload_id: str) -> Optional[str]:
+        """Pasta das partes de um upload em partes (None se o ID for inválido)"""
+        if not upload_id or not UPLOAD_ID_PATTERN.match(upload_id):
+            return None
+        return os.path.join(self.category_dirs['temp'], upload_id)
+    
+    def get_received_chunks(self, upload_id: str) -> Optional[List[int]]:
+        """
+        Índices das partes já recebidas (para o cliente retomar o upload)
+        
+        Returns:
+            Lista ordenada de índices, ou None se o upload não existir
+        """
+        chunk_dir = self._chunk_dir(upload_id)
+        if chunk_dir is None:
+            return None
+        try:
+            with os.scandir(chunk_dir) as entries:
+                return sorted(
+                    int(entry.name[:-5]) for entry in entries
+                    if entry.name.endswith('.part') and entry.name[:-5].isdigit()
+                )
+        except FileNotFoundError:
+            return None
+    
+    def save_chunk(self, upload_id: str, chunk_index: int, chunk_data, total_chunks: int) -> Dict:
+        """
+        Grava uma parte de um upload em partes (vídeos grandes / redes móveis)
+        Reenviar a mesma parte a substitui: o cliente retoma de onde parou
+        
+        Args:
+            upload_id: ID gerado pelo cliente (8 a 64 caracteres [A-Za-z0-9_-])
+            chunk_index: Índice da parte (0 a total_chunks - 1)
+            chunk_data: Stream com os bytes da parte
+            total_chunks: Total de partes do arquivo
+        
+        Returns:
+            Dict com resultado e partes já recebidas
+        """
+        chunk_dir = self._chunk_dir(upload_id)
+        if chunk_dir is None:
+            return {
+                'success': False,
+                'error': _(TR_INVALID_UPLOAD_ID),
+                'code': 'INVALID_UPLOAD_ID'
+            }
+        
+        if not (0 < total_chunks <= MAX_UPLOAD_CHUNKS and 0 <= chunk_index < total_chunks):
+            return {
+                'success': False,
+                'error': _(TR_INVALID_CHUNK),
+                'code': 'INVALID_CHUNK'
+            }
+        
+        self._sweep_stale_chunks()
+        
+        try:
+            os.makedirs(chunk_dir, exist_ok=True)
+            
+            # Total de partes guardado junto delas (lido no finalize)
+            self._replace_file(os.path.join(chunk_dir, 'total'), str(total_chunks).encode())
+            
+            # Parte gravada em temporário e renomeada: parte incompleta nunca fica visível
+            part_path = os.path.join(chunk_dir, f'{chunk_index}.part')
+            tmp_path = f'{part_path}.{secrets.token_hex(4)}.tmp'
+            size = 0
+            with open(tmp_path, 'wb') as out:
+                for block in iter(lambda: chunk_data.read(self.chunk_size), b""):
+                    size += len(block)
+                    if size > MAX_CHUNK_SIZE:
+                        break
+                    out.write(block)
+            
+            if size > MAX_CHUNK_SIZE:
+                os.remove(tmp_path)
+                return {
+                    'success': False,
+                    'error': _(TR_CHUNK_TOO_LARGE, max_size=f'{MAX_CHUNK_SIZE // (1024 * 1024)}MB'),
+                    'code': 'CHUNK_TOO_LARGE'
+                }
+            
+            # Soma das partes (reenvio desta parte substitui a anterior) limitada ao maior arquivo aceito
+            received = self._received_size(chunk_dir, exclude=f'{chunk_index}.part')
+            if received + size > self.MAX_CHUNKED_SIZE:
+                os.remove(tmp_path)
+                return {
+                    'success': False,
+                    'error': _(TR_FILE_TOO_LARGE,
+                              size=f'{(received + size) / (1024 * 1024):.1f}MB',
+                              max_size=f'{self.MAX_CHUNKED_SIZE // (1024 * 1024)}MB'),
+                    'code': 'FILE_TOO_LARGE'
+                }
+            os.replace(tmp_path, part_path)
+            
+            return {
+                'success': True,
+                'upload_id': upload_id,
+                'chunk_index': chunk_index,
+                'total_chunks': total_chunks,
+                'received_chunks': self.get_received_chunks(upload_id) or []
+            }
+            
+        except Exception as e:
+            return {
+                'success': False,
+                'error': _('upload.error.save_failed', error=str(e)),
+                'code': 'SAVE_FAILED'
+            }
+    
+    def finalize_upload(self, upload_id: str, original_filename: str, category: str = 'posts',
+                        user_id: int = None) -> Dict:
+        """
+        Junta as partes de um upload em partes no arquivo final
+        Validação (extensão, MIME, tamanho) antes de concatenar; hash do arquivo final
+        
+        Args:
+            upload_id: ID do upload em partes
+            original_filename: Nome original do arquivo
+            category: Categoria de destino ('avatars', 'posts', 'documents', 'chat')
+            user_id: ID do usuário
+        
+        Returns:
+            Dict com informações do arquivo salvo (mesmo formato de save_file)
+        """
+        chunk_dir = self._chunk_dir(upload_id)
+        if chunk_dir is None:
+            return {
+                'success': False,
+                'error': _(TR_INVALID_UPLOAD_ID),
+                'code': 'INVALID_UPLOAD_ID'
+            }
+        
+        if category not in CHUNKED_UPLOAD_CATEGORIES:
+            return {
+                'success': False,
+                'error': _(TR_INVALID_CATEGORY),
+                'code': 'INVALID_CATEGORY'
+            }
+        
+        try:
+            try:
+                with open(os.path.join(chunk_dir, 'total'), 'rb') as total_file:
+                    total_chunks = int(total_file.read())
+            except FileNotFoundError:
+                return {
+                    'success': False,
+                    'error': _(TR_UPLOAD_NOT_FOUND),
+                    'code': 'UPLOAD_NOT_FOUND'
+                }
+            
+            # Todas as partes presentes (o stat já dá o tamanho total)
+            part_paths = [os.path.join(chunk_dir, f'{index}.part') for index in range(total_chunks)]
+            sizes = []
+            for part_path in part_paths:
+                try:
+                    sizes.append(os.stat(part_path).st_size)
+                except FileNotFoundError:
+                    pass
+            if len(sizes) < total_chunks:
+                return {
+                    'success': False,
+                    'error': _(TR_MISSING_CHUNKS, missing=total_chunks - len(sizes)),
+                    'code': 'MISSING_CHUNKS'
+                }
+            
+            # Tipo esperado pela categoria (como em save_file); posts e chat aceitam vídeo
+            filename = secure_filename(original_filename or '')
+            if not filename:
+                return {
+                    'success': False,
+                    'error': _(TR_INVALID_FILENAME),
+                    'code': 'INVALID_FILENAME'
+                }
+            file_ext = filename.rsplit('.', 1)[1].lower() if '.' in filename else ''
+            allowed_types = self.CHUNKED_FILE_TYPES[category]
+            file_type = next(
+                (name for name in allowed_types if file_ext in self.ALLOWED_EXTENSIONS[name]),
+                None
+            )
+            if file_type is None:
+                return {
+                    'success': False,
+                    'error': _(TR_INVALID_EXTENSION, extension=file_ext,
+                              allowed=', '.join(self._ALLOWED_DISPLAY[name] for name in allowed_types)),
+                    'code': 'INVALID_EXTENSION'
+                }
+            
+            file_size = sum(sizes)
+            if file_size == 0:
+                return {
+                    'success': False,
+                    'error': _(TR_EMPTY_FILE),
+                    'code': 'EMPTY_FILE'
+                }
+            max_size = self.MAX_SIZES.get(file_type, self.max_file_size)
+            if file_size > max_size:
+                return {
+                    'success': False,
+                    'error': _(TR_FILE_TOO_LARGE,
+                              size=f'{file_size/(1024*1024):.1f}MB',
+                              max_size=f'{max_size / (1024 * 1024):.0f}MB'),
+                    'code': 'FILE_TOO_LARGE'
+                }
+            
+            # MIME pelo conteúdo (mesma detecção de validate_file): cabeçalho da 1ª parte
+            if MAGIC_AVAILABLE:
+                with open(part_paths[0], 'rb') as first_part:
+                    mime_type = self._sniff_mime_type(first_part, file_ext)
+            else:
+                mime_type = mimetypes.guess_type(filename)[0]
+            if mime_type not in self.SAFE_MIME_TYPES:
+                return {
+                    'success': False,
+                    'error': _(TR_INVALID_MIME_TYPE, mime_type=mime_type),
+                    'code': 'INVALID_MIME_TYPE'
+                }
+            
+            # Partes concatenadas em ordem num temporário da pasta de destino;
+            # o nome final é o hash do conteúdo (mesmo esquema de save_file)
+            upload_dir = self.category_dirs[category]
+            tmp_path = os.path.join(upload_dir, f'.{secrets.token_hex(8)}.tmp')
+            fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o644)
+            try:
+                try:
+                    for part_path, part_size in zip(part_paths, sizes):
+                        self._append_file(fd, part_path, part_size)
+                finally:
+                    os.close(fd)
+                with open(tmp_path, 'rb') as assembled:
+                    file_hash = self.calculate_file_hash(assembled)
+            except BaseException:
+                os.remove(tmp_path)
+                raise
+            
+            file_hash, stored_name, file_path, deduplicated = self._store_content_addressed(
+                tmp_path, file_hash, upload_dir, file_ext
+            )
+            
+            shutil.rmtree(chunk_dir, ignore_errors=True)
+            
+            return {
+                'success': True,
+                'file_info': {
+                    'filename': stored_name,
+                    'original_filename': original_filename,
+                    'file_path': file_path,
+                    'file_url': f"/uploads/{category}/{stored_name}",
+                    'category': category,
+                    'file_size': file_size,
+                    'mime_type': mime_type,
+                    'file_hash': file_hash,
+                    'user_id': user_id,
+                    'uploaded_at': datetime.now().isoformat(),
+                    'file_ext': file_ext,
+                    'deduplicated': deduplicated
                 }
             }
             
@@ -312,17 +912,88 @@ class FileUploadService:
                 'code': 'SAVE_FAILED'
             }
     
-    def delete_file(self, file_path: str) -> Dict:
+    @staticmethod
+    def _received_size(chunk_dir: str, exclude: str = None) -> int:
+        """Bytes das partes já gravadas de um upload (exclude: parte sendo substituída)"""
+        total = 0
+        with os.scandir(chunk_dir) as entries:
+            for entry in entries:
+                if entry.name.endswith('.part') and entry.name != exclude:
+                    try:
+                        total += entry.stat().st_size
+                    except FileNotFoundError:
+                        continue
+        return total
+    
+    def _sweep_stale_chunks(self):
+        """Apaga uploads em partes sem atividade há mais de CHUNK_UPLOAD_TTL"""
+        global _last_chunk_sweep
+        now = time.time()
+        with _chunk_sweep_lock:
+            if now - _last_chunk_sweep < CHUNK_SWEEP_INTERVAL:
+                return
+            _last_chunk_sweep = now
+        
+        # O mtime da pasta muda a cada parte gravada (rename para dentro dela)
+        try:
+            with os.scandir(self.category_dirs['temp']) as entries:
+                for entry in entries:
+                    if not UPLOAD_ID_PATTERN.match(entry.name) or not entry.is_dir():
+                        continue
+                    try:
+                        if now - entry.stat().st_mtime > CHUNK_UPLOAD_TTL:
+                            shutil.rmtree(entry.path, ignore_errors=True)
+                    except FileNotFoundError:
+                        continue
+        except FileNotFoundError:
+            return
+    
+    def _append_file(self, fd: int, src_path: str, size: int):
+        """Copia src_path para o final de fd (os.sendfile: cópia dentro do kernel)"""
+        with open(src_path, 'rb') as src:
+            if HAS_SENDFILE:
+                offset = 0
+                while offset < size:
+                    sent = os.sendfile(fd, src.fileno(), offset, size - offset)
+                    if not sent:
+                        break
+                    offset += sent
+                return
+            
+            for block in iter(lambda: src.read(self.chunk_size), b""):
+                view = memoryview(block)
+                while view:
+                    view = view[os.write(fd, view):]
+    
+    @staticmethod
+    def _replace_file(path: str, content: bytes):
+        """Grava content em path de forma atômica (temporário + rename)"""
+        tmp_path = f'{path}.{secrets.token_hex(4)}.tmp'
+        with open(tmp_path, 'wb') as out:
+            out.write(content)
+        os.replace(tmp_path, path)
+    
+    def delete_file(self, file_path: str, file_hash: str = None) -> Dict:
         """
         Remove arquivo do sistema
+        O conteúdo endereçado por hash é compartilhado entre uploads: chamar depois de
+        desativar o registro; o arquivo só sai do disco sem outro upload ativo apontando para ele
         
         Args:
             file_path: Caminho do arquivo a ser removido
+            file_hash: SHA-256 do conteúdo (opcional; deduzido do nome <hash>.<ext>)
         
         Returns:
-            Dict com resultado da operação
+            Dict com resultado da operação (shared=True se o arquivo foi mantido)
         """
         try:
+            if self._is_referenced(file_path, file_hash):
+                return {
+                    'success': True,
+                    'message': _('upload.delete.success'),
+                    'shared': True
+                }
+            
             if os.path.exists(file_path):
                 os.remove(file_path)
                 return {
@@ -342,6 +1013,20 @@ class FileUploadService:
                 'code': 'DELETE_FAILED'
             }
     
+    @staticmethod
+    def _is_referenced(file_path: str, file_hash: str = None) -> bool:
+        """True se algum upload ativo em file_uploads usa o mesmo conteúdo (hash) ou caminho"""
+        if file_hash is None:
+            match = CONTENT_HASH_NAME.match(os.path.basename(file_path))
+            file_hash = match.group(1) if match else None
+        
+        references = [FileUpload.file_path == file_path]
+        if file_hash:
+            references.append(FileUpload.file_hash == file_hash)
+        return db.session.query(
+            db.session.query(FileUpload.id).filter(FileUpload.is_active == True, or_(*references)).exists()
+        ).scalar()
+    
     def get_file_info(self, file_path: str) -> Dict:
         """
         Obtém informações detalhadas de um arquivo
@@ -353,68 +1038,72 @@ class FileUploadService:
             Dict com informações do arquivo
         """
         try:
-            if not os.path.exists(file_path):
-                return {
-                    'exists': False,
-                    'error': _('upload.info.file_not_found')
-                }
-            
+            # Um único stat: o FileNotFoundError substitui o os.path.exists prévio
             stats = os.stat(file_path)
-            filename = os.path.basename(file_path)
-            file_ext = filename.rsplit('.', 1)[1].lower() if '.' in filename else ''
-            
+        except FileNotFoundError:
             return {
-                'exists': True,
-                'filename': filename,
-                'file_size': stats.st_size,
-                'file_ext': file_ext,
-                'created_at': datetime.fromtimestamp(stats.st_ctime).isoformat(),
-                'modified_at': datetime.fromtimestamp(stats.st_mtime).isoformat(),
-                'file_path': file_path
+                'exists': False,
+                'error': _('upload.info.file_not_found')
             }
-            
         except Exception as e:
             return {
                 'exists': False,
                 'error': _('upload.info.failed', error=str(e))
             }
+        
+        return self._stat_info(os.path.basename(file_path), file_path, stats)
     
-    def list_user_files(self, user_id: int, category: str = None) -> List[Dict]:
+    @staticmethod
+    def _stat_info(filename: str, file_path: str, stats: os.stat_result) -> Dict:
+        """Dict de informações do arquivo a partir de um stat já obtido"""
+        return {
+            'exists': True,
+            'filename': filename,
+            'file_size': stats.st_size,
+            'file_ext': filename.rsplit('.', 1)[1].lower() if '.' in filename else '',
+            'created_at': datetime.fromtimestamp(stats.st_ctime).isoformat(),
+            'modified_at': datetime.fromtimestamp(stats.st_mtime).isoformat(),
+            'file_path': file_path
+        }
+    
+    def list_user_files(self, user_id: int, category: str = None, limit: int = None) -> List[Dict]:
         """
-        Lista arquivos de um usuário
+        Lista arquivos de um usuário a partir de file_uploads
+        (os nomes no disco são o hash do conteúdo, sem o usuário: a listagem vem do banco)
         
         Args:
             user_id: ID do usuário
             category: Categoria específica (opcional)
+            limit: Máximo de arquivos (os mais recentes); None lista todos
         
         Returns:
-            Lista de arquivos do usuário
+            Lista de arquivos do usuário (mais recente primeiro)
         """
-        files = []
-        
-        # Categorias a verificar
+        # Categorias a verificar (índice user_id + category)
         categories = [category] if category else ['avatars', 'posts', 'documents', 'chat']
         
-        for cat in categories:
-            cat_dir = os.path.join(self.base_upload_dir, cat)
-            if not os.path.exists(cat_dir):
-                continue
-            
-            # Buscar arquivos do usuário
-            for filename in os.listdir(cat_dir):
-                if filename.startswith(f"user_{user_id}_"):
-                    file_path = os.path.join(cat_dir, filename)
-                    file_info = self.get_file_info(file_path)
-                    
-                    if file_info['exists']:
-                        file_info['category'] = cat
-                        file_info['file_url'] = f"/uploads/{cat}/{filename}"
-                        files.append(file_info)
-        
-        # Ordenar por data de criação (mais recente primeiro)
-        files.sort(key=lambda x: x.get('created_at', ''), reverse=True)
-        
-        return files
+        query = db.session.query(
+            FileUpload.filename, FileUpload.category, FileUpload.file_path, FileUpload.file_url,
+            FileUpload.file_size, FileUpload.file_ext, FileUpload.created_at, FileUpload.updated_at
+        ).filter(
+            FileUpload.user_id == user_id,
+            FileUpload.category.in_(categories),
+            FileUpload.is_active == True
+        ).order_by(FileUpload.created_at.desc())
+        if limit is not None:
+            query = query.limit(max(limit, 0))
+        
+        return [{
+            'exists': True,
+            'filename': row.filename,
+            'file_size': row.file_size,
+            'file_ext': row.file_ext,
+            'created_at': row.created_at.isoformat() if row.created_at else None,
+            'modified_at': (row.updated_at or row.created_at).isoformat() if row.created_at else None,
+            'file_path': row.file_path,
+            'category': row.category,
+            'file_url': row.file_url
+        } for row in query]
 
 # Instância global do serviço
 file_service = FileUploadService()
\ No newline at end of file
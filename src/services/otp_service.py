@@ -1,22 +1,90 @@
 from src.models import db
 from src.services.sms_service import SMSService
-import random
-import string
+import hmac
+import os
+import secrets
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable
+
+# Redis opcional para os códigos (compartilhados entre workers)
+try:
+    import redis
+    REDIS_AVAILABLE = True
+except ImportError:
+    REDIS_AVAILABLE = False
+
+# Códigos OTP expiram em 10 minutos (mesmo prazo do texto do SMS)
+OTP_CODE_TTL = 600
+
+REDIS_URL = os.getenv('REDIS_URL')
+_redis = redis.Redis.from_url(REDIS_URL, decode_responses=True) if REDIS_AVAILABLE and REDIS_URL else None
+
+# Fallback em memória (um único worker), compartilhado entre instâncias:
+# telefone -> (código, expira_em)
+_local_codes = {}
+_local_lock = threading.Lock()
+
+# Envios em lote: chamadas ao provedor (I/O de rede) em paralelo
+_SMS_POOL = ThreadPoolExecutor(max_workers=16, thread_name_prefix='sms-batch')
+
+def codes_match(expected, code) -> bool:
+    """
+    Compara códigos de verificação em tempo constante (hmac.compare_digest):
+    o == para no primeiro caractere diferente e vaza o prefixo pelo tempo de resposta
+    """
+    if not expected or code is None:
+        return False
+    return hmac.compare_digest(str(expected).encode(), str(code).encode())
 
 class OTPService:
     """Serviço para gerenciamento de OTP com integração Twilio real"""
     
     def __init__(self):
         self.sms_service = SMSService()
-        # Dicionário para armazenar códigos temporários (em produção, usar Redis ou banco)
-        self.verification_codes = {}
         
         # Flag para modo de desenvolvimento
         self.dev_mode = False  # Alterar para False em produção
     
+    def _store_code(self, phone_number: str, otp_code: str):
+        """Armazena o código com expiração de OTP_CODE_TTL segundos"""
+        self._store_codes({phone_number: otp_code})
+    
+    def _store_codes(self, codes: Dict[str, str]):
+        """Armazena vários códigos (telefone -> código) num único round trip ao Redis"""
+        if not codes:
+            return
+        
+        if _redis is not None:
+            pipe = _redis.pipeline(transaction=False)
+            for phone_number, otp_code in codes.items():
+                pipe.setex(f'otp:{phone_number}', OTP_CODE_TTL, otp_code)
+            pipe.execute()
+            return
+        
+        now = time.monotonic()
+        with _local_lock:
+            if len(_local_codes) > 10000:
+                for key in [k for k, (_, exp) in _local_codes.items() if exp <= now]:
+                    del _local_codes[key]
+            for phone_number, otp_code in codes.items():
+                _local_codes[phone_number] = (otp_code, now + OTP_CODE_TTL)
+    
+    def _pop_code(self, phone_number: str):
+        """Lê e remove o código numa única operação atômica (None se expirado)"""
+        if _redis is not None:
+            return _redis.getdel(f'otp:{phone_number}')
+        
+        with _local_lock:
+            entry = _local_codes.pop(phone_number, None)
+        if entry is None or entry[1] <= time.monotonic():
+            return None
+        return entry[0]
+    
     def generate_otp(self) -> str:
-        """Gera um código OTP de 6 dígitos"""
-        return ''.join(random.choices(string.digits, k=6))
+        """Gera um código OTP de 6 dígitos (CSPRNG)"""
+        return f"{secrets.randbelow(1_000_000):06d}"
     
     def send_otp(self, phone_number: str) -> bool:
         """
@@ -38,7 +106,7 @@ class OTPService:
                 print(f"[OTP SERVICE - DEV MODE] Código OTP: {otp_code}")
                 
                 # Armazenar código para verificação
-                self.verification_codes[phone_number] = otp_code
+                self._store_code(phone_number, otp_code)
                 return True
             
             # Modo de produção - envio real via Twilio
@@ -52,24 +120,56 @@ class OTPService:
         """
         Envia SMS real usando Twilio
         """
+        if self._deliver_sms(phone_number, otp_code):
+            # Armazenar código para verificação
+            self._store_code(phone_number, otp_code)
+            return True
+        return False
+    
+    def _deliver_sms(self, phone_number: str, otp_code: str) -> bool:
+        """Envia o SMS com o código (sem armazenar); True se o provedor aceitou"""
         try:
             message_body = f"Seu código de verificação SYMPLLE é: {otp_code}. Este código expira em 10 minutos."
             
-            success = self.sms_service.send_sms(phone_number, message_body)
+            result = self.sms_service.send_sms(phone_number, message_body)
             
+            # send_sms devolve um dict: o resultado está em 'success'
+            success = result.get('success', False) if isinstance(result, dict) else bool(result)
             if success:
-                # Armazenar código para verificação
-                self.verification_codes[phone_number] = otp_code
                 print(f"[OTP SERVICE] SMS enviado com sucesso para: {phone_number}")
-                return True
             else:
                 print(f"[OTP SERVICE] Falha ao enviar SMS para: {phone_number}")
-                return False
+            return success
                 
         except Exception as e:
             print(f"[OTP SERVICE] Erro ao enviar SMS real: {e}")
             return False
     
+    def send_otp_batch(self, phone_numbers: Iterable[str], codes: Dict[str, str] = None) -> Dict[str, bool]:
+        """
+        Envia códigos OTP para vários telefones de uma vez
+        Envios ao provedor em paralelo; códigos armazenados num único round trip
+        
+        Args:
+            phone_numbers: Números de telefone (repetidos recebem um único SMS)
+            codes: Códigos já gerados por telefone (ex: os salvos em PhoneOTP); senão gera
+            
+        Returns:
+            Dict telefone -> True se enviado com sucesso
+        """
+        codes = codes or {}
+        codes = {phone: codes.get(phone) or self.generate_otp() for phone in dict.fromkeys(phone_numbers)}
+        
+        if self.dev_mode:
+            print(f"[OTP SERVICE - DEV MODE] Simulando envio de {len(codes)} SMS")
+            results = dict.fromkeys(codes, True)
+        else:
+            sent = _SMS_POOL.map(lambda item: self._deliver_sms(*item), codes.items())
+            results = dict(zip(codes, sent))
+        
+        self._store_codes({phone: codes[phone] for phone, success in results.items() if success})
+        return results
+    
     def verify_otp(self, phone_number: str, code: str) -> bool:
         """
         Verifica se o código OTP está correto
@@ -82,19 +182,14 @@ class OTPService:
             bool: True se o código estiver correto, False caso contrário
         """
         try:
-            stored_code = self.verification_codes.get(phone_number)
-            
             # Em modo dev, aceitar código padrão 123456
-            if self.dev_mode and code == '123456':
+            if self.dev_mode and codes_match('123456', code):
                 return True
             
-            # Verificar código armazenado
-            if stored_code and stored_code == code:
-                # Remover código após verificação bem-sucedida
-                del self.verification_codes[phone_number]
-                return True
-            
-            return False
+            # Código consumido na leitura (GETDEL): uma tentativa por código,
+            # sem corrida entre workers verificando o mesmo telefone
+            stored_code = self._pop_code(phone_number)
+            return codes_match(stored_code, code)
             
         except Exception as e:
             print(f"[OTP SERVICE] Erro ao verificar OTP: {e}")
@@ -0,0 +1,202 @@
+# src/services/timeline_cache.py
+"""
+Cache de curta duração para timeline e trending
+Redis (REDIS_URL) compartilhado entre workers; senão dict em memória por processo
+"""
+
+import json
+import logging
+import math
+import os
+import threading
+import time
+from datetime import datetime
+
+# Redis opcional (mesmo padrão dos códigos de verificação)
+try:
+    import redis
+    REDIS_AVAILABLE = True
+except ImportError:
+    REDIS_AVAILABLE = False
+
+# Serialização JSON rápida (opcional) das timelines guardadas no Redis
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+if ORJSON_AVAILABLE:
+    _dumps, _loads = orjson.dumps, orjson.loads
+else:
+    _dumps, _loads = json.dumps, json.loads
+
+# Timeline por usuário: 30s de defasagem; trending (global): 60s
+TIMELINE_CACHE_TTL = 30
+TRENDING_CACHE_TTL = 60
+
+# Ranking da 1ª página da timeline inteligente: igual para todos os usuários
+# (só posts públicos), guardado como ids + scores, não como resposta pronta
+SMART_RANKING_TTL = 60
+
+# Ranking de trending pré-calculado por scripts/compute_trending.py
+TRENDING_ZSET_KEY = 'trending:global'
+TRENDING_ZSET_SIZE = 200
+
+# Mesma fórmula do job: peso de cada interação, decaimento exp(-idade_horas / 24)
+# e janela de 24h (posts mais antigos só saem na próxima execução do job)
+TRENDING_WEIGHTS = {'like': 1, 'comment': 2, 'share': 3}
+TRENDING_WINDOW_HOURS = 24
+
+# Fallback em memória: limite de entradas antes de podar as expiradas
+_LOCAL_CACHE_MAX = 5000
+
+logger = logging.getLogger(__name__)
+
+REDIS_URL = os.getenv('REDIS_URL')
+_redis = redis.Redis.from_url(REDIS_URL) if REDIS_AVAILABLE and REDIS_URL else None
+
+# key -> (expira_em, valor)
+_local_cache = {}
+_local_lock = threading.Lock()
+
+# Geração das timelines: incrementada a cada novo post, invalida todas as
+# chaves tl:* antigas de uma vez (expiram sozinhas pelo TTL)
+_GENERATION_KEY = 'tl:gen'
+_local_generation = 0
+
+def _generation():
+    """Geração atual das timelines (a local se o Redis estiver fora)"""
+    if _redis is not None:
+        try:
+            return int(_redis.get(_GENERATION_KEY) or 0)
+        except redis.RedisError as e:
+            logger.warning("Redis indisponível para a geração das timelines: %s", e)
+    return _local_generation
+
+def timeline_key(user_id, algorithm, offset, limit, cursor=None):
+    """Chave da timeline de um usuário para a página pedida (offset ou cursor)"""
+    return f"tl:{_generation()}:{user_id}:{algorithm}:{offset}:{limit}:{cursor or ''}"
+
+def smart_ranking_key(limit):
+    """Chave do ranking da 1ª página smart (na geração atual: novos posts invalidam)"""
+    return f"tl:{_generation()}:smart:public:{limit}"
+
+def trending_key(limit):
+    """Chave do trending (não depende do usuário)"""
+    return f"trending:{limit}"
+
+def get_or_set(key, ttl, compute, cacheable=None):
+    """
+    Retorna o valor em cache ou calcula com compute() e armazena por ttl segundos
+    cacheable(valor) -> False evita guardar respostas de erro
+    Redis fora do ar: calcula direto do banco (sem cache) em vez de falhar o request
+    """
+    if _redis is not None:
+        try:
+            cached = _redis.get(key)
+        except redis.RedisError as e:
+            logger.warning("Redis indisponível para o cache %s: %s", key, e)
+            return compute()
+        if cached is not None:
+            return _loads(cached)
+    else:
+        entry = _local_cache.get(key)
+        if entry is not None and entry[0] > time.monotonic():
+            return entry[1]
+    
+    value = compute()
+    if cacheable is not None and not cacheable(value):
+        return value
+    
+    if _redis is not None:
+        try:
+            _redis.setex(key, ttl, _dumps(value))
+        except redis.RedisError as e:
+            logger.warning("Erro ao gravar o cache %s: %s", key, e)
+    else:
+        now = time.monotonic()
+        with _local_lock:
+            if len(_local_cache) > _LOCAL_CACHE_MAX:
+                for stale in [k for k, (exp, _) in _local_cache.items() if exp <= now]:
+                    del _local_cache[stale]
+            _local_cache[key] = (now + ttl, value)
+    return value
+
+def invalidate_timelines():
+    """Descarta as timelines em cache (chamar após criar um post)"""
+    global _local_generation
+    if _redis is not None:
+        try:
+            _redis.incr(_GENERATION_KEY)
+            return
+        except redis.RedisError as e:
+            # Enquanto o Redis estiver fora as chaves usam a geração local
+            logger.warning("Erro ao invalidar timelines no Redis: %s", e)
+    
+    with _local_lock:
+        _local_generation += 1
+        for key in [k for k in _local_cache if k.startswith('tl:')]:
+            del _local_cache[key]
+
+def store_trending(scores):
+    """
+    Substitui o ranking global {post_id: score} (mantém os TRENDING_ZSET_SIZE maiores)
+    Retorna False sem Redis: o ranking só faz sentido compartilhado entre workers
+    """
+    if _redis is None:
+        return False
+    
+    pipe = _redis.pipeline(transaction=True)
+    pipe.delete(TRENDING_ZSET_KEY)
+    if scores:
+        pipe.zadd(TRENDING_ZSET_KEY, scores)
+        pipe.zremrangebyrank(TRENDING_ZSET_KEY, 0, -(TRENDING_ZSET_SIZE + 1))
+    pipe.execute()
+    return True
+
+def read_trending(limit):
+    """
+    [(post_id, score)] do ranking pré-calculado, maior score primeiro
+    None se não houver Redis ou o job ainda não rodou (calcular sob demanda)
+    """
+    if _redis is None:
+        return None
+    
+    try:
+        ranked = _redis.zrevrange(TRENDING_ZSET_KEY, 0, limit - 1, withscores=True)
+    except redis.RedisError as e:
+        logger.warning("Redis indisponível para o trending: %s", e)
+        return None
+    if not ranked:
+        return None
+    return [(int(post_id), score) for post_id, score in ranked]
+
+def record_engagement(post_id, kind, created_at, count=1):
+    """
+    Aplica uma interação ao ranking na hora (ZINCRBY com o peso e o decaimento do job),
+    sem esperar a próxima execução de scripts/compute_trending.py
+    kind: 'like' | 'comment' | 'share'; count=-1 desfaz (ex: descurtir)
+    created_at: datetime ou string ISO do post
+    """
+    if _redis is None or not created_at:
+        return
+    
+    if isinstance(created_at, str):
+        created_at = datetime.fromisoformat(created_at)
+    age_hours = max((datetime.utcnow() - created_at).total_seconds() / 3600.0, 0.0)
+    if age_hours > TRENDING_WINDOW_HOURS:
+        return
+    
+    delta = TRENDING_WEIGHTS[kind] * count * math.exp(-age_hours / 24.0)
+    try:
+        # Sem ranking publicado (job não rodou): não cria um ranking parcial
+        if not _redis.exists(TRENDING_ZSET_KEY):
+            return
+        pipe = _redis.pipeline(transaction=True)
+        pipe.zincrby(TRENDING_ZSET_KEY, delta, post_id)
+        pipe.zremrangebyscore(TRENDING_ZSET_KEY, '-inf', 0)
+        pipe.zremrangebyrank(TRENDING_ZSET_KEY, 0, -(TRENDING_ZSET_SIZE + 1))
+        pipe.execute()
+    except redis.RedisError as e:
+        logger.warning("Erro ao atualizar trending: %s", e)
@@ -4,15 +4,160 @@ Serviço de Timeline Personalizada do Symplle
 Algoritmo inteligente para ordenar posts na timeline
 """
 
+import base64
+import heapq
 import json
+import logging
 from datetime import datetime, timedelta
-from sqlalchemy import desc, and_, or_, func
-from sqlalchemy.orm import joinedload
+from functools import lru_cache
+from sqlalchemy import desc, and_, or_, func, bindparam, exists, tuple_, DateTime
+from sqlalchemy.orm import selectinload
 
 # ✅ CORRIGIDO: Imports absolutos
 from models import db
 from models.post import Post, Like, Comment, PostPrivacy
 from models.user import User
+from services.timeline_cache import SMART_RANKING_TTL, get_or_set, smart_ranking_key
+
+logger = logging.getLogger(__name__)
+
+# Autores via selectinload: um SELECT ... WHERE id IN (autores únicos) em vez de
+# repetir as colunas do usuário em cada linha; autores já presentes no identity
+# map da sessão (cache por request) não são buscados de novo, p.ex. o autor
+# de um post que também comentou. Só as colunas usadas em to_dict() dos posts
+# e comentários (sem email, telefone, flags de verificação...)
+AUTHOR_COLUMNS = (User.username, User.first_name, User.last_name)
+AUTHOR_LOAD = selectinload(Post.user).load_only(*AUTHOR_COLUMNS)
+COMMENT_AUTHOR_LOAD = selectinload(Comment.user).load_only(*AUTHOR_COLUMNS)
+
+# Dados carregados em lote para a página inteira de posts (evita N+1):
+# 'liked' = curtidas do usuário atual, 'recent_comments' = prévia de comentários
+DEFAULT_PREFETCH = ('liked', 'recent_comments')
+
+# Comentários de prévia por post
+RECENT_COMMENTS_LIMIT = 3
+
+# Expressões de score montadas uma vez (não por request); o que varia entre
+# requests entra como bind param, então o SQL compilado também é reaproveitado
+# pelo cache de statements do SQLAlchemy
+POPULARITY_SCORE = (
+    func.coalesce(Post.likes_count, 0) * 2 +  # Likes valem mais
+    func.coalesce(Post.comments_count, 0) * 3 +  # Comentários valem mais ainda
+    func.coalesce(Post.shares_count, 0) * 1.5  # Shares moderados
+)
+
+# Filtro fixo de todas as timelines e do trending: posts públicos não apagados
+PUBLIC_FEED_FILTER = (
+    Post.is_deleted == False,
+    Post.privacy == PostPrivacy.PUBLIC
+)
+
+# Trending sob demanda: engajamento mínimo e lote de leitura da varredura
+TRENDING_MIN_SCORE = 5
+TRENDING_SCAN_BATCH = 1000
+
+# "Agora" da recência da timeline inteligente (Query.params(score_now=...))
+SCORE_NOW = bindparam('score_now', type_=DateTime)
+
+@lru_cache(maxsize=8)
+def _smart_score(dialect_name, recency_weight):
+    """
+    Score final da timeline inteligente na sintaxe do banco configurado
+    Engajamento e tipo de conteúdo já vêm da coluna gerada Post.engagement_plus_content
+    """
+    # Score de recência (posts mais recentes pontuam mais)
+    # Usar diferença em horas e converter para score 0-100
+    if dialect_name == 'sqlite':
+        hours_diff = (func.julianday(SCORE_NOW) - func.julianday(Post.created_at)) * 24.0
+        recency_score = func.max(0, 100 - hours_diff / 24.0 * 10)  # Decai ao longo dos dias
+    else:
+        hours_diff = func.extract('epoch', SCORE_NOW - Post.created_at) / 3600.0
+        recency_score = func.greatest(0, 100 - hours_diff / 24.0 * 10)
+    
+    return Post.engagement_plus_content + recency_score * recency_weight
+
+def encode_cursor(algorithm, values):
+    """
+    Cursor opaco (base64 url-safe) da paginação por chave:
+    algoritmo + chave de ordenação do último post da página
+    """
+    payload = json.dumps([algorithm, values], separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+def decode_cursor(cursor):
+    """(algoritmo, valores) de um cursor; ValueError se inválido"""
+    try:
+        payload = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        algorithm, values = json.loads(payload)
+    except (ValueError, TypeError) as e:
+        raise ValueError('Cursor inválido') from e
+    if not isinstance(values, list):
+        raise ValueError('Cursor inválido')
+    return algorithm, values
+
+def _after_key(score, score_value, created_at, post_id):
+    """
+    WHERE da página seguinte para ORDER BY score DESC, created_at DESC, id DESC
+    (score None = só created_at, id); usa o índice em vez de pular OFFSET linhas
+    """
+    if score is None:
+        # Row value: o planner faz busca por faixa em ix_posts_feed_chrono
+        # (o OR equivalente vira varredura do índice desde o início)
+        return tuple_(Post.created_at, Post.id) < tuple_(created_at, post_id)
+    after_created = or_(
+        Post.created_at < created_at,
+        and_(Post.created_at == created_at, Post.id < post_id)
+    )
+    return or_(score < score_value, and_(score == score_value, after_created))
+
+# Acima de 1 dia o rótulo só depende do número de dias
+MINUTES_PER_DAY = 24 * 60
+
+@lru_cache(maxsize=4096)
+def _relative_time_label(minutes):
+    """
+    Rótulo de tempo relativo para uma idade em minutos (ex: "há 2 horas");
+    o mesmo para todos os posts com a mesma idade, em qualquer request
+    """
+    days = minutes // MINUTES_PER_DAY
+    if days > 0:
+        if days == 1:
+            return "há 1 dia"
+        elif days < 7:
+            return f"há {days} dias"
+        elif days < 30:
+            weeks = days // 7
+            return f"há {weeks} semana{'s' if weeks > 1 else ''}"
+        else:
+            months = days // 30
+            return f"há {months} {'meses' if months > 1 else 'mês'}"
+    
+    hours = minutes // 60
+    if hours > 0:
+        return f"há {hours} hora{'s' if hours > 1 else ''}"
+    
+    if minutes > 0:
+        return f"há {minutes} minuto{'s' if minutes > 1 else ''}"
+    
+    return "agora mesmo"
+
+def _liked_columns(user_id, prefetch):
+    """
+    Coluna liked_by_me para o próprio SELECT da timeline (EXISTS correlacionado,
+    resolvido pelo índice único likes(user_id, post_id)); vazia se 'liked' não
+    estiver no prefetch
+    """
+    if 'liked' not in prefetch:
+        return []
+    return [
+        exists().where(Like.post_id == Post.id, Like.user_id == user_id).correlate(Post).label('liked_by_me')
+    ]
+
+def _split_liked(rows, liked_columns):
+    """(linhas sem a coluna liked_by_me, ids dos posts curtidos ou None)"""
+    if not liked_columns:
+        return rows, None
+    return [row[:-1] for row in rows], {row[0].id for row in rows if row[-1]}
 
 class TimelineService:
     """
@@ -20,181 +165,360 @@ class TimelineService:
     """
     
     def __init__(self):
+        # engagement_weight e content_weight estão embutidos na coluna gerada
+        # Post.engagement_plus_content (models/post.py): altere nos dois lugares
         self.engagement_weight = 0.4  # Peso das interações (likes, comentários)
         self.recency_weight = 0.3     # Peso da recência do post
         self.author_weight = 0.2      # Peso da relevância do autor
         self.content_weight = 0.1     # Peso do tipo de conteúdo
+        
+        # metadata.algorithm_weights: montado uma vez, igual em todas as respostas
+        self.algorithm_weights = {
+            'engagement': self.engagement_weight,
+            'recency': self.recency_weight,
+            'author': self.author_weight,
+            'content': self.content_weight
+        }
     
-    def get_user_timeline(self, user_id, limit=20, offset=0, algorithm='smart'):
+    def get_user_timeline(self, user_id, limit=20, offset=0, algorithm='smart', prefetch=DEFAULT_PREFETCH,
+                          cursor=None):
         """
         Gera timeline personalizada para o usuário
         
         Args:
             user_id: ID do usuário
             limit: Número de posts (max 100)
-            offset: Offset para paginação
+            offset: Offset para paginação (ignorado se houver cursor)
             algorithm: 'smart' | 'chronological' | 'popular'
+            prefetch: dados carregados em lote para todos os posts
+                      ('liked', 'recent_comments'); os omitidos são
+                      consultados post a post
+            cursor: metadata.next_cursor da página anterior (paginação por chave)
         
         Returns:
-            Lista de posts ordenados + metadata
+            Lista de posts ordenados + metadata (com next_cursor)
+        
+        Raises:
+            ValueError: cursor inválido
         """
+        # O cursor indica o algoritmo que gerou a página (o fallback cronológico
+        # gera cursores cronológicos); cursor de outro algoritmo recomeça do início
+        cursor_algorithm, cursor_values = decode_cursor(cursor) if cursor else (None, None)
+        
+        def values_for(name):
+            return cursor_values if cursor_algorithm == name else None
+        
+        # Um único "agora" por request: janela de tempo, score, tempo relativo e generated_at
+        now = datetime.utcnow()
+        
         try:
             if algorithm == 'chronological':
-                return self._get_chronological_timeline(user_id, limit, offset)
+                return self._get_chronological_timeline(
+                    user_id, limit, offset, prefetch, values_for('chronological'), now
+                )
             elif algorithm == 'popular':
-                return self._get_popular_timeline(user_id, limit, offset)
+                return self._get_popular_timeline(user_id, limit, offset, prefetch, values_for('popular'), now)
+            elif cursor_algorithm == 'chronological':
+                # Página seguinte de um fallback anterior
+                return self._get_chronological_timeline(user_id, limit, offset, prefetch, cursor_values, now)
             else:  # smart (default)
-                return self._get_smart_timeline(user_id, limit, offset)
+                return self._get_smart_timeline(user_id, limit, offset, prefetch, values_for('smart'), now)
                 
         except Exception as e:
-            print(f"❌ Erro na timeline: {e}")
+            db.session.rollback()
+            logger.error("Erro na timeline (usando cronológica): %s", e)
             # Fallback para timeline cronológica
-            return self._get_chronological_timeline(user_id, limit, offset)
+            return self._get_chronological_timeline(
+                user_id, limit, offset, prefetch, values_for('chronological'), now
+            )
     
-    def _get_chronological_timeline(self, user_id, limit, offset):
+    def _get_chronological_timeline(self, user_id, limit, offset, prefetch=DEFAULT_PREFETCH, cursor_values=None,
+                                    now=None):
         """Timeline ordenada cronologicamente (mais recente primeiro)"""
+        now = now or datetime.utcnow()
         
         # Query base - posts públicos por enquanto
         # TODO: Adicionar posts de usuários seguidos quando implementar follow system
-        query = db.session.query(Post).options(
-            joinedload(Post.user)
+        liked_columns = _liked_columns(user_id, prefetch)
+        query = db.session.query(Post, *liked_columns).options(
+            AUTHOR_LOAD
         ).filter(
-            Post.is_deleted == False,
-            Post.privacy == PostPrivacy.PUBLIC
+            *PUBLIC_FEED_FILTER
         )
         
-        # Ordenar por data de criação (mais recente primeiro)
-        posts = query.order_by(desc(Post.created_at)).offset(offset).limit(limit).all()
+        # Ordenar por data de criação (mais recente primeiro); id desempata
+        query = query.order_by(desc(Post.created_at), desc(Post.id))
+        if cursor_values:
+            created_at, post_id = datetime.fromisoformat(cursor_values[0]), int(cursor_values[1])
+            rows = query.filter(_after_key(None, None, created_at, post_id)).limit(limit).all()
+        else:
+            rows = query.offset(offset).limit(limit).all()
+        
+        rows, liked_ids = _split_liked(rows, liked_columns)
+        posts = [row[0] for row in rows] if liked_columns else rows
+        
+        next_cursor = None
+        if len(posts) == limit:
+            last = posts[-1]
+            next_cursor = encode_cursor('chronological', [last.created_at.isoformat(), last.id])
         
         return {
-            'posts': [self._enrich_post_data(post, user_id) for post in posts],
+            'posts': self._enrich_posts(posts, user_id, prefetch, now=now, liked_ids=liked_ids),
             'algorithm': 'chronological',
             'total_count': len(posts),
             'metadata': {
                 'limit': limit,
                 'offset': offset,
-                'generated_at': datetime.utcnow().isoformat()
+                'next_cursor': next_cursor,
+                'generated_at': now.isoformat()
             }
         }
     
-    def _get_popular_timeline(self, user_id, limit, offset):
+    def _get_popular_timeline(self, user_id, limit, offset, prefetch=DEFAULT_PREFETCH, cursor_values=None,
+                              now=None):
         """Timeline ordenada por popularidade (mais curtidas/comentários)"""
+        now = now or datetime.utcnow()
         
-        # Calcular score de popularidade
-        popularity_score = (
-            func.coalesce(Post.likes_count, 0) * 2 +  # Likes valem mais
-            func.coalesce(Post.comments_count, 0) * 3 +  # Comentários valem mais ainda
-            func.coalesce(Post.shares_count, 0) * 1.5  # Shares moderados
-        ).label('popularity_score')
-        
-        query = db.session.query(Post, popularity_score).options(
-            joinedload(Post.user)
+        liked_columns = _liked_columns(user_id, prefetch)
+        query = db.session.query(Post, POPULARITY_SCORE.label('popularity_score'), *liked_columns).options(
+            AUTHOR_LOAD
         ).filter(
-            Post.is_deleted == False,
-            Post.privacy == PostPrivacy.PUBLIC,
-            Post.created_at >= datetime.utcnow() - timedelta(days=7)  # Últimos 7 dias
+            *PUBLIC_FEED_FILTER,
+            Post.created_at >= now - timedelta(days=7)  # Últimos 7 dias
         )
         
-        # Ordenar por popularidade e depois por data
-        results = query.order_by(
+        # Ordenar por popularidade e depois por data (id desempata)
+        query = query.order_by(
             desc('popularity_score'),
-            desc(Post.created_at)
-        ).offset(offset).limit(limit).all()
+            desc(Post.created_at),
+            desc(Post.id)
+        )
+        if cursor_values:
+            score, created_at, post_id = (
+                float(cursor_values[0]), datetime.fromisoformat(cursor_values[1]), int(cursor_values[2])
+            )
+            results = query.filter(_after_key(POPULARITY_SCORE, score, created_at, post_id)).limit(limit).all()
+        else:
+            results = query.offset(offset).limit(limit).all()
         
+        results, liked_ids = _split_liked(results, liked_columns)
         posts = [result[0] for result in results]  # Extrair apenas o Post
         
+        next_cursor = None
+        if len(results) == limit:
+            last, last_score = results[-1]
+            next_cursor = encode_cursor('popular', [float(last_score), last.created_at.isoformat(), last.id])
+        
         return {
-            'posts': [self._enrich_post_data(post, user_id) for post in posts],
+            'posts': self._enrich_posts(posts, user_id, prefetch, now=now, liked_ids=liked_ids),
             'algorithm': 'popular',
             'total_count': len(posts),
             'metadata': {
                 'limit': limit,
                 'offset': offset,
+                'next_cursor': next_cursor,
                 'time_range': '7_days',
-                'generated_at': datetime.utcnow().isoformat()
+                'generated_at': now.isoformat()
             }
         }
     
-    def _get_smart_timeline(self, user_id, limit, offset):
+    def _get_smart_timeline(self, user_id, limit, offset, prefetch=DEFAULT_PREFETCH, cursor_values=None,
+                            now=None):
         """Timeline inteligente com algoritmo de relevância"""
+        now = now or datetime.utcnow()
         
         # Calcular score inteligente baseado em múltiplos fatores
-        now = datetime.utcnow()
+        # O cursor guarda o "agora" da primeira página: a recência (e o score)
+        # é a mesma em todas as páginas, senão a chave mudaria entre requests.
+        # Sem cursor, o "agora" é arredondado para a hora: o score muda de hora em hora.
+        # A janela de 30 dias usa o mesmo instante do score
+        if cursor_values:
+            score_now = datetime.fromisoformat(cursor_values[0])
+        else:
+            score_now = now.replace(minute=0, second=0, microsecond=0)
         
-        # Score de engajamento (likes + comentários)
-        engagement_score = (
-            func.coalesce(Post.likes_count, 0) + 
-            func.coalesce(Post.comments_count, 0) * 2
-        )
+        liked_columns = _liked_columns(user_id, prefetch)
         
-        # Score de recência (posts mais recentes pontuam mais)
-        # Usar diferença em horas e converter para score 0-100
-        hours_diff = func.extract('epoch', now - Post.created_at) / 3600.0
-        recency_score = func.greatest(0, 100 - hours_diff / 24.0 * 10)  # Decai ao longo dos dias
-        
-        # Score de tipo de conteúdo (mídia pontua mais)
-        content_score = func.case(
-            (Post.post_type == 'image', 20),
-            (Post.post_type == 'video', 25),
-            (Post.post_type == 'mixed', 30),
-            else_=10  # text
-        )
-        
-        # Score final combinado
-        final_score = (
-            engagement_score * self.engagement_weight +
-            recency_score * self.recency_weight +
-            content_score * self.content_weight
-        ).label('smart_score')
-        
-        query = db.session.query(Post, final_score).options(
-            joinedload(Post.user)
-        ).filter(
-            Post.is_deleted == False,
-            Post.privacy == PostPrivacy.PUBLIC,
-            Post.created_at >= datetime.utcnow() - timedelta(days=30)  # Últimos 30 dias
-        )
+        if not cursor_values and offset == 0:
+            # 1ª página: ranking compartilhado entre usuários (cache de 60s);
+            # por usuário só a hidratação dos posts e o liked_by_me
+            ranking = get_or_set(
+                smart_ranking_key(limit),
+                SMART_RANKING_TTL,
+                lambda: self._rank_smart_first_page(limit, score_now)
+            )
+            score_now = datetime.fromisoformat(ranking['score_now'])
+            ranked = ranking['ranked']
+            results = self._hydrate_smart_ranking(ranked, liked_columns)
+            last_key = ranked[-1] if len(ranked) == limit else None
+        else:
+            query, final_score = self._smart_query(score_now, Post)
+            query = query.add_columns(*liked_columns).options(AUTHOR_LOAD)
+            if cursor_values:
+                score, created_at, post_id = (
+                    float(cursor_values[1]), datetime.fromisoformat(cursor_values[2]), int(cursor_values[3])
+                )
+                results = query.filter(_after_key(final_score, score, created_at, post_id)).limit(limit).all()
+            else:
+                results = query.offset(offset).limit(limit).all()
+            last_key = None
+            if len(results) == limit:
+                last_post, last_score = results[-1][0], results[-1][1]
+                last_key = [last_post.id, float(last_score), last_post.created_at.isoformat()]
         
-        # Ordenar por score inteligente
-        results = query.order_by(
-            desc('smart_score'),
-            desc(Post.created_at)  # Tiebreaker por data
-        ).offset(offset).limit(limit).all()
+        results, liked_ids = _split_liked(results, liked_columns)
+        posts = [result[0] for result in results]
+        scores = [float(result[1]) for result in results]
         
-        posts_with_scores = [(result[0], float(result[1])) for result in results]
+        next_cursor = None
+        if last_key:
+            post_id, score, created_at = last_key
+            next_cursor = encode_cursor('smart', [score_now.isoformat(), score, created_at, post_id])
         
         return {
-            'posts': [self._enrich_post_data(post, user_id, score) 
-                     for post, score in posts_with_scores],
+            'posts': self._enrich_posts(posts, user_id, prefetch, scores, now, liked_ids),
             'algorithm': 'smart',
-            'total_count': len(posts_with_scores),
+            'total_count': len(posts),
             'metadata': {
                 'limit': limit,
                 'offset': offset,
-                'algorithm_weights': {
-                    'engagement': self.engagement_weight,
-                    'recency': self.recency_weight,
-                    'author': self.author_weight,
-                    'content': self.content_weight
-                },
+                'next_cursor': next_cursor,
+                'algorithm_weights': self.algorithm_weights,
                 'time_range': '30_days',
-                'generated_at': datetime.utcnow().isoformat()
+                'generated_at': now.isoformat()
             }
         }
     
-    def _enrich_post_data(self, post, current_user_id, smart_score=None):
+    def _smart_query(self, score_now, *entities):
+        """
+        SELECT de entities + smart_score dos posts públicos dos últimos 30 dias,
+        ordenado por (score, created_at, id); retorna (query, expressão do score)
+        """
+        # Score final combinado (expressão em cache; score_now vai como parâmetro)
+        final_score = _smart_score(db.engine.dialect.name, self.recency_weight)
+        
+        query = db.session.query(*entities, final_score.label('smart_score')).filter(
+            *PUBLIC_FEED_FILTER,
+            Post.created_at >= score_now - timedelta(days=30)  # Últimos 30 dias
+        ).params(score_now=score_now).order_by(
+            desc('smart_score'),
+            desc(Post.created_at),  # Tiebreaker por data
+            desc(Post.id)
+        )
+        return query, final_score
+    
+    def _rank_smart_first_page(self, limit, score_now):
+        """Ranking da 1ª página (só colunas, sem ORM): [[post_id, score, created_at], ...]"""
+        query, _ = self._smart_query(score_now, Post.id, Post.created_at)
+        return {
+            'score_now': score_now.isoformat(),
+            'ranked': [
+                [post_id, float(score), created_at.isoformat()]
+                for post_id, created_at, score in query.limit(limit).all()
+            ]
+        }
+    
+    def _hydrate_smart_ranking(self, ranked, liked_columns):
+        """
+        Linhas (Post, score[, liked_by_me]) na ordem do ranking em cache, em um
+        único SELECT ... IN; posts apagados/privados desde o cálculo ficam de fora
+        """
+        post_ids = [post_id for post_id, _, _ in ranked]
+        if not post_ids:
+            return []
+        
+        rows = db.session.query(Post, *liked_columns).options(
+            AUTHOR_LOAD
+        ).filter(
+            Post.id.in_(post_ids),
+            *PUBLIC_FEED_FILTER
+        ).all()
+        
+        if not liked_columns:
+            rows = [(post,) for post in rows]
+        by_id = {row[0].id: row for row in rows}
+        return [
+            (by_id[post_id][0], score, *by_id[post_id][1:])
+            for post_id, score, _ in ranked if post_id in by_id
+        ]
+    
+    def _enrich_posts(self, posts, current_user_id, prefetch=DEFAULT_PREFETCH, scores=None, now=None,
+                      liked_ids=None):
+        """
+        Enriquece uma página de posts carregando em lote (uma query por
+        tipo de dado, não por post) o que estiver em prefetch
+        """
+        post_ids = [post.id for post in posts]
+        comments_by_post = None
+        
+        # liked_ids já vem da coluna liked_by_me das timelines; senão uma query em lote
+        if liked_ids is None and post_ids and 'liked' in prefetch:
+            liked_ids = {
+                post_id for (post_id,) in db.session.query(Like.post_id).filter(
+                    Like.user_id == current_user_id,
+                    Like.post_id.in_(post_ids)
+                )
+            }
+        
+        if post_ids and 'recent_comments' in prefetch:
+            comments_by_post = self._get_recent_comments(post_ids)
+        
+        if scores is None:
+            scores = [None] * len(posts)
+        
+        return [
+            self._enrich_post_data(post, current_user_id, score, liked_ids, comments_by_post, now)
+            for post, score in zip(posts, scores)
+        ]
+    
+    def _get_recent_comments(self, post_ids, per_post=RECENT_COMMENTS_LIMIT):
+        """
+        Últimos comentários principais de vários posts em uma única query
+        (ROW_NUMBER() por post) -> {post_id: [Comment, ...]}
+        """
+        ranked = db.session.query(
+            Comment.id,
+            func.row_number().over(
+                partition_by=Comment.post_id,
+                order_by=desc(Comment.created_at)
+            ).label('rn')
+        ).filter(
+            Comment.post_id.in_(post_ids),
+            Comment.is_deleted == False,
+            Comment.parent_comment_id.is_(None)  # Apenas comentários principais
+        ).subquery()
+        
+        comments = db.session.query(Comment).options(
+            COMMENT_AUTHOR_LOAD
+        ).join(
+            ranked, Comment.id == ranked.c.id
+        ).filter(
+            ranked.c.rn <= per_post
+        ).order_by(Comment.post_id, desc(Comment.created_at)).all()
+        
+        comments_by_post = {}
+        for comment in comments:
+            comments_by_post.setdefault(comment.post_id, []).append(comment)
+        return comments_by_post
+    
+    def _enrich_post_data(self, post, current_user_id, smart_score=None, liked_ids=None, comments_by_post=None,
+                          now=None):
         """
         Enriquecer dados do post com informações contextuais
+        liked_ids/comments_by_post vêm do prefetch em lote; se None, consulta o post
         """
         post_data = post.to_dict()
         
         # Adicionar informações contextuais para o usuário atual
         try:
             # Verificar se usuário curtiu este post
-            user_liked = db.session.query(Like).filter(
-                Like.user_id == current_user_id,
-                Like.post_id == post.id
-            ).first() is not None
+            if liked_ids is not None:
+                user_liked = post.id in liked_ids
+            else:
+                user_liked = db.session.query(Like).filter(
+                    Like.user_id == current_user_id,
+                    Like.post_id == post.id
+                ).first() is not None
             
             post_data['user_interactions'] = {
                 'liked': user_liked,
@@ -207,16 +531,19 @@ class TimelineService:
                 post_data['relevance_score'] = round(smart_score, 2)
             
             # Adicionar tempo relativo
-            post_data['time_ago'] = self._get_relative_time(post.created_at)
+            post_data['time_ago'] = self._get_relative_time(post.created_at, now)
             
             # Adicionar preview de comentários recentes (máximo 3)
-            recent_comments = db.session.query(Comment).options(
-                joinedload(Comment.user)
-            ).filter(
-                Comment.post_id == post.id,
-                Comment.is_deleted == False,
-                Comment.parent_comment_id.is_(None)  # Apenas comentários principais
-            ).order_by(desc(Comment.created_at)).limit(3).all()
+            if comments_by_post is not None:
+                recent_comments = comments_by_post.get(post.id, [])
+            else:
+                recent_comments = db.session.query(Comment).options(
+                    COMMENT_AUTHOR_LOAD
+                ).filter(
+                    Comment.post_id == post.id,
+                    Comment.is_deleted == False,
+                    Comment.parent_comment_id.is_(None)  # Apenas comentários principais
+                ).order_by(desc(Comment.created_at)).limit(RECENT_COMMENTS_LIMIT).all()
             
             post_data['recent_comments'] = [
                 comment.to_dict(include_user=True, include_replies=False)
@@ -224,41 +551,50 @@ class TimelineService:
             ]
             
         except Exception as e:
-            print(f"⚠️ Erro ao enriquecer post {post.id}: {e}")
+            logger.warning("Erro ao enriquecer post %s: %s", post.id, e)
         
         return post_data
     
-    def _get_relative_time(self, created_at):
+    def _get_relative_time(self, created_at, now=None):
         """
         Converte datetime para tempo relativo (ex: "há 2 horas", "há 1 dia")
         """
         if not created_at:
             return "unknown"
         
-        now = datetime.utcnow()
-        diff = now - created_at
-        
-        if diff.days > 0:
-            if diff.days == 1:
-                return "há 1 dia"
-            elif diff.days < 7:
-                return f"há {diff.days} dias"
-            elif diff.days < 30:
-                weeks = diff.days // 7
-                return f"há {weeks} semana{'s' if weeks > 1 else ''}"
-            else:
-                months = diff.days // 30
-                return f"há {months} {'meses' if months > 1 else 'mês'}"
+        minutes = int(((now or datetime.utcnow()) - created_at).total_seconds() // 60)
         
-        hours = diff.seconds // 3600
-        if hours > 0:
-            return f"há {hours} hora{'s' if hours > 1 else ''}"
+        # Posts com mais de 1 dia: uma entrada de cache por dia, não por minuto
+        if minutes >= MINUTES_PER_DAY:
+            minutes -= minutes % MINUTES_PER_DAY
         
-        minutes = diff.seconds // 60
-        if minutes > 0:
-            return f"há {minutes} minuto{'s' if minutes > 1 else ''}"
+        return _relative_time_label(max(minutes, 0))
+    
+    def get_ranked_trending_posts(self, ranked, now=None):
+        """
+        Monta o trending a partir de um ranking [(post_id, score)] (pré-calculado
+        pelo job ou pelo top-K de get_trending_posts): um único SELECT ... IN (...)
+        com autores via selectinload; posts que deixaram de ser públicos (ou foram
+        apagados) depois do ranking ficam de fora
+        """
+        post_ids = [post_id for post_id, _ in ranked]
+        posts = db.session.query(Post).options(
+            AUTHOR_LOAD
+        ).filter(
+            Post.id.in_(post_ids),
+            *PUBLIC_FEED_FILTER
+        ).all()
+        
+        # Manter a ordem do ranking
+        posts_by_id = {post.id: post for post in posts}
+        ordered = [posts_by_id[post_id] for post_id in post_ids if post_id in posts_by_id]
         
-        return "agora mesmo"
+        return {
+            'trending_posts': [post.to_dict() for post in ordered],
+            'generated_at': (now or datetime.utcnow()).isoformat(),
+            'time_window': '24_hours',
+            'total_count': len(ordered)
+        }
     
     def get_trending_posts(self, limit=10):
         """
@@ -266,35 +602,32 @@ class TimelineService:
         """
         try:
             # Posts das últimas 24 horas com mais engajamento
-            trending_threshold = datetime.utcnow() - timedelta(hours=24)
-            
-            trending_score = (
-                func.coalesce(Post.likes_count, 0) * 2 +
-                func.coalesce(Post.comments_count, 0) * 3 +
-                func.coalesce(Post.views_count, 0) * 0.1
-            ).label('trending_score')
+            now = datetime.utcnow()
+            trending_threshold = now - timedelta(hours=24)
             
-            query = db.session.query(Post, trending_score).options(
-                joinedload(Post.user)
+            # Só as colunas do score (respondido pelo índice ix_posts_feed_trending,
+            # sem objetos ORM); o score e o top-K saem em Python: heap O(N log k)
+            # em vez de ordenar todos os candidatos para um LIMIT pequeno
+            rows = db.session.query(
+                Post.id, Post.likes_count, Post.comments_count, Post.views_count
             ).filter(
-                Post.is_deleted == False,
-                Post.privacy == PostPrivacy.PUBLIC,
-                Post.created_at >= trending_threshold,
-                trending_score > 5  # Mínimo de engajamento
-            )
+                *PUBLIC_FEED_FILTER,
+                Post.created_at >= trending_threshold
+            ).yield_per(TRENDING_SCAN_BATCH)
             
-            results = query.order_by(desc('trending_score')).limit(limit).all()
-            posts = [result[0] for result in results]
+            def scored():
+                for post_id, likes, comments, views in rows:
+                    score = (likes or 0) * 2 + (comments or 0) * 3 + (views or 0) * 0.1
+                    if score > TRENDING_MIN_SCORE:  # Mínimo de engajamento
+                        yield score, post_id
             
-            return {
-                'trending_posts': [post.to_dict() for post in posts],
-                'generated_at': datetime.utcnow().isoformat(),
-                'time_window': '24_hours',
-                'total_count': len(posts)
-            }
+            top = heapq.nlargest(limit, scored())
+            
+            # Hidratar só os vencedores, na ordem do score
+            return self.get_ranked_trending_posts([(post_id, score) for score, post_id in top], now)
             
         except Exception as e:
-            print(f"❌ Erro ao buscar trending: {e}")
+            logger.error("Erro ao buscar trending: %s", e)
             return {
                 'trending_posts': [],
                 'error': str(e)
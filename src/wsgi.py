@@ -0,0 +1,14 @@
+# src/wsgi.py - Ponto de entrada WSGI para o gunicorn
+#
+#   cd src && gunicorn --preload -w 4 -k gthread --threads 4 -b 0.0.0.0:5000 wsgi:app
+#
+# Workers gthread: envio SMTP, esperas do SQLite e hash de senha (bcrypt/argon2
+# liberam o GIL no pool _HASH_POOL) se sobrepõem entre as threads do worker.
+# gevent não é usado: o monkey-patch transforma o pool de hash em greenlets
+# e o hash volta a bloquear o worker inteiro. Com SQLite também não há ganho
+# (o driver sqlite3 não coopera com o loop). Ao migrar para PostgreSQL, a opção
+# é -k gevent com psycogreen.gevent.patch_psycopg() no post_fork, movendo o
+# hash de senha para o threadpool do hub do gevent.
+from main import app
+
+__all__ = ['app']
@@ -8,15 +8,29 @@ import requests
 import json
 import sys
 import os
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 
+def _run_parallel(check, items):
+    """
+    Executa check(item) para cada item ao mesmo tempo (os requests são independentes)
+    e imprime as linhas de cada um na ordem original, sem intercalar
+    check retorna (sucesso, [linhas])
+    """
+    with ThreadPoolExecutor(max_workers=len(items)) as pool:
+        results = list(pool.map(check, items))
+    
+    for _, lines in results:
+        for line in lines:
+            print(line)
+    return [ok for ok, _ in results]
+
 class SymplleI18nTester:
     """Tester específico para a implementação i18n do Symplle"""
     
     def __init__(self, base_url="http://localhost:5000"):
         self.base_url = base_url
-        self.session = requests.Session()
-        self.session.headers.update({'Content-Type': 'application/json'})
+        self.session = self._new_session()
         
         # Detectar se main.py está em src/ ou raiz
         self.main_in_src = os.path.exists('src/main.py')
@@ -25,6 +39,15 @@ class SymplleI18nTester:
         else:
             print("📁 Detectado: main.py na raiz - usando caminhos padrão")
     
+    def _new_session(self):
+        """
+        Sessão própria (cookies de idioma separados): cada verificação em
+        paralelo usa a sua, senão uma mudaria o idioma da outra
+        """
+        session = requests.Session()
+        session.headers.update({'Content-Type': 'application/json'})
+        return session
+    
     def test_server_health(self):
         """Verifica se o servidor está rodando"""
         print("🔍 TESTANDO CONEXÃO COM SERVIDOR...")
@@ -108,12 +131,10 @@ class SymplleI18nTester:
             {'code': 'es_ES', 'name': 'Español (España)', 'flag': '🇪🇸'}
         ]
         
-        success_count = 0
-        
-        for locale_info in locales_to_test:
+        def change_and_verify(locale_info):
             locale = locale_info['code']
             try:
-                response = self.session.post(
+                response = self._new_session().post(
                     f"{self.base_url}/api/i18n/change-locale",
                     json={'locale': locale}
                 )
@@ -125,17 +146,18 @@ class SymplleI18nTester:
                         welcome = examples.get('welcome', 'N/A')
                         login = examples.get('login', 'N/A')
                         
-                        print(f"✅ {locale_info['flag']} {locale}: Mudança bem-sucedida")
-                        print(f"   Welcome: {welcome}")
-                        print(f"   Login: {login}")
-                        success_count += 1
-                    else:
-                        print(f"❌ {locale}: {data.get('message', 'Erro desconhecido')}")
-                else:
-                    print(f"❌ {locale}: HTTP {response.status_code}")
+                        return True, [
+                            f"✅ {locale_info['flag']} {locale}: Mudança bem-sucedida",
+                            f"   Welcome: {welcome}",
+                            f"   Login: {login}"
+                        ]
+                    return False, [f"❌ {locale}: {data.get('message', 'Erro desconhecido')}"]
+                return False, [f"❌ {locale}: HTTP {response.status_code}"]
                     
             except Exception as e:
-                print(f"❌ {locale}: Erro na mudança - {e}")
+                return False, [f"❌ {locale}: Erro na mudança - {e}"]
+        
+        success_count = sum(_run_parallel(change_and_verify, locales_to_test))
         
         print(f"\n📊 Resultado: {success_count}/{len(locales_to_test)} idiomas funcionando")
         return success_count == len(locales_to_test)
@@ -144,24 +166,20 @@ class SymplleI18nTester:
         """Testa endpoint de demonstração"""
         print("\n🎭 TESTANDO DEMO i18n...")
         
-        # Testar demo em diferentes idiomas
-        for locale_info in [
-            {'code': 'pt_BR', 'flag': '🇧🇷'},
-            {'code': 'en_US', 'flag': '🇺🇸'},
-            {'code': 'es_ES', 'flag': '🇪🇸'}
-        ]:
+        def demo_for(locale_info):
             locale = locale_info['code']
             flag = locale_info['flag']
+            session = self._new_session()
             
             # Mudar idioma primeiro
-            self.session.post(
+            session.post(
                 f"{self.base_url}/api/i18n/change-locale",
                 json={'locale': locale}
             )
             
             # Pegar demo
             try:
-                response = self.session.get(f"{self.base_url}/api/i18n/demo")
+                response = session.get(f"{self.base_url}/api/i18n/demo")
                 
                 if response.status_code == 200:
                     data = response.json()
@@ -170,19 +188,26 @@ class SymplleI18nTester:
                         translations = demo_data.get('translations', {})
                         formatting = demo_data.get('formatting', {})
                         
-                        print(f"\n📋 DEMO {flag} {locale}:")
-                        print(f"   App: {translations.get('app_name', 'N/A')}")
-                        print(f"   Welcome: {translations.get('welcome_message', 'N/A')}")
-                        print(f"   Login: {translations.get('login_title', 'N/A')}")
-                        print(f"   Data: {formatting.get('date_now', 'N/A')}")
-                        print(f"   Moeda: {formatting.get('currency_example', 'N/A')}")
-                    else:
-                        print(f"❌ Demo {locale}: {data.get('message', 'Erro')}")
-                else:
-                    print(f"❌ Demo {locale}: HTTP {response.status_code}")
+                        return True, [
+                            f"\n📋 DEMO {flag} {locale}:",
+                            f"   App: {translations.get('app_name', 'N/A')}",
+                            f"   Welcome: {translations.get('welcome_message', 'N/A')}",
+                            f"   Login: {translations.get('login_title', 'N/A')}",
+                            f"   Data: {formatting.get('date_now', 'N/A')}",
+                            f"   Moeda: {formatting.get('currency_example', 'N/A')}"
+                        ]
+                    return False, [f"❌ Demo {locale}: {data.get('message', 'Erro')}"]
+                return False, [f"❌ Demo {locale}: HTTP {response.status_code}"]
                     
             except Exception as e:
-                print(f"❌ Demo {locale}: {e}")
+                return False, [f"❌ Demo {locale}: {e}"]
+        
+        # Testar demo em diferentes idiomas
+        _run_parallel(demo_for, [
+            {'code': 'pt_BR', 'flag': '🇧🇷'},
+            {'code': 'en_US', 'flag': '🇺🇸'},
+            {'code': 'es_ES', 'flag': '🇪🇸'}
+        ])
     
     def test_auth_endpoints_with_i18n(self):
         """Testa endpoints de autenticação com i18n"""
@@ -257,34 +282,33 @@ class SymplleI18nTester:
         
         locales = ['pt_BR', 'en_US', 'es_ES']
         
-        for locale in locales:
+        def check_header(locale):
+            session = self._new_session()
+            
             # Mudar idioma
-            self.session.post(
+            session.post(
                 f"{self.base_url}/api/i18n/change-locale",
                 json={'locale': locale}
             )
             
             # Fazer request e verificar header
             try:
-                response = self.session.get(f"{self.base_url}/api/i18n/info")
+                response = session.get(f"{self.base_url}/api/i18n/info")
                 content_language = response.headers.get('Content-Language')
                 
                 if content_language:
-                    print(f"✅ {locale}: Content-Language = {content_language}")
-                else:
-                    print(f"⚠️  {locale}: Header Content-Language não encontrado")
+                    return True, [f"✅ {locale}: Content-Language = {content_language}"]
+                return False, [f"⚠️  {locale}: Header Content-Language não encontrado"]
                     
             except Exception as e:
-                print(f"❌ {locale}: Erro ao verificar header - {e}")
+                return False, [f"❌ {locale}: Erro ao verificar header - {e}"]
+        
+        _run_parallel(check_header, locales)
     
     def test_accept_language_detection(self):
         """Testa detecção automática via Accept-Language header"""
         print("\n🔍 TESTANDO DETECÇÃO Accept-Language...")
         
-        # Criar nova sessão para testar headers
-        test_session = requests.Session()
-        test_session.headers.update({'Content-Type': 'application/json'})
-        
         test_cases = [
             {'header': 'pt-BR,pt;q=0.9', 'expected': 'pt_BR', 'desc': 'Português'},
             {'header': 'en-US,en;q=0.9', 'expected': 'en_US', 'desc': 'Inglês'},
@@ -292,7 +316,9 @@ class SymplleI18nTester:
             {'header': 'fr-FR,fr;q=0.9', 'expected': 'en_US', 'desc': 'Francês (fallback)'}
         ]
         
-        for case in test_cases:
+        def detect(case):
+            # Nova sessão (sem cookie de idioma) para testar só o header
+            test_session = self._new_session()
             test_session.headers['Accept-Language'] = case['header']
             
             try:
@@ -304,16 +330,15 @@ class SymplleI18nTester:
                         current_locale = data.get('data', {}).get('current_locale')
                         
                         if current_locale == case['expected']:
-                            print(f"✅ {case['desc']}: {case['header']} → {current_locale}")
-                        else:
-                            print(f"⚠️  {case['desc']}: Esperado {case['expected']}, obtido {current_locale}")
-                    else:
-                        print(f"❌ {case['desc']}: Resposta de erro")
-                else:
-                    print(f"❌ {case['desc']}: HTTP {response.status_code}")
+                            return True, [f"✅ {case['desc']}: {case['header']} → {current_locale}"]
+                        return False, [f"⚠️  {case['desc']}: Esperado {case['expected']}, obtido {current_locale}"]
+                    return False, [f"❌ {case['desc']}: Resposta de erro"]
+                return False, [f"❌ {case['desc']}: HTTP {response.status_code}"]
                     
             except Exception as e:
-                print(f"❌ {case['desc']}: {e}")
+                return False, [f"❌ {case['desc']}: {e}"]
+        
+        _run_parallel(detect, test_cases)
     
     def run_all_tests(self):
         """Executa todos os testes"""
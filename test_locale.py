@@ -0,0 +1,15 @@
+# test_locale.py
+"""
+Testes da detecção de locale por ?locale= / X-Locale (antes: ImportError -> 500)
+Execute: python -m pytest test_locale.py
+"""
+
+def test_x_locale_header_selects_locale(client):
+    response = client.get('/', headers={'X-Locale': 'pt-BR'})
+    assert response.status_code == 200
+    assert response.headers['Content-Language'] == 'pt_BR'
+    assert 'X-Locale' in response.headers['Vary']
+
+def test_locale_query_param_is_accepted(client):
+    response = client.get('/?locale=es-es')
+    assert response.status_code == 200
@@ -0,0 +1,43 @@
+# test_timeline_cache.py
+"""
+Testes do cache da timeline com o Redis fora do ar: o request cai para o banco
+Execute: python -m pytest test_timeline_cache.py
+"""
+
+import pytest
+
+redis = pytest.importorskip('redis')
+
+from services import timeline_cache
+
+class FailingRedis:
+    """Cliente cujo comando qualquer falha como um Redis derrubado"""
+    
+    def __getattr__(self, name):
+        def command(*args, **kwargs):
+            raise redis.ConnectionError('Redis fora do ar')
+        return command
+
+@pytest.fixture
+def failing_redis(monkeypatch):
+    monkeypatch.setattr(timeline_cache, '_redis', FailingRedis())
+
+def test_get_or_set_computes_when_redis_is_down(failing_redis):
+    calls = []
+    
+    def compute():
+        calls.append(1)
+        return {'posts': [], 'count': 0}
+    
+    key = timeline_cache.timeline_key(1, 'chronological', 0, 20)
+    assert timeline_cache.get_or_set(key, timeline_cache.TIMELINE_CACHE_TTL, compute) == {'posts': [], 'count': 0}
+    assert timeline_cache.get_or_set(key, timeline_cache.TIMELINE_CACHE_TTL, compute) == {'posts': [], 'count': 0}
+    assert len(calls) == 2
+
+def test_invalidation_and_trending_survive_redis_outage(failing_redis):
+    generation = timeline_cache._local_generation
+    timeline_cache.invalidate_timelines()
+    assert timeline_cache._local_generation == generation + 1
+    assert timeline_cache.smart_ranking_key(20) == f"tl:{generation + 1}:smart:public:20"
+    assert timeline_cache.read_trending(10) is None
+    timeline_cache.record_engagement(1, 'like', '2026-01-01T00:00:00')
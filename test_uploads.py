@@ -0,0 +1,76 @@
+# test_uploads.py
+"""
+Testes dos uploads: registro em file_uploads, listagem e remoção de conteúdo compartilhado
+Execute: python -m pytest test_uploads.py
+"""
+
+import io
+import os
+
+from conftest import wait_for_metadata
+
+# Conteúdo qualquer: as rotas básicas validam só a extensão
+IMAGE_BYTES = b'\x89PNG\r\n\x1a\n' + b'symplle' * 64
+
+def _upload(client, route, user_id, content=IMAGE_BYTES, filename='foto.png'):
+    response = client.post(
+        route,
+        data={'user_id': str(user_id), 'file': (io.BytesIO(content), filename)},
+        content_type='multipart/form-data'
+    )
+    assert response.status_code == 201, response.get_json()
+    return response.get_json()['data']
+
+def test_uploaded_avatar_is_listed(client):
+    uploaded = _upload(client, '/api/upload/avatar', 7)
+    wait_for_metadata()
+    
+    response = client.get('/api/upload/files/7?category=avatars')
+    assert response.status_code == 200
+    files = response.get_json()['data']['files']
+    assert [f['filename'] for f in files] == [uploaded['filename']]
+    assert files[0]['url'] == uploaded['avatar_url']
+    
+    status = client.get(f"/api/upload/status/{uploaded['upload_id']}").get_json()['data']
+    assert status['status'] == 'done'
+
+def test_failed_metadata_write_is_reported(client, monkeypatch):
+    from src.routes import upload_routes
+    
+    def broken_record_upload(*args, **kwargs):
+        raise RuntimeError('banco indisponível')
+    monkeypatch.setattr(upload_routes, 'record_upload', broken_record_upload)
+    
+    uploaded = _upload(client, '/api/upload/document', 3, content=b'curriculo', filename='cv.txt')
+    wait_for_metadata()
+    
+    status = client.get(f"/api/upload/status/{uploaded['upload_id']}").get_json()['data']
+    assert status['status'] == 'failed'
+    assert status['result']['code'] == 'RECORD_FAILED'
+
+def test_shared_blob_survives_until_last_reference(app, client):
+    from models import db
+    from models.file_upload import FileUpload
+    from services.file_service import file_service
+    
+    # Mesmo conteúdo enviado por dois usuários: um único arquivo no disco
+    first = _upload(client, '/api/upload/post-image', 1)
+    second = _upload(client, '/api/upload/post-image', 2)
+    wait_for_metadata()
+    assert first['file_path'] == second['file_path']
+    file_path = first['file_path']
+    assert [f['filename'] for f in file_service.list_user_files(1, 'posts')] == [first['filename']]
+    
+    # Usuário 1 remove o seu: o usuário 2 ainda aponta para o conteúdo
+    FileUpload.query.filter_by(user_id=1).one().soft_delete()
+    db.session.commit()
+    result = file_service.delete_file(file_path)
+    assert result['success'] and result.get('shared')
+    assert os.path.exists(file_path)
+    
+    # Última referência desativada: o arquivo sai do disco
+    FileUpload.query.filter_by(user_id=2).one().soft_delete()
+    db.session.commit()
+    result = file_service.delete_file(file_path)
+    assert result['success'] and not result.get('shared')
+    assert not os.path.exists(file_path)